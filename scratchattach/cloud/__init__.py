@@ -1,2 +1,4 @@
 from .cloud import *
-from ._base import *
\ No newline at end of file
+from ._base import *
+from .async_cloud import *
+from .cloud_pool import *
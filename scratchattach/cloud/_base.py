@@ -7,7 +7,9 @@ import time
 import warnings
 from typing import Optional, Union, TypeVar, Generic, TYPE_CHECKING, Any
 from abc import ABC, abstractmethod, ABCMeta
-from threading import Lock
+from threading import Lock, Condition, Thread
+from collections import deque
+from concurrent.futures import Future
 from collections.abc import Iterator
 
 from scratchattach.cloud import cloud as cloud_module
@@ -25,9 +27,17 @@ else:
 
 import websocket
 
+try:
+    import orjson
+
+    _json_loads = orjson.loads  # orjson.JSONDecodeError is a subclass of json.JSONDecodeError
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
+
 from scratchattach.site import session
-from scratchattach.eventhandlers import cloud_recorder
-from scratchattach.utils import exceptions
+from scratchattach.eventhandlers import cloud_recorder, cloud_history
+from scratchattach.utils import exceptions, ratelimit
 from scratchattach.eventhandlers.cloud_requests import CloudRequests, RespondOrder
 from scratchattach.eventhandlers.cloud_events import CloudEvents
 from scratchattach.eventhandlers.cloud_storage import CloudStorage
@@ -57,7 +67,6 @@ class AnyCloud(ABC, Generic[T]):
     """
 
     active_connection: bool
-    var_sets_since_first: int
     _session: Optional[session.Session]
 
     @abstractmethod
@@ -121,10 +130,16 @@ class AnyCloud(ABC, Generic[T]):
         used_cloud_vars: Optional[list[str]] = None,
         respond_order=RespondOrder.RECEIVE,
         debug: bool = False,
+        **kwargs,
     ) -> CloudRequests:
+        """
+        Creates a CloudRequests handler for this cloud. Other keyword arguments (like max_workers or
+        response_encoding) are passed to CloudRequests.
+        """
         used_cloud_vars = used_cloud_vars or ["1", "2", "3", "4", "5", "6", "7", "8", "9"]
         return CloudRequests(
-            self, used_cloud_vars=used_cloud_vars, no_packet_loss=no_packet_loss, respond_order=respond_order, debug=debug
+            self, used_cloud_vars=used_cloud_vars, no_packet_loss=no_packet_loss, respond_order=respond_order, debug=debug,
+            **kwargs
         )
 
     def storage(self, *, no_packet_loss: bool = False, used_cloud_vars: Optional[list[str]] = None) -> CloudStorage:
@@ -169,8 +184,48 @@ class DummyCloud(AnyCloud[Any]):
         return {}
 
 
+class PacketSplitter:
+    """
+    Splits the data received from a cloud websocket into decoded packets.
+
+    Cloud servers send one JSON packet per line and usually leave out the final newline. A trailing line that isn't
+    valid JSON yet is kept back and joined with the next frame, so packets that are split across frames aren't lost.
+    Uses orjson for decoding if it is installed.
+    """
+
+    max_partial_length = 1_000_000
+    "Trailing lines longer than this are dropped instead of being kept back"
+
+    def __init__(self):
+        self._partial = ""
+
+    def feed(self, data: Union[str, bytes]) -> list[Any]:
+        if isinstance(data, bytes):
+            data = data.decode("utf-8", errors="replace")
+        if self._partial:
+            data = self._partial + data
+            self._partial = ""
+        lines = data.split("\n")
+        last = len(lines) - 1
+        packets = []
+        for i, line in enumerate(lines):
+            if not line or line == "\r":
+                continue
+            try:
+                packets.append(_json_loads(line))
+            except json.JSONDecodeError as e:
+                if i == last and line.startswith("{") and len(line) < self.max_partial_length:
+                    self._partial = line
+                else:
+                    # this could happen e.g. when the scratchattach server sends the message
+                    # "This server uses @TimMcCool's scratchattach 2.0.0"
+                    warnings.warn(f"Invalid JSON sent from server: {e}")
+        return packets
+
+
 class WebSocketEventStream(EventStream):
-    packets_left: list[Union[str, bytes]]
+    packets_left: deque[Any]
+    splitter: PacketSplitter
     source_cloud: BaseCloud
     reading: Lock
 
@@ -183,6 +238,7 @@ class WebSocketEventStream(EventStream):
         else:
             self.source_cloud = cloud_type(project_id=cloud.project_id)
         self.source_cloud._session = cloud._session
+        self.source_cloud.cloud_host = cloud.cloud_host
         self.source_cloud.cookie = cloud.cookie
         self.source_cloud.header = cloud.header
         self.source_cloud.origin = cloud.origin
@@ -193,7 +249,8 @@ class WebSocketEventStream(EventStream):
             self.source_cloud.connect()
         except exceptions.CloudConnectionError:
             warnings.warn("Initial cloud connection attempt failed, retrying...", exceptions.UnexpectedWebsocketEventWarning)
-        self.packets_left = []
+        self.packets_left = deque()
+        self.splitter = PacketSplitter()
 
     def receive_new(self, non_blocking: bool = False, timeout: Optional[float] = 0):
         timeout = None if timeout is None else max(timeout, 0)
@@ -204,11 +261,11 @@ class WebSocketEventStream(EventStream):
             self.source_cloud.websocket.settimeout(timeout_value)
         # print("Receiving...")
         try:
-            received = self.source_cloud.websocket.recv().splitlines()
-        except websocket.WebSocketTimeoutException:
+            received = self.source_cloud.websocket.recv()
+        except (websocket.WebSocketTimeoutException, BlockingIOError, ssl.SSLWantReadError):
+            # Non-blocking reads (timeout 0) raise BlockingIOError / SSLWantReadError if no data is available
             return
-        # print(f"{received=}")
-        self.packets_left.extend(received)
+        self.packets_left.extend(self.splitter.feed(received))
 
     def read(self, amount: int = -1) -> Iterator[dict[str, Any]]:
         # print("Reading...")
@@ -237,18 +294,15 @@ class WebSocketEventStream(EventStream):
                         if not self.packets_left:
                             continue
                         i += 1
-                        yield json.loads(self.packets_left.pop(0))
+                        yield self.packets_left.popleft()
                     done = True
-                except json.JSONDecodeError as e:
-                    # this could happen e.g. when the scratchattach server sends the message
-                    # "This server uses @TimMcCool's scratchattach 2.0.0"
-                    warnings.warn(f"Invalid JSON sent from server: {e}")
                 except Exception:
                     # NOTE: at the very least for `except Exception`, let's print the traceback
                     # ideally we would never even use `except Exception`. Maybe this is technical debt.
                     # TODO: investigate what the exception we actually want to catch here
                     traceback.print_exc()
                     self.source_cloud.reconnect()
+                    self.splitter = PacketSplitter()
 
     def __del__(self):
         self.close()
@@ -257,6 +311,83 @@ class WebSocketEventStream(EventStream):
         self.source_cloud.disconnect()
 
 
+class CloudSetQueue:
+    """
+    Outgoing queue of cloud variable sets of a BaseCloud.
+
+    Queued sets are sent by a background thread as fast as the cloud's ratelimit allows. Sets to a variable that
+    already has a pending set replace the pending value (last write wins), so a variable that is updated many times
+    within one ratelimit window is only sent once. All pending sets are sent together in one packet list.
+    """
+
+    cloud: BaseCloud
+    coalesced: int
+    "The number of queued sets that were replaced by a later set before being sent"
+
+    def __init__(self, cloud: BaseCloud):
+        self.cloud = cloud
+        self.coalesced = 0
+        self._pending: dict[str, tuple[Any, list[Future[None]]]] = {}
+        self._condition = Condition()
+        self._worker: Optional[Thread] = None
+
+    def put(self, variable: str, value) -> Future[None]:
+        future: Future[None] = Future()
+        with self._condition:
+            futures = []
+            if variable in self._pending:
+                _, futures = self._pending.pop(variable)
+                self.coalesced += 1
+            futures.append(future)
+            self._pending[variable] = (value, futures)
+            self._condition.notify_all()
+            if self._worker is None:
+                self._worker = Thread(target=self._run, daemon=True)
+                self._worker.start()
+        return future
+
+    def _take_batch(self) -> Optional[dict[str, tuple[Any, list[Future[None]]]]]:
+        # Waits until the ratelimit allows sending the pending sets and takes them. If no sets are pending, the worker
+        # is ended and None is returned
+        with self._condition:
+            while True:
+                if not self._pending:
+                    self._worker = None
+                    self._condition.notify_all()
+                    return None
+                sleep_time = self.cloud.next_send_wait(len(self._pending))
+                if sleep_time <= 0:
+                    break
+                # Sets queued while waiting are coalesced into this batch
+                self._condition.wait(sleep_time)
+            batch, self._pending = self._pending, {}
+            return batch
+
+    def _run(self):
+        # The worker only runs while there are pending sets
+        while (batch := self._take_batch()) is not None:
+            try:
+                self.cloud.set_vars({variable: value for variable, (value, _) in batch.items()})
+            except Exception as e:
+                for _, futures in batch.values():
+                    for future in futures:
+                        future.set_exception(e)
+            else:
+                for _, futures in batch.values():
+                    for future in futures:
+                        future.set_result(None)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until all queued sets have been sent. Returns False if the timeout expired before.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._worker is None, timeout)
+
+
 class BaseCloud(AnyCloud[Union[str, int]]):
     """
     Base class for a project's cloud variables. Represents a cloud.
@@ -290,15 +421,22 @@ class BaseCloud(AnyCloud[Union[str, int]]):
     "The origin to send. Defaults to None"
     print_connect_message: bool
     "Whether to print a message on every connect to the cloud server. Defaults to False."
+    snapshot_path: Optional[str]
+    """
+    File (JSON, or SQLite if it ends with .db / .sqlite) where the values recorded by get_var are saved. On the next
+    start, the recorder starts with the saved values instead of downloading the project. Defaults to None
+    """
+    history: Optional[cloud_history.CloudHistory]
+    "History of all sets recorded since record_history was called. Defaults to None"
     ws_timeout: Optional[int]
     websocket: websocket.WebSocket
     event_stream: Optional[EventStream] = None
     recorder: Optional[cloud_recorder.CloudRecorder]
     _session: Optional[session.Session]
     "Either None or a scratchattach.site.session.Session object. Defaults to None."
-    first_var_set: float
     last_var_set: float
-    var_sets_since_first: int
+    set_queue: CloudSetQueue
+    "Outgoing queue used by queue_set_var"
 
     def __init__(self, *, project_id: Optional[Union[int, str]] = None, _session=None):
 
@@ -309,9 +447,10 @@ class BaseCloud(AnyCloud[Union[str, int]]):
         self.websocket = websocket.WebSocket(sslopt={"cert_reqs": ssl.CERT_NONE})
         self.recorder = None  # A CloudRecorder object that records cloud activity for the values to be retrieved later,
         # which will be saved in this attribute as soon as .get_var is called
-        self.first_var_set = 0.0
         self.last_var_set = 0.0
-        self.var_sets_since_first = 0
+        self._scheduler: Optional[ratelimit.CloudSendScheduler] = None
+        self._scheduler_lock = Lock()
+        self.set_queue = CloudSetQueue(self)
 
         # Set default values for attributes that save configurations specific to the represented cloud:
         # (These attributes can be specifically in the constructors of classes inheriting from this base class)
@@ -326,6 +465,8 @@ class BaseCloud(AnyCloud[Union[str, int]]):
         self.cookie = None
         self.origin = None
         self.print_connect_message = False
+        self.snapshot_path = None
+        self.history = None
 
         self.project_id = project_id
 
@@ -406,20 +547,29 @@ class BaseCloud(AnyCloud[Union[str, int]]):
                 if not (x.isnumeric() or x == ""):
                     raise (exceptions.InvalidCloudValue("Value not numeric"))
 
+    def _send_scheduler(self) -> ratelimit.CloudSendScheduler:
+        # The ratelimit attributes can be changed at any time (e.g. by the constructors of subclasses),
+        # so the scheduler is recreated when they don't match anymore
+        with self._scheduler_lock:
+            scheduler = self._scheduler
+            if scheduler is None or (scheduler.shortterm_ratelimit, scheduler.longterm_ratelimit) != (
+                self.ws_shortterm_ratelimit,
+                self.ws_longterm_ratelimit,
+            ):
+                scheduler = self._scheduler = ratelimit.CloudSendScheduler(
+                    self.ws_shortterm_ratelimit, self.ws_longterm_ratelimit
+                )
+            return scheduler
+
+    def next_send_wait(self, n: int = 1) -> float:
+        """
+        Returns how many seconds setting n cloud variables would have to wait right now to stay within the ratelimit.
+        """
+        return self._send_scheduler().wait_time(n)
+
     def _enforce_ratelimit(self, *, n):
         # n is the amount of variables being set
-        if (
-            (time.time() - self.first_var_set) / (self.var_sets_since_first + 1) > self.ws_longterm_ratelimit
-        ):  # if the average delay between cloud variable sets has been bigger than the long-term rate-limit, cloud variables can be set fast (wait time smaller than long-term rate limit) again
-            self.var_sets_since_first = 0
-            self.first_var_set = time.time()
-
-        wait_time = self.ws_shortterm_ratelimit * n
-        if (
-            time.time() - self.first_var_set > 25
-        ):  # if cloud variables have been continously set fast (wait time smaller than long-term rate limit) for 25 seconds, they should be set slow now (wait time = long-term rate limit) to avoid getting rate-limited
-            wait_time = self.ws_longterm_ratelimit * n
-        sleep_time = self.last_var_set + wait_time - time.time()
+        sleep_time = self._send_scheduler().reserve(n)
         if sleep_time > 0:
             time.sleep(sleep_time)
 
@@ -442,8 +592,6 @@ class BaseCloud(AnyCloud[Union[str, int]]):
             self.connect()
         self._enforce_ratelimit(n=1)
 
-        self.var_sets_since_first += 1
-
         packet = {
             "method": "set",
             "name": "☁ " + variable,
@@ -470,8 +618,6 @@ class BaseCloud(AnyCloud[Union[str, int]]):
         if intelligent_waits:
             self._enforce_ratelimit(n=len(var_value_dict))
 
-        self.var_sets_since_first += len(var_value_dict)
-
         packet_list = []
         for variable in var_value_dict:
             value = var_value_dict[variable]
@@ -490,22 +636,94 @@ class BaseCloud(AnyCloud[Union[str, int]]):
         self._send_packet_list(packet_list, max_retries=max_retries)
         self.last_var_set = time.time()
 
+    def queue_set_var(self, variable: str, value) -> Future[None]:
+        """
+        Queues a cloud variable set and returns immediately instead of waiting for the ratelimit.
+
+        Pending sets to the same variable are merged, only the latest value is sent. Use this for values that change
+        often (like positions in a game), where only the current value matters.
+
+        Args:
+            variable (str): The name of the cloud variable that should be set (provided without the cloud emoji)
+            value (str): The value the cloud variable should be set to
+
+        Returns:
+            concurrent.futures.Future: Resolves when the value (or a newer value of the same variable) was sent. Use `asyncio.wrap_future` to await it.
+        """
+        self._assert_valid_value(value)
+        if not isinstance(variable, str):
+            raise ValueError("cloud var name must be a string")
+        return self.set_queue.put(variable.removeprefix("☁ "), value)
+
+    def _fetch_initial_values(self) -> Optional[dict[str, Any]]:
+        # Initial values for the recorder, used when there is no snapshot
+        if self.project_id is None:
+            return None
+        return _get_cloud_var_initial_data_or_none(self.project_id)
+
+    def _activity_since(self, timestamp: float) -> list[cloud_activity.CloudActivity]:
+        # Cloud activity newer than the given timestamp (in ms), oldest first. Only available for clouds with logs
+        return []
+
     def _ensure_recorder_running(
         self, *, recorder_initial_values: Optional[dict[str, Any]] = None
     ) -> cloud_recorder.CloudRecorder:
         recorder = self.recorder
         if recorder is None:
-            project_id = self.project_id
-            if recorder_initial_values is None and project_id is not None:
-                recorder_initial_values = _get_cloud_var_initial_data_or_none(project_id)
+            snapshot_store = None
+            snapshot = None
+            if self.snapshot_path is not None:
+                snapshot_store = cloud_recorder.CloudSnapshotStore(self.snapshot_path)
+                if recorder_initial_values is None:
+                    snapshot = snapshot_store.load(self._snapshot_key())
+            initial_timestamps: dict[str, float] = {}
+            if snapshot is not None:
+                # Warm start: the snapshot plus the activity that happened since it was saved
+                recorder_initial_values = snapshot.values
+                initial_timestamps = snapshot.timestamps
+                for activity in self._activity_since(snapshot.latest):
+                    recorder_initial_values[activity.actual_var] = activity.value
+                    initial_timestamps[activity.actual_var] = activity.timestamp
+            elif recorder_initial_values is None:
+                recorder_initial_values = self._fetch_initial_values()
             recorder_initial_values = recorder_initial_values or {}
-            self.recorder = recorder = cloud_recorder.CloudRecorder(self, initial_values=recorder_initial_values)
+            self.recorder = recorder = cloud_recorder.CloudRecorder(
+                self,
+                initial_values=recorder_initial_values,
+                initial_timestamps=initial_timestamps,
+                snapshot_store=snapshot_store,
+                snapshot_key=self._snapshot_key(),
+                history=self.history,
+            )
             recorder.start()
             # print("Started recorder.")
-            recorder.received_data.wait(timeout=1)
-            time.sleep(0.01)
+            if snapshot is None:
+                recorder.received_data.wait(timeout=1)
+                time.sleep(0.01)
         return recorder
 
+    def _snapshot_key(self) -> str:
+        return f"{self.cloud_host}/{self.project_id}"
+
+    def record_history(
+        self, path: Optional[str] = None, *, max_entries: int = 100_000
+    ) -> cloud_history.CloudHistory:
+        """
+        Starts recording every cloud variable set into a CloudHistory, which can then be queried with
+        history.history(var, since, until) and history.value_at(var, timestamp) without making requests.
+
+        Args:
+            path: If given, the history is stored in this SQLite file. Otherwise, it is kept in memory.
+
+        Keyword Arguments:
+            max_entries: Maximum number of sets kept per variable in memory
+        """
+        if self.history is None:
+            self.history = cloud_history.CloudHistory(path, key=self._snapshot_key(), max_entries=max_entries)
+        recorder = self._ensure_recorder_running()
+        recorder.history = self.history
+        return self.history
+
     def get_var(self, var, *, recorder_initial_values: Optional[dict[str, Any]] = None):
         var = "☁ " + var.removeprefix("☁ ")
         recorder = self._ensure_recorder_running(recorder_initial_values=recorder_initial_values)
@@ -539,6 +757,14 @@ class LogCloud(BaseCloud, metaclass=LogCloudMeta):
     ) -> list[cloud_activity.CloudActivity]:
         pass
 
+    def _raw_logs(self, *, limit: int = 100, offset: int = 0) -> list[dict[str, Any]]:
+        # Log entries in the format of Scratch's clouddata logs. Used by CloudLogTailer, override it if the logs
+        # are available as raw data
+        return [
+            {"user": a.username, "verb": f"{a.type}_var", "name": a.name, "value": a.value, "timestamp": a.timestamp}
+            for a in self.logs(limit=limit, offset=offset)
+        ]
+
 
 def _get_cloud_var_initial_data(project_id: Union[str, int]) -> dict[str, Any]:
     from scratchattach.site import project
@@ -0,0 +1,428 @@
+"""AsyncBaseCloud, AsyncScratchCloud and AsyncTwCloud classes (asyncio versions of the clouds in cloud.py)"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import threading
+import time
+import traceback
+from collections.abc import AsyncIterator
+from types import TracebackType
+from typing import Optional, Union, Any, Self
+
+import aiohttp
+
+from ._base import BaseCloud, PacketSplitter
+from scratchattach.site import cloud_activity
+from scratchattach.utils import exceptions, ratelimit
+from scratchattach.utils.requests import _active_async_session
+
+
+class AsyncBaseCloud:
+    """
+    Base class for a project's cloud variables, using an asyncio websocket instead of a blocking one.
+
+    All connection work happens on the running event loop: one AsyncBaseCloud needs one websocket and one reader task,
+    so a single process can watch the clouds of hundreds of projects at once.
+
+    Example:
+        async with sa.AsyncTwCloud(project_id=123) as cloud:
+            await cloud.set_var("var", 5)
+            async for activity in cloud.events():
+                print(activity.var, activity.value)
+
+    The configuration attributes are the same as the ones of BaseCloud.
+    """
+
+    _PACKET_FAILURE_SLEEPDURATIONS = (0.1, 0.2, 1.5)
+
+    project_id: Optional[Union[str, int]]
+    cloud_host: str
+    ws_shortterm_ratelimit: float
+    ws_longterm_ratelimit: float
+    allow_non_numeric: bool
+    length_limit: int
+    username: str
+    header: Optional[dict]
+    cookie: Optional[Union[str, dict]]
+    origin: Optional[str]
+    print_connect_message: bool
+    ws_timeout: Optional[float]
+    websocket: Optional[aiohttp.ClientWebSocketResponse]
+    client_session: Optional[aiohttp.ClientSession]
+    "The aiohttp session the websocket is opened with. Defaults to the active AsyncRequests session or a new session."
+    cloud_values: dict[str, Any]
+    "The values of all cloud variables received since connecting, keyed by the variable name (with cloud emoji)"
+    received_data: asyncio.Event
+    active_connection: bool
+    last_var_set: float
+
+    # The value validation and ratelimit scheduling only depend on the configuration attributes, which are shared
+    _assert_valid_value = BaseCloud._assert_valid_value
+    _send_scheduler = BaseCloud._send_scheduler
+    next_send_wait = BaseCloud.next_send_wait
+
+    def __init__(
+        self,
+        *,
+        project_id: Optional[Union[int, str]] = None,
+        _session=None,
+        client_session: Optional[aiohttp.ClientSession] = None,
+    ):
+        self._session = _session
+        self.active_connection = False
+
+        self.websocket = None
+        self.client_session = client_session
+        self._owns_client_session = False
+        self.cloud_values = {}
+        self._splitter = PacketSplitter()
+        self.received_data = asyncio.Event()
+        self._subscribers: set[asyncio.Queue[Optional[cloud_activity.CloudActivity]]] = set()
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock = asyncio.Lock()
+        self._send_lock = asyncio.Lock()
+        self.last_var_set = 0.0
+        self._scheduler: Optional[ratelimit.CloudSendScheduler] = None
+        self._scheduler_lock = threading.Lock()
+
+        self.ws_shortterm_ratelimit = 0.06667
+        self.ws_longterm_ratelimit = 0.1
+        self.ws_timeout = 3
+        self.allow_non_numeric = False
+        self.length_limit = 100000
+        self.username = "scratchattach"
+        self.header = None
+        self.cookie = None
+        self.origin = None
+        self.print_connect_message = False
+
+        self.project_id = project_id
+
+    async def __aenter__(self) -> Self:
+        await self.connect()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[type[BaseException]] = None,
+        exc_val: Optional[BaseException] = None,
+        exc_tb: Optional[TracebackType] = None,
+    ) -> None:
+        await self.disconnect()
+
+    def _assert_auth(self):
+        if self._session is None:
+            raise exceptions.Unauthenticated(
+                "You need to use session.connect_async_scratch_cloud in order to perform this operation."
+            )
+
+    def _get_client_session(self) -> aiohttp.ClientSession:
+        if self.client_session is None or self.client_session.closed:
+            active = _active_async_session.get()
+            if active is not None:
+                return active.client_session
+            self.client_session = aiohttp.ClientSession()
+            self._owns_client_session = True
+        return self.client_session
+
+    def _handshake_headers(self) -> dict[str, str]:
+        headers = dict(self.header or {})
+        if isinstance(self.cookie, dict):
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookie.items())
+        elif self.cookie:
+            headers["Cookie"] = self.cookie
+        if self.origin:
+            headers["Origin"] = self.origin
+        return headers
+
+    async def _open(self):
+        if self.websocket is not None and not self.websocket.closed:
+            await self.websocket.close()
+        try:
+            self.websocket = await asyncio.wait_for(
+                self._get_client_session().ws_connect(
+                    self.cloud_host, headers=self._handshake_headers(), ssl=False, autoping=True
+                ),
+                self.ws_timeout,
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            raise exceptions.CloudConnectionError(f"Connecting to {self.cloud_host} failed: {e!r}") from e
+        self._splitter = PacketSplitter()
+        packet = {"method": "handshake", "user": self.username, "project_id": self.project_id}
+        await self.websocket.send_str(json.dumps(packet) + "\n")
+        self.active_connection = True
+        if self.print_connect_message:
+            print("Connected to cloud server ", self.cloud_host)
+
+    async def connect(self):
+        async with self._connect_lock:
+            await self._open()
+        if self._reader_task is None or self._reader_task.done():
+            self._reader_task = asyncio.create_task(self._read_forever())
+
+    async def _reconnect(self, stale_websocket: Optional[aiohttp.ClientWebSocketResponse]):
+        # Reconnects unless another task has already replaced the websocket
+        async with self._connect_lock:
+            if self.active_connection and self.websocket is stale_websocket:
+                await self._open()
+
+    async def disconnect(self):
+        self.active_connection = False
+        if self.websocket is not None:
+            await self.websocket.close()
+        task = self._reader_task
+        self._reader_task = None
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        for queue in self._subscribers:
+            queue.put_nowait(None)
+        if self._owns_client_session and self.client_session is not None:
+            await self.client_session.close()
+            self.client_session = None
+            self._owns_client_session = False
+
+    async def reconnect(self):
+        await self.disconnect()
+        await self.connect()
+
+    async def _read_forever(self):
+        failures = 0
+        while self.active_connection:
+            websocket = self.websocket
+            try:
+                assert websocket is not None
+                message = await websocket.receive()
+                if message.type == aiohttp.WSMsgType.TEXT:
+                    self._handle_text(message.data)
+                    failures = 0
+                    continue
+                if message.type == aiohttp.WSMsgType.BINARY:
+                    self._handle_text(message.data)
+                    failures = 0
+                    continue
+                if not self.active_connection:
+                    return
+                # The server closed the connection
+                await self._reconnect(websocket)
+            except asyncio.CancelledError:
+                raise
+            except exceptions.CloudConnectionError:
+                failures += 1
+                if failures == 5:
+                    print(f"Warning: {failures} subsequent cloud disconnects. Cloud {self.cloud_host} may be down.")
+                await asyncio.sleep(
+                    self._PACKET_FAILURE_SLEEPDURATIONS[min(failures, len(self._PACKET_FAILURE_SLEEPDURATIONS) - 1)]
+                )
+            except Exception:
+                traceback.print_exc()
+                await asyncio.sleep(self._PACKET_FAILURE_SLEEPDURATIONS[0])
+                with contextlib.suppress(exceptions.CloudConnectionError):
+                    await self._reconnect(websocket)
+
+    def _handle_text(self, text: Union[str, bytes]):
+        for data in self._splitter.feed(text):
+            if not isinstance(data, dict) or "name" not in data:
+                continue
+            activity = cloud_activity.CloudActivity(timestamp=time.time() * 1000, _session=self._session, cloud=self)
+            data["variable_name"] = data["name"]
+            data["name"] = data["variable_name"].replace("☁ ", "")
+            activity._update_from_dict(data)
+            if activity.type == "set":
+                self.cloud_values[activity.actual_var] = activity.value
+            self.received_data.set()
+            for queue in self._subscribers:
+                queue.put_nowait(activity)
+
+    async def _send(self, data: str, *, max_retries: int = 2):
+        for attempt in range(max_retries + 1):
+            websocket = self.websocket
+            try:
+                if websocket is None or websocket.closed:
+                    raise ConnectionResetError("Websocket is closed")
+                await websocket.send_str(data)
+                return
+            except (ConnectionError, aiohttp.ClientError):
+                if attempt == max_retries:
+                    break
+                sleep_duration = self._PACKET_FAILURE_SLEEPDURATIONS[
+                    min(attempt, len(self._PACKET_FAILURE_SLEEPDURATIONS) - 1)
+                ]
+                await asyncio.sleep(sleep_duration)
+                with contextlib.suppress(exceptions.CloudConnectionError):
+                    await self._reconnect(websocket)
+        raise exceptions.CloudConnectionError(f"Sending packet failed {max_retries + 1} tries: {data}")
+
+    async def _enforce_ratelimit(self, *, n: int) -> None:
+        sleep_time = self._send_scheduler().reserve(n)
+        if sleep_time > 0:
+            await asyncio.sleep(sleep_time)
+
+    def _set_packet(self, variable: str, value) -> dict[str, Any]:
+        return {
+            "method": "set",
+            "name": "☁ " + variable,
+            "value": value,
+            "user": self.username,
+            "project_id": self.project_id,
+        }
+
+    async def set_var(self, variable: str, value, *, max_retries: int = 2) -> None:
+        """
+        Sets a cloud variable.
+
+        Args:
+            variable (str): The name of the cloud variable that should be set (provided without the cloud emoji)
+            value (str): The value the cloud variable should be set to
+
+        Kwargs:
+            max_retries (int) : Maximum number of times to retry setting the var if setting fails before raising an exception
+        """
+        await self.set_vars({variable: value}, max_retries=max_retries)
+
+    async def set_vars(self, var_value_dict: dict[str, Any], *, intelligent_waits: bool = True, max_retries: int = 2):
+        """
+        Sets multiple cloud variables at once (works for an unlimited amount of variables).
+
+        Args:
+            var_value_dict (dict): variable:value dictionary with the variables / values to set. The dict should like this: {"var1":"value1", "var2":"value2", ...}
+
+        Kwargs:
+            intelligent_waits (boolean): When enabled, the method will automatically wait before performing this cloud variable set, to make sure no rate limits are triggered
+            max_retries (int) : Maximum number of times to retry setting the var if setting fails before raising an exception
+        """
+        packet_list = []
+        for variable, value in var_value_dict.items():
+            self._assert_valid_value(value)
+            if not isinstance(variable, str):
+                raise ValueError("cloud var name must be a string")
+            packet_list.append(self._set_packet(variable.removeprefix("☁ "), value))
+        if not self.active_connection:
+            await self.connect()
+
+        # Sets are serialized, so that concurrent callers can't both pass the ratelimit at the same time
+        async with self._send_lock:
+            if intelligent_waits:
+                await self._enforce_ratelimit(n=len(packet_list))
+            await self._send("".join(json.dumps(packet) + "\n" for packet in packet_list), max_retries=max_retries)
+            self.last_var_set = time.time()
+        for packet in packet_list:
+            self.cloud_values[packet["name"]] = packet["value"]
+
+    async def _wait_for_data(self):
+        if not self.active_connection:
+            await self.connect()
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self.received_data.wait(), timeout=1)
+
+    async def get_var(self, var: str):
+        """
+        Returns the value of a cloud variable, or None if the server hasn't sent a value for it.
+        """
+        await self._wait_for_data()
+        return self.cloud_values.get("☁ " + var.removeprefix("☁ "))
+
+    async def get_all_vars(self) -> dict[str, Any]:
+        await self._wait_for_data()
+        return self.cloud_values.copy()
+
+    def events(self) -> AsyncCloudEventStream:
+        """
+        Returns an async iterator that yields a CloudActivity object for every cloud activity received from the server,
+        until the cloud is disconnected. Any number of consumers can iterate over the events of the same cloud.
+
+        The iterator receives activity from the moment it is created, even before it is first awaited.
+        """
+        return AsyncCloudEventStream(self)
+
+
+class AsyncCloudEventStream(AsyncIterator[cloud_activity.CloudActivity]):
+    """
+    Async iterator over the activity of an AsyncBaseCloud, returned by AsyncBaseCloud.events(). It subscribes to the
+    cloud when it's created, so activity that arrives before the first __anext__ is kept. Call aclose() to unsubscribe
+    if you stop iterating early.
+    """
+
+    def __init__(self, cloud: AsyncBaseCloud, *, connect: bool = True, until_disconnect: bool = True):
+        """
+        Keyword Arguments:
+            connect: Whether the first __anext__ connects the cloud if it isn't connected
+            until_disconnect: Whether the iteration ends when the cloud is disconnected. If False, the stream keeps receiving the activity of the cloud after it reconnects.
+        """
+        self.cloud = cloud
+        self.connect = connect
+        self.until_disconnect = until_disconnect
+        self.closed = False
+        self._queue: asyncio.Queue[Optional[cloud_activity.CloudActivity]] = asyncio.Queue()
+        cloud._subscribers.add(self._queue)
+
+    def __aiter__(self) -> AsyncCloudEventStream:
+        return self
+
+    async def __anext__(self) -> cloud_activity.CloudActivity:
+        if self.closed:
+            raise StopAsyncIteration
+        if self.connect:
+            self.connect = False
+            if not self.cloud.active_connection:
+                await self.cloud.connect()
+        while (activity := await self._queue.get()) is None:
+            # The cloud was disconnected
+            if self.until_disconnect:
+                self.close()
+                raise StopAsyncIteration
+        return activity
+
+    def close(self) -> None:
+        self.closed = True
+        self.cloud._subscribers.discard(self._queue)
+
+    async def aclose(self) -> None:
+        self.close()
+
+
+class AsyncScratchCloud(AsyncBaseCloud):
+    def __init__(self, *, project_id, _session=None, client_session: Optional[aiohttp.ClientSession] = None):
+        super().__init__(project_id=project_id, _session=_session, client_session=client_session)
+
+        self.cloud_host = "wss://clouddata.scratch.mit.edu"
+        self.length_limit = 256
+        if self._session is not None:
+            self.username = self._session.username
+            self.cookie = "scratchsessionsid=" + self._session.id + ";"
+            self.origin = "https://scratch.mit.edu"
+
+    async def connect(self):
+        self._assert_auth()  # Connecting to Scratch's cloud websocket requires a login to the Scratch website
+        await super().connect()
+
+    async def set_vars(self, var_value_dict, *, intelligent_waits=True, max_retries: int = 2):
+        self._assert_auth()
+        await super().set_vars(var_value_dict, intelligent_waits=intelligent_waits, max_retries=max_retries)
+
+
+class AsyncTwCloud(AsyncBaseCloud):
+    def __init__(
+        self,
+        *,
+        project_id,
+        cloud_host="wss://clouddata.turbowarp.org",
+        purpose="",
+        contact="",
+        _session=None,
+        client_session: Optional[aiohttp.ClientSession] = None,
+    ):
+        super().__init__(project_id=project_id, _session=_session, client_session=client_session)
+
+        self.cloud_host = cloud_host
+        self.ws_shortterm_ratelimit = 0  # TurboWarp doesn't enforce a wait time between cloud variable sets
+        self.ws_longterm_ratelimit = 0
+        self.length_limit = 100000
+        purpose_string = ""
+        if purpose != "" or contact != "":
+            purpose_string = f" (Purpose:{purpose}; Contact:{contact})"
+        self.header = {"User-Agent": f"scratchattach/2.0.0{purpose_string}"}
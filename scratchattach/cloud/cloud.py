@@ -3,11 +3,13 @@
 from __future__ import annotations
 
 import warnings
+from collections.abc import Iterator
 from typing import Optional, Any
 
 from websocket import WebSocketBadStatusException
 
 from ._base import BaseCloud, LogCloud
+from . import log_tailer
 from scratchattach.utils.requests import requests
 from scratchattach.utils import exceptions, commons
 from scratchattach.site import cloud_activity
@@ -43,6 +45,14 @@ class ScratchCloud(LogCloud):
         self._assert_auth()
         super().set_vars(var_value_dict, intelligent_waits=intelligent_waits, max_retries=max_retries)
 
+    def _raw_logs(self, *, limit: int = 100, offset: int = 0) -> list[dict[str, Any]]:
+        try:
+            return requests.get(
+                f"https://clouddata.scratch.mit.edu/logs?projectid={self.project_id}&limit={limit}&offset={offset}", timeout=10
+            ).json()
+        except Exception as e:
+            raise exceptions.FetchError(str(e))
+
     def logs(self, *, filter_by_var_named=None, limit=100, offset=0) -> list[cloud_activity.CloudActivity]:
         """
         Gets the data from Scratch's clouddata logs.
@@ -54,18 +64,37 @@ class ScratchCloud(LogCloud):
             log_url (str): If you want to get the clouddata from a cloud log API different to Scratch's normal cloud log API, set this argument to the URL of the API. Only set this argument if you know what you are doing. If you want to get the clouddata from the normal API, don't put this argument.
         """
         try:
-            data = requests.get(
-                f"https://clouddata.scratch.mit.edu/logs?projectid={self.project_id}&limit={limit}&offset={offset}", timeout=10
-            ).json()
+            data = self._raw_logs(limit=limit, offset=offset)
             if filter_by_var_named is not None:
-                filter_by_var_named = filter_by_var_named.removeprefix("☁ ")
-                data = list(filter(lambda k: k["name"] == "☁ " + filter_by_var_named, data))
-            for x in data:
-                x["cloud"] = self
-            return commons.parse_object_list(data, cloud_activity.CloudActivity, self._session, "name")
+                name = "☁ " + filter_by_var_named.removeprefix("☁ ")
+                data = [entry for entry in data if entry["name"] == name]
+            return log_tailer.parse_log_entries(self, data)
         except Exception as e:
             raise exceptions.FetchError(str(e))
 
+    def iter_logs(
+        self, *, since: Optional[float] = None, filter_by_var_named=None, page_size=100, max_entries: Optional[int] = None
+    ) -> Iterator[cloud_activity.CloudActivity]:
+        """
+        Iterates over Scratch's clouddata logs, newest activity first. Pages are fetched while iterating.
+
+        Keyword Arguments:
+            since (float or None): Stops at activity that is older than this timestamp (in ms). If None, iterates over all logs.
+            filter_by_var_named (str or None): If you only want to get data for one cloud variable, set this argument to its name.
+            page_size (int): Amount of activity fetched per request.
+            max_entries (int or None): Max. amount of log entries to go through.
+        """
+        name = None if filter_by_var_named is None else "☁ " + filter_by_var_named.removeprefix("☁ ")
+        for entry in log_tailer.iter_log_entries(self, since=since, page_size=page_size, max_entries=max_entries):
+            if name is None or entry["name"] == name:
+                yield from log_tailer.parse_log_entries(self, [entry])
+
+    def tail_logs(self, *, min_page_size=10, max_page_size=1000) -> log_tailer.CloudLogTailer:
+        """
+        Returns a CloudLogTailer, which returns the activity that was added to the logs since its last poll.
+        """
+        return log_tailer.CloudLogTailer(self, min_page_size=min_page_size, max_page_size=max_page_size)
+
     def get_var(self, var, *, recorder_initial_values: Optional[dict[str, Any]] = None, use_logs=False):
         var = var.removeprefix("☁ ")
         if self._session is None or use_logs:
@@ -74,11 +103,7 @@ class ScratchCloud(LogCloud):
                 return None
             return filtered[0].value
         else:
-            if self.recorder is None:
-                initial_values = self.get_all_vars(use_logs=True)
-                return super().get_var("☁ " + var, recorder_initial_values=initial_values)
-            else:
-                return super().get_var("☁ " + var, recorder_initial_values=recorder_initial_values)
+            return super().get_var("☁ " + var, recorder_initial_values=recorder_initial_values)
 
     def get_all_vars(self, *, recorder_initial_values: Optional[dict[str, Any]] = None, use_logs=False):
         if self._session is None or use_logs:
@@ -89,11 +114,21 @@ class ScratchCloud(LogCloud):
                 clouddata[activity.name] = activity.value
             return clouddata
         else:
-            if self.recorder is None:
-                initial_values = self.get_all_vars(use_logs=True)
-                return super().get_all_vars(recorder_initial_values=initial_values)
-            else:
-                return super().get_all_vars(recorder_initial_values=recorder_initial_values)
+            return super().get_all_vars(recorder_initial_values=recorder_initial_values)
+
+    def _fetch_initial_values(self):
+        return self.get_all_vars(use_logs=True)
+
+    def _activity_since(self, timestamp: float) -> list[cloud_activity.CloudActivity]:
+        activity: list[cloud_activity.CloudActivity] = []
+        try:
+            for _a in self.iter_logs(since=timestamp, max_entries=1000):
+                if _a.timestamp > timestamp:
+                    activity.append(_a)
+        except exceptions.FetchError:
+            pass
+        activity.reverse()
+        return activity
 
     def events(self, *, use_logs=False):
         if self._session is None or use_logs:
@@ -0,0 +1,311 @@
+"""CloudPool class (runs the clouds of many projects on one event loop)"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import queue
+import threading
+import time
+from collections.abc import Coroutine, Iterator
+from typing import Optional, Union, Any, TypeVar
+
+import aiohttp
+
+from ._base import AnyCloud, EventStream
+from .async_cloud import AsyncBaseCloud, AsyncCloudEventStream
+from scratchattach.eventhandlers._base import BaseEventHandler
+
+R = TypeVar("R")
+
+
+class PooledEventStream(EventStream):
+    """
+    Event stream of a PooledCloud. Packets are put into the stream by the pool's event loop, so reading from it
+    doesn't need a websocket of its own.
+    """
+
+    packets: queue.SimpleQueue[dict[str, Any]]
+
+    def __init__(self, cloud: PooledCloud):
+        self.cloud = cloud
+        self.packets = queue.SimpleQueue()
+        self.closed = False
+
+    def read(self, amount: int = -1) -> Iterator[dict[str, Any]]:
+        # amount == -1: yields all packets that arrive until the stream is empty (waiting at most timeout seconds for
+        # the first one), otherwise yields up to amount packets
+        i = 0
+        while not self.closed and (amount == -1 or i < amount):
+            try:
+                yield self.packets.get(timeout=self.timeout if (i == 0 or amount != -1) else 0)
+            except queue.Empty:
+                return
+            i += 1
+
+    def close(self) -> None:
+        self.closed = True
+        self.cloud._streams.discard(self)
+
+
+class PooledCloudEvents(BaseEventHandler):
+    """
+    Calls events on cloud activity of a PooledCloud. Unlike CloudEvents, it doesn't need a thread of its own:
+    the events of all projects in a CloudPool are called by the pool's dispatcher thread.
+    """
+
+    def __init__(self, cloud: PooledCloud):
+        super().__init__()
+        self.cloud = cloud
+        self._session = cloud._session
+
+    def start(self, *, thread=True, ignore_exceptions=True):
+        """
+        Starts the event handler.
+
+        Keyword Arguments:
+            thread (bool): If False, this method blocks until the event handler is stopped.
+            ignore_exceptions (bool): Whether to catch exceptions that happen in individual events
+        """
+        if self.running:
+            return
+        self.ignore_exceptions = ignore_exceptions
+        self.running = True
+        self.cloud._handlers.add(self)
+        self.cloud._pool._dispatch(self, "on_ready", [])
+        if not thread:
+            self._updater()
+
+    def _updater(self):
+        while self.running:
+            time.sleep(0.1)
+
+    def stop(self, wait_call_threads: bool = True):
+        self.cloud._handlers.discard(self)
+        super().stop(wait_call_threads)
+
+    def disconnect(self):
+        self.stop()
+
+
+class PooledCloud(AnyCloud[Union[str, int]]):
+    """
+    Synchronous view on one cloud of a CloudPool, with the same methods as the other cloud classes.
+    """
+
+    def __init__(self, pool: CloudPool, async_cloud: AsyncBaseCloud):
+        self._pool = pool
+        self.async_cloud = async_cloud
+        self._handlers: set[PooledCloudEvents] = set()
+        self._streams: set[PooledEventStream] = set()
+        self._forwarder: Optional[asyncio.Task] = None
+
+    @property
+    def project_id(self):
+        return self.async_cloud.project_id
+
+    @property
+    def cloud_host(self) -> str:
+        return self.async_cloud.cloud_host
+
+    @property
+    def _session(self):
+        return self.async_cloud._session
+
+    @property
+    def active_connection(self) -> bool:
+        return self.async_cloud.active_connection
+
+    def _run(self, coroutine: Coroutine[Any, Any, R]) -> R:
+        return self._pool._run(coroutine)
+
+    def connect(self):
+        self._pool._run(self._pool._connect(self))
+
+    def disconnect(self):
+        self._pool._run(self.async_cloud.disconnect())
+
+    def reconnect(self):
+        self._run(self.async_cloud.reconnect())
+
+    def _enforce_ratelimit(self, *, n: int) -> None:
+        self._pool._run(self.async_cloud._enforce_ratelimit(n=n))
+
+    def set_var(self, variable, value, *, max_retries: int = 2) -> None:
+        self._run(self.async_cloud.set_var(variable, value, max_retries=max_retries))
+
+    def set_vars(self, var_value_dict, *, intelligent_waits: bool = True, max_retries: int = 2):
+        self._run(
+            self.async_cloud.set_vars(var_value_dict, intelligent_waits=intelligent_waits, max_retries=max_retries)
+        )
+
+    def get_var(self, var, *, recorder_initial_values: Optional[dict[str, Any]] = None):
+        if recorder_initial_values:
+            for name, value in recorder_initial_values.items():
+                self.async_cloud.cloud_values.setdefault(name, value)
+        return self._run(self.async_cloud.get_var(var))
+
+    def get_all_vars(self, *, recorder_initial_values: Optional[dict[str, Any]] = None):
+        if recorder_initial_values:
+            for name, value in recorder_initial_values.items():
+                self.async_cloud.cloud_values.setdefault(name, value)
+        return self._run(self.async_cloud.get_all_vars())
+
+    def events(self) -> PooledCloudEvents:  # type: ignore[override]
+        return PooledCloudEvents(self)
+
+    def create_event_stream(self) -> PooledEventStream:
+        stream = PooledEventStream(self)
+        self._streams.add(stream)
+        return stream
+
+
+class CloudPool:
+    """
+    Manages the clouds of many projects in one process.
+
+    All websockets are run by one asyncio event loop in one background thread, and the events of all clouds are called
+    by one dispatcher thread. Reconnecting, ratelimiting and the handshake are handled by the AsyncBaseCloud
+    of each project, so a pool of 300 projects needs 300 sockets and 2 threads.
+
+    Example:
+        with sa.CloudPool() as pool:
+            cloud = pool.add(sa.AsyncTwCloud(project_id=123))
+            cloud.set_var("var", 5)
+            events = cloud.events()
+
+            @events.event
+            def on_set(activity):
+                print(activity.var, activity.value)
+
+            events.start()
+    """
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, name="CloudPool-loop", daemon=True)
+        self._loop_thread.start()
+        self._clouds: dict[tuple[str, str], PooledCloud] = {}
+        self._client_session: Optional[aiohttp.ClientSession] = None
+        self._calls: queue.SimpleQueue[Optional[tuple[BaseEventHandler, str, list]]] = queue.SimpleQueue()
+        self._dispatcher_thread = threading.Thread(target=self._dispatch_forever, name="CloudPool-dispatcher", daemon=True)
+        self._dispatcher_thread.start()
+        self.closed = False
+
+    def __enter__(self) -> CloudPool:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _run(self, coroutine: Coroutine[Any, Any, R], timeout: Optional[float] = None) -> R:
+        if threading.current_thread() is self._loop_thread:
+            raise RuntimeError("Blocking PooledCloud methods can't be called from the pool's event loop")
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(timeout)
+
+    def _dispatch(self, handler: BaseEventHandler, event_name: str, args: list) -> None:
+        self._calls.put((handler, event_name, args))
+
+    def _dispatch_forever(self):
+        while (call := self._calls.get()) is not None:
+            handler, event_name, args = call
+            if handler.running:
+                handler.call_event(event_name, args)
+
+    async def _connect(self, cloud: PooledCloud):
+        if cloud.async_cloud.client_session is None:
+            # All clouds of the pool share one aiohttp session
+            if self._client_session is None:
+                self._client_session = aiohttp.ClientSession()
+            cloud.async_cloud.client_session = self._client_session
+        await cloud.async_cloud.connect()
+
+    async def _start_forwarder(self, cloud: PooledCloud):
+        # The stream is subscribed before the cloud connects and stays subscribed across reconnects, so no activity
+        # is lost between two connections
+        events = AsyncCloudEventStream(cloud.async_cloud, connect=False, until_disconnect=False)
+        cloud._forwarder = asyncio.create_task(self._forward(cloud, events))
+
+    async def _stop_forwarder(self, cloud: PooledCloud):
+        if cloud._forwarder is not None:
+            cloud._forwarder.cancel()
+            cloud._forwarder = None
+
+    async def _forward(self, cloud: PooledCloud, events: AsyncCloudEventStream):
+        try:
+            async for activity in events:
+                activity = copy.copy(activity)
+                activity.cloud = cloud
+                for handler in list(cloud._handlers):
+                    self._dispatch(handler, f"on_{activity.type}", [activity])
+                if cloud._streams:
+                    packet = {"method": activity.type, "name": activity.actual_var, "value": activity.value}
+                    for stream in list(cloud._streams):
+                        stream.packets.put(packet)
+        finally:
+            events.close()
+
+    @staticmethod
+    def _key(async_cloud: AsyncBaseCloud) -> tuple[str, str]:
+        return async_cloud.cloud_host, str(async_cloud.project_id)
+
+    def add(self, async_cloud: AsyncBaseCloud, *, connect: bool = True) -> PooledCloud:
+        """
+        Adds a cloud to the pool.
+
+        Args:
+            async_cloud: The cloud to add, for example an AsyncTwCloud or the AsyncScratchCloud returned by session.connect_async_scratch_cloud
+
+        Keyword Arguments:
+            connect: Whether to connect to the cloud immediately (otherwise the first operation on it connects)
+
+        Returns:
+            PooledCloud: An object with the same methods as the other cloud classes. If a cloud with the same host and project id is already in the pool, that one is returned.
+        """
+        key = self._key(async_cloud)
+        if key in self._clouds:
+            return self._clouds[key]
+        cloud = PooledCloud(self, async_cloud)
+        self._clouds[key] = cloud
+        self._run(self._start_forwarder(cloud))
+        if connect:
+            cloud.connect()
+        return cloud
+
+    def get(self, project_id: Union[str, int], *, cloud_host: Optional[str] = None) -> Optional[PooledCloud]:
+        for (host, pooled_project_id), cloud in self._clouds.items():
+            if pooled_project_id == str(project_id) and (cloud_host is None or host == cloud_host):
+                return cloud
+        return None
+
+    def remove(self, cloud: PooledCloud) -> None:
+        self._clouds.pop(self._key(cloud.async_cloud), None)
+        for handler in list(cloud._handlers):
+            handler.stop(wait_call_threads=False)
+        for stream in list(cloud._streams):
+            stream.close()
+        cloud.disconnect()
+        self._run(self._stop_forwarder(cloud))
+
+    def __iter__(self) -> Iterator[PooledCloud]:
+        return iter(list(self._clouds.values()))
+
+    def __len__(self) -> int:
+        return len(self._clouds)
+
+    def close(self) -> None:
+        """
+        Disconnects all clouds and stops the pool's threads.
+        """
+        if self.closed:
+            return
+        for cloud in list(self._clouds.values()):
+            self.remove(cloud)
+        self.closed = True
+        if self._client_session is not None:
+            self._run(self._client_session.close())
+        self._calls.put(None)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join()
+        self._dispatcher_thread.join()
+        self._loop.close()
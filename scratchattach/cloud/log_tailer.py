@@ -0,0 +1,144 @@
+"""CloudLogTailer class (reads new activity from a cloud's clouddata logs)"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from typing import Optional, Any, TYPE_CHECKING
+
+from scratchattach.site import cloud_activity
+from scratchattach.utils import commons
+
+if TYPE_CHECKING:
+    from ._base import LogCloud
+
+LogCursor = tuple[float, str, Any]
+
+
+def _log_key(entry: dict[str, Any]) -> LogCursor:
+    return entry["timestamp"], entry["name"], entry["value"]
+
+
+def parse_log_entries(cloud: LogCloud, entries) -> list[cloud_activity.CloudActivity]:
+    entries = list(entries)
+    for entry in entries:
+        entry["cloud"] = cloud
+    return commons.parse_object_list(entries, cloud_activity.CloudActivity, cloud._session, "name")
+
+
+def iter_log_entries(
+    cloud: LogCloud,
+    *,
+    since: Optional[float] = None,
+    page_size: int = 100,
+    max_entries: Optional[int] = None,
+    offset: int = 0,
+) -> Iterator[dict[str, Any]]:
+    """
+    Yields the raw entries of a cloud's logs, newest first, until reaching activity older than since (in ms).
+    """
+    yielded = 0
+    # Activity that happens while paging shifts the offsets, so the entries at the start of a page may already have
+    # been yielded as the end of the previous page
+    oldest: Optional[float] = None
+    keys_at_oldest: set[LogCursor] = set()
+    while max_entries is None or yielded < max_entries:
+        page = cloud._raw_logs(limit=page_size, offset=offset)
+        for entry in page:
+            timestamp = entry["timestamp"]
+            if since is not None and timestamp < since:
+                return
+            key = _log_key(entry)
+            if oldest is not None and (timestamp > oldest or key in keys_at_oldest):
+                continue
+            if timestamp != oldest:
+                oldest = timestamp
+                keys_at_oldest.clear()
+            keys_at_oldest.add(key)
+            yield entry
+            yielded += 1
+            if max_entries is not None and yielded >= max_entries:
+                return
+        if len(page) < page_size:
+            return
+        offset += page_size
+
+
+class CloudLogTailer:
+    """
+    Fetches the activity that was added to a cloud's logs since the last poll.
+
+    The tailer remembers the newest entry it has seen (its timestamp, name and value) and only parses entries that are
+    newer. While the project is idle, it requests small pages. If the newest entry it knows isn't on a page
+    (because more activity happened since the last poll than fits on one page), the page size is widened and the logs
+    are read until reaching that entry, so no activity is lost during bursts.
+    """
+
+    cursor: Optional[LogCursor]
+    "Timestamp, name and value of the newest log entry the tailer has seen"
+    page_size: int
+    "Number of entries requested by the next poll"
+
+    def __init__(self, cloud: LogCloud, *, min_page_size: int = 10, max_page_size: int = 1000):
+        self.cloud = cloud
+        self.min_page_size = min_page_size
+        self.max_page_size = max_page_size
+        self.page_size = min_page_size
+        self.cursor = None
+
+    def prime(self) -> None:
+        """
+        Sets the cursor to the newest log entry, so that the next poll only returns activity that happens after now.
+        """
+        page = self.cloud._raw_logs(limit=1, offset=0)
+        if page:
+            self.cursor = _log_key(page[0])
+
+    def _new_entries(self, page: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], bool]:
+        # Returns the entries of the page that are newer than the cursor and whether the cursor was reached
+        if self.cursor is None:
+            return page, True
+        cursor_timestamp = self.cursor[0]
+        for i, entry in enumerate(page):
+            if entry["timestamp"] < cursor_timestamp or _log_key(entry) == self.cursor:
+                return page[:i], True
+        return page, False
+
+    def poll_raw(self) -> list[dict[str, Any]]:
+        """
+        Returns the raw log entries that were added since the last poll, oldest first.
+        """
+        page = self.cloud._raw_logs(limit=self.page_size, offset=0)
+        new, reached_cursor = self._new_entries(page)
+        while not reached_cursor and len(page) >= self.page_size:
+            if self.page_size < self.max_page_size:
+                # A gap: more activity happened than fits on a page. Re-read the newest entries with a wider page
+                self.page_size = min(self.page_size * 4, self.max_page_size)
+                page = self.cloud._raw_logs(limit=self.page_size, offset=0)
+                new, reached_cursor = self._new_entries(page)
+                continue
+            # The page can't get wider, so read the following pages until reaching the cursor
+            known = {_log_key(entry) for entry in new}
+            assert self.cursor is not None
+            for entry in iter_log_entries(
+                self.cloud, since=self.cursor[0], page_size=self.page_size, offset=len(page)
+            ):
+                key = _log_key(entry)
+                if key == self.cursor:
+                    break
+                if key not in known:
+                    known.add(key)
+                    new.append(entry)
+            break
+        if len(new) * 4 < self.page_size and self.page_size > self.min_page_size:
+            # Shrink the page again once the burst is over
+            self.page_size = max(self.page_size // 2, self.min_page_size)
+        if new:
+            self.cursor = _log_key(new[0])
+        new.reverse()
+        return new
+
+    def poll(self) -> list[cloud_activity.CloudActivity]:
+        """
+        Returns the cloud activity that was added to the logs since the last poll, oldest first.
+        """
+        return parse_log_entries(self.cloud, self.poll_raw())
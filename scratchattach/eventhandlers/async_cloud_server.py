@@ -0,0 +1,337 @@
+"""AsyncTwCloudServer class (asyncio engine of the cloud server returned by init_cloud_server)"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+import traceback
+from collections import deque
+from typing import Any, Optional
+
+from aiohttp import web, WSMsgType, WSCloseCode
+
+from scratchattach.site.user import User
+from scratchattach.utils import exceptions
+from ._base import BaseEventHandler
+from .cloud_server import BaseCloudServer
+
+logger = logging.getLogger("scratchattach.cloud_server")
+
+CLOSE_INVALID = 4002
+
+
+class AsyncTwCloudClient:
+    """
+    A client connected to an AsyncTwCloudServer.
+
+    Messages sent to the client are put into its write buffer and sent by a writer task of its own, so a slow client
+    never delays the other clients. Sets that pile up while the client is busy are sent together in one frame
+    (separated by newlines, like TurboWarp does). If the buffer grows past the server's max_buffer_size, the client is
+    considered too slow and is disconnected.
+    """
+
+    address: tuple[str, int]
+    username: Optional[str]
+    project_id: Optional[str]
+    buffer: deque[tuple[str, bool]]
+    "Messages waiting to be sent, and whether they may share a frame with other messages"
+    buffered_size: int
+    "Total length of the messages in the buffer"
+
+    def __init__(self, server: AsyncTwCloudServer, websocket: web.WebSocketResponse, address: tuple[str, int]):
+        self.server = server
+        self.websocket = websocket
+        self.address = address
+        self.username = None
+        self.project_id = None
+        self.buffer = deque()
+        self.buffered_size = 0
+        self._has_data = asyncio.Event()
+        self._writer_task: Optional[asyncio.Task] = None
+        self._close_code: Optional[int] = None
+
+    def __repr__(self) -> str:
+        return f"<AsyncTwCloudClient {self.address[0]}:{self.address[1]} user={self.username!r} project={self.project_id!r}>"
+
+    def _log_extra(self, **kwargs) -> dict[str, Any]:
+        return {"address": f"{self.address[0]}:{self.address[1]}", "user": self.username, "project_id": self.project_id} | kwargs
+
+    def sendMessage(self, message: str, *, coalesce: bool = True) -> bool:
+        """
+        Queues a message for sending. Returns False if the client was disconnected because its buffer is full.
+
+        Keyword Arguments:
+            coalesce: Whether the message may be sent in one frame with other messages. TurboWarp parses every line of a frame as JSON, so messages that aren't JSON need a frame of their own.
+        """
+        if self.websocket.closed or self._close_code is not None:
+            return False
+        self.buffer.append((message, coalesce))
+        self.buffered_size += len(message)
+        if self.buffered_size > self.server.max_buffer_size:
+            logger.warning(
+                "slow client disconnected: %d buffered", self.buffered_size,
+                extra=self._log_extra(event="slow_client", buffered=self.buffered_size),
+            )
+            self.buffer.clear()
+            self.buffered_size = 0
+            self.close(WSCloseCode.TRY_AGAIN_LATER)
+            return False
+        self._has_data.set()
+        return True
+
+    def close(self, code: int = WSCloseCode.OK):
+        """
+        Closes the connection once the messages that are already in the buffer are sent.
+        """
+        if self._close_code is None:
+            self._close_code = code
+            self._has_data.set()
+
+    def _next_frame(self) -> str:
+        # Takes the next message from the buffer, joined with the messages after it that may share its frame
+        message, coalesce = self.buffer.popleft()
+        self.buffered_size -= len(message)
+        if not coalesce:
+            return message
+        messages = [message]
+        while self.buffer and self.buffer[0][1]:
+            message = self.buffer.popleft()[0]
+            self.buffered_size -= len(message)
+            messages.append(message)
+        return "\n".join(messages)
+
+    async def _write_forever(self):
+        try:
+            while not self.websocket.closed:
+                await self._has_data.wait()
+                self._has_data.clear()
+                while self.buffer:
+                    await self.websocket.send_str(self._next_frame())
+                if self._close_code is not None:
+                    await self.websocket.close(code=self._close_code)
+                    return
+        except (ConnectionError, RuntimeError):
+            # The connection was lost, the reader notices it as well
+            pass
+
+
+class AsyncTwCloudServer(BaseCloudServer):
+    """
+    Cloud server for TurboWarp's ?cloud_host URL parameter, running on an asyncio event loop (in its own thread).
+    Has the same events (on_connect, on_handshake, on_set, on_disconnect) and methods as TwCloudServer.
+
+    Events are called on the server's event loop, so an event that blocks delays all clients. Use
+    @server.event(thread=True) for slow events.
+
+    Instead of printing, the server logs to the "scratchattach.cloud_server" logger. Log records have address,
+    user, project_id and event attributes.
+    """
+
+    project_clients: dict[str, dict[tuple[str, int], AsyncTwCloudClient]]
+    max_buffer_size: int
+    "Max. length of the messages waiting to be sent to one client. Clients with more pending data are disconnected."
+
+    def __init__(
+        self,
+        hostname,
+        *,
+        port,
+        length_limit=None,
+        allow_non_numeric=True,
+        whitelisted_projects=None,
+        allow_nonscratch_names=True,
+        blocked_ips=None,
+        sync_players=True,
+        log_var_sets=True,
+        max_buffer_size=1_000_000,
+    ):
+        super().__init__(
+            hostname,
+            port=port,
+            length_limit=length_limit,
+            allow_non_numeric=allow_non_numeric,
+            whitelisted_projects=whitelisted_projects,
+            allow_nonscratch_names=allow_nonscratch_names,
+            blocked_ips=blocked_ips,
+            sync_players=sync_players,
+            log_var_sets=log_var_sets,
+        )
+        self.max_buffer_size = max_buffer_size
+
+        self.serving = threading.Event()
+        "Set once the server accepts connections"
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    def _in_loop(self, function, *args, **kwargs):
+        # Public methods may be called from any thread, but clients may only be touched by the loop's thread
+        if self._loop is not None and self._loop.is_running() and threading.current_thread() is not self._loop_thread:
+            self._loop.call_soon_threadsafe(lambda: function(*args, **kwargs))
+        else:
+            function(*args, **kwargs)
+
+    def check_for_ip_ban(self, client: AsyncTwCloudClient) -> bool:
+        if self._is_ip_banned(client.address):
+            client.sendMessage("You have been banned from this server", coalesce=False)
+            client.close(CLOSE_INVALID)
+            logger.info("IP-banned client was disconnected", extra=client._log_extra(event="banned"))
+            return True
+        return False
+
+    def _broadcast(self, project_id, message, *, skip=None):
+        self._in_loop(self._broadcast_in_loop, str(project_id), message, skip=skip)
+
+    def _broadcast_in_loop(self, project_id: str, message: str, *, skip=None):
+        # The message is serialized once and shared by the write buffers of all recipients
+        for client in list(self.project_clients.get(project_id, {}).values()):
+            if client is not skip:
+                client.sendMessage(message)
+
+    def _handle_set(self, client: AsyncTwCloudClient, data: dict):
+        # TurboWarp's client doesn't repeat the project id and username in sets, they're known from the handshake
+        project_id = str(data.get("project_id", client.project_id))
+        username = data.get("user", client.username)
+        if client.project_id is None:
+            logger.info("set before handshake", extra=client._log_extra(event="invalid_set"))
+            return
+        if self.whitelisted_projects is not None and project_id not in self.whitelisted_projects:
+            client.close(CLOSE_INVALID)
+            logger.info(
+                "set on non-whitelisted project, disconnected", extra=client._log_extra(event="not_whitelisted")
+            )
+            return
+        if not self._check_value(data["value"]):
+            if self.log_var_sets:
+                logger.info("invalid var value", extra=client._log_extra(event="invalid_value"))
+            return
+        if self.log_var_sets:
+            logger.info(
+                "set %s to %s", data["name"], data["value"],
+                extra=client._log_extra(event="set", var=data["name"], value=data["value"]),
+            )
+        self.set_var(project_id, data["name"], data["value"], user=username, skip_forward=client)
+        # raise event
+        _a = self._set_activity(username, project_id, data["name"], data["value"])
+        self.call_event("on_set", [_a, client])
+
+    async def _handle_handshake(self, client: AsyncTwCloudClient, data: dict):
+        if "user" not in data or "project_id" not in data:
+            logger.info("handshake without username or project id", extra=client._log_extra(event="invalid_handshake"))
+            client.close(CLOSE_INVALID)
+            return
+        username = data["user"]
+        project_id = str(data["project_id"])
+        if self.allow_nonscratch_names is False:
+            # Checking the username makes a request, so it's done in a worker thread
+            exists = await asyncio.get_running_loop().run_in_executor(None, User(username=username).does_exist)
+            if not exists:
+                logger.info(
+                    "handshake with a username not existing on Scratch",
+                    extra=client._log_extra(event="invalid_username", user=username),
+                )
+                client.close(CLOSE_INVALID)
+                return
+        if self.whitelisted_projects is not None and project_id not in self.whitelisted_projects:
+            logger.info(
+                "handshake on a non-whitelisted project",
+                extra=client._log_extra(event="not_whitelisted", user=username, project_id=project_id),
+            )
+            client.close(CLOSE_INVALID)
+            return
+        client.project_id = self._register_handshake(client, username, project_id)
+        client.username = username
+        logger.info("handshaked", extra=client._log_extra(event="handshake"))
+        # send current cloud variable values to the user who handshaked
+        message = self._handshake_message(client.project_id)
+        if message is not None:
+            client.sendMessage(message)
+        client.sendMessage("This server uses @TimMcCool's scratchattach 2.0.0", coalesce=False)
+        # raise event
+        self.call_event("on_handshake", [username, client.project_id, client])
+
+    async def _handle_message(self, client: AsyncTwCloudClient, text: str):
+        for line in text.split("\n"):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+                if data["method"] == "set":
+                    self._handle_set(client, data)
+                elif data["method"] == "handshake":
+                    await self._handle_handshake(client, data)
+                else:
+                    logger.info(
+                        "message without a valid method (set, handshake)", extra=client._log_extra(event="invalid_method")
+                    )
+            except Exception:
+                logger.exception("internal error while handling a message", extra=client._log_extra(event="error"))
+
+    async def _handle_connection(self, request: web.Request) -> web.WebSocketResponse:
+        websocket = web.WebSocketResponse(autoping=True)
+        await websocket.prepare(request)
+        peername = request.transport.get_extra_info("peername") if request.transport is not None else None
+        address = (peername[0], peername[1]) if peername else (request.remote or "", 0)
+        client = AsyncTwCloudClient(self, websocket, address)
+        client._writer_task = asyncio.create_task(client._write_forever())
+        if self.check_for_ip_ban(client):
+            await client._writer_task
+            return websocket
+        self.tw_clients[address] = {"client": client, "username": None, "project_id": None}
+        try:
+            logger.info("connected", extra=client._log_extra(event="connect"))
+            self.call_event("on_connect", [client])
+            async for message in websocket:
+                if message.type != WSMsgType.TEXT or not self.running:
+                    continue
+                await self._handle_message(client, message.data)
+        finally:
+            self._unregister(client)
+            client._writer_task.cancel()
+            if not websocket.closed:
+                await websocket.close()
+            # raise event
+            self.call_event("on_disconnect", [client.username, client.project_id, client])
+            logger.info("disconnected", extra=client._log_extra(event="disconnect"))
+        return websocket
+
+    async def _serve(self):
+        app = web.Application()
+        app.router.add_get("/", self._handle_connection)
+        self._runner = web.AppRunner(app, handle_signals=False)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.hostname, self.port)
+        await site.start()
+        if self.port == 0:
+            self.port = self._runner.addresses[0][1]
+        logger.info("serving websocket server: ws://%s:%s", self.hostname, self.port, extra={"event": "serve"})
+        self.serving.set()
+
+    def _updater(self):
+        # Function called when .start() is executed (.start is inherited from BaseEventHandler)
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.current_thread()
+        try:
+            self._loop.run_until_complete(self._serve())
+            self._loop.run_forever()
+        except Exception as e:
+            traceback.print_exc()
+            raise exceptions.WebsocketServerError(str(e))
+        finally:
+            if self._runner is not None:
+                self._loop.run_until_complete(self._runner.cleanup())
+            self._loop.close()
+            self.serving.clear()
+
+    def pause(self):
+        self.running = False
+
+    def resume(self):
+        self.running = True
+
+    def stop(self, wait_call_threads: bool = True):
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        BaseEventHandler.stop(self, wait_call_threads)
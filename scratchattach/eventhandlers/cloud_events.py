@@ -7,6 +7,7 @@ from typing import cast
 import traceback
 
 from scratchattach.cloud import _base
+from scratchattach.cloud.log_tailer import CloudLogTailer
 from ._base import BaseEventHandler
 from scratchattach.utils import exceptions
 from scratchattach.site import cloud_activity
@@ -93,23 +94,24 @@ class ManualCloudLogEvents:
         self._session = cloud._session
         self.last_timestamp = 0
         self.subsequent_failed_log_fetches = 0
+        # The first poll fetches 25 entries, like the log events did before adaptive paging
+        self.tailer = CloudLogTailer(cloud, min_page_size=25)
 
     def update(self) -> Iterator[tuple[str, list[cloud_activity.CloudActivity]]]:
         """Update once and yield all packets"""
         try:
-            data = self.source_cloud.logs(limit=25)
-            self.subsequent_failed_log_fetches = 0
-            for _a in data[::-1]:
-                if _a.timestamp <= self.last_timestamp:
-                    continue
-                self.last_timestamp = int(_a.timestamp)
-                yield ("on_" + _a.type, [_a])
+            data = self.tailer.poll()
         except Exception:
             self.subsequent_failed_log_fetches += 1
             if self.subsequent_failed_log_fetches == 20:
                 print(
                     "Warning: 20 subsequent clouddata log fetches failed. Scrach's cloud logs may be down, causing CloudLogEvents to not call events."
                 )
+            return
+        self.subsequent_failed_log_fetches = 0
+        for _a in data:
+            self.last_timestamp = int(_a.timestamp)
+            yield ("on_" + _a.type, [_a])
 
 
 class CloudLogEvents(BaseEventHandler):
@@ -127,14 +129,11 @@ class CloudLogEvents(BaseEventHandler):
         self.manual_cloud_log_events = ManualCloudLogEvents(cloud)
 
     def _updater(self):
+        # Only activity that happens after the event handler was started calls events
         try:
-            logs = self.source_cloud.logs(limit=25)
+            self.manual_cloud_log_events.tailer.prime()
         except exceptions.FetchError:
-            logs = []
-
-        self.last_timestamp = 0
-        if len(logs) != 0:
-            self.last_timestamp = logs[0].timestamp
+            pass
 
         self.call_event("on_ready")
 
@@ -0,0 +1,198 @@
+"""CloudHistory class (stores every recorded cloud activity for later queries)"""
+from __future__ import annotations
+
+import bisect
+import json
+import sqlite3
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Optional, Any, Union
+
+from scratchattach.site import cloud_activity
+
+
+def _full_name(var: str) -> str:
+    return "☁ " + var.removeprefix("☁ ")
+
+
+class _VarHistory:
+    # Timestamps and values of one variable, sorted by time
+    __slots__ = ("timestamps", "values", "usernames")
+
+    def __init__(self):
+        self.timestamps: list[float] = []
+        self.values: list[Any] = []
+        self.usernames: list[str] = []
+
+    def insert(self, timestamp: float, value: Any, username: str):
+        if not self.timestamps or timestamp >= self.timestamps[-1]:
+            # Activity almost always arrives in order, so this is the common case
+            self.timestamps.append(timestamp)
+            self.values.append(value)
+            self.usernames.append(username)
+            return
+        i = bisect.bisect_right(self.timestamps, timestamp)
+        self.timestamps.insert(i, timestamp)
+        self.values.insert(i, value)
+        self.usernames.insert(i, username)
+
+    def trim(self, max_entries: int):
+        excess = len(self.timestamps) - max_entries
+        if excess > 0:
+            del self.timestamps[:excess]
+            del self.values[:excess]
+            del self.usernames[:excess]
+
+
+class CloudHistory:
+    """
+    Append-only, time-indexed store of cloud variable sets. Attach it to a cloud with `cloud.record_history()` to record
+    every set the cloud's recorder receives, then query it without making any requests.
+
+    Without a path, the history is kept in memory and only the newest max_entries sets of each variable are kept.
+    With a path, the history is stored in an SQLite file, which can be shared by the histories of multiple clouds.
+    All timestamps are in milliseconds, like CloudActivity.timestamp.
+    """
+
+    max_entries: int
+    "Maximum number of sets kept per variable (in memory only)"
+    key: str
+    "Identifies the cloud in a shared SQLite file"
+    commit_interval: float
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, *, key: str = "", max_entries: int = 100_000):
+        self.key = key
+        self.max_entries = max_entries
+        self.commit_interval = 1.0
+        self._lock = Lock()
+        self._vars: dict[str, _VarHistory] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._last_commit = time.monotonic()
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cloud_history (cloud TEXT, name TEXT, timestamp REAL, value TEXT, user TEXT)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS cloud_history_index ON cloud_history (cloud, name, timestamp)"
+            )
+            self._db.commit()
+
+    def append(self, activity: cloud_activity.CloudActivity) -> None:
+        """
+        Adds a cloud activity to the history. Activity that isn't a set is ignored.
+        """
+        if activity.type != "set":
+            return
+        self.record(activity.actual_var or activity.var, activity.value, activity.timestamp, activity.username)
+
+    def record(self, var: str, value: Any, timestamp: Optional[float] = None, username: str = "") -> None:
+        if timestamp is None:
+            timestamp = time.time() * 1000
+        name = _full_name(var)
+        with self._lock:
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT INTO cloud_history VALUES (?, ?, ?, ?, ?)",
+                    (self.key, name, timestamp, json.dumps(value), username),
+                )
+                # Committing is slow, so appends are committed in batches
+                if time.monotonic() - self._last_commit > self.commit_interval:
+                    self._commit()
+                return
+            var_history = self._vars.get(name)
+            if var_history is None:
+                var_history = self._vars[name] = _VarHistory()
+            var_history.insert(timestamp, value, username)
+            if len(var_history.timestamps) > self.max_entries * 1.1:
+                # Trimming in steps keeps appends amortized O(1)
+                var_history.trim(self.max_entries)
+
+    def _commit(self):
+        assert self._db is not None
+        self._db.commit()
+        self._last_commit = time.monotonic()
+
+    def _entries(
+        self, name: str, since: Optional[float], until: Optional[float]
+    ) -> list[tuple[float, Any, str]]:
+        with self._lock:
+            if self._db is not None:
+                rows = self._db.execute(
+                    "SELECT timestamp, value, user FROM cloud_history WHERE cloud = ? AND name = ? "
+                    "AND timestamp >= ? AND timestamp <= ? ORDER BY timestamp, rowid",
+                    (self.key, name, -float("inf") if since is None else since, float("inf") if until is None else until),
+                ).fetchall()
+                return [(timestamp, json.loads(value), user) for timestamp, value, user in rows]
+            var_history = self._vars.get(name)
+            if var_history is None:
+                return []
+            start = 0 if since is None else bisect.bisect_left(var_history.timestamps, since)
+            end = len(var_history.timestamps) if until is None else bisect.bisect_right(var_history.timestamps, until)
+            return list(zip(
+                var_history.timestamps[start:end], var_history.values[start:end], var_history.usernames[start:end]
+            ))
+
+    def history(
+        self, var: str, since: Optional[float] = None, until: Optional[float] = None
+    ) -> list[cloud_activity.CloudActivity]:
+        """
+        Returns the sets of a cloud variable between since and until (both inclusive, in ms), oldest first.
+        """
+        name = _full_name(var)
+        return [
+            cloud_activity.CloudActivity(
+                name=name.removeprefix("☁ "), var=name.removeprefix("☁ "), actual_var=name, value=value,
+                timestamp=timestamp, username=username, type="set",
+            )
+            for timestamp, value, username in self._entries(name, since, until)
+        ]
+
+    def value_at(self, var: str, timestamp: float) -> Optional[Any]:
+        """
+        Returns the value the cloud variable had at the given time (in ms), or None if it wasn't set before.
+        """
+        name = _full_name(var)
+        with self._lock:
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value FROM cloud_history WHERE cloud = ? AND name = ? AND timestamp <= ? "
+                    "ORDER BY timestamp DESC, rowid DESC LIMIT 1",
+                    (self.key, name, timestamp),
+                ).fetchone()
+                return None if row is None else json.loads(row[0])
+            var_history = self._vars.get(name)
+            if var_history is None:
+                return None
+            i = bisect.bisect_right(var_history.timestamps, timestamp)
+            return var_history.values[i - 1] if i > 0 else None
+
+    def variables(self) -> list[str]:
+        """
+        Returns the names (with cloud emoji) of all variables that have a history.
+        """
+        with self._lock:
+            if self._db is not None:
+                rows = self._db.execute("SELECT DISTINCT name FROM cloud_history WHERE cloud = ?", (self.key,))
+                return [name for (name,) in rows]
+            return list(self._vars)
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._db is not None:
+                return self._db.execute("SELECT COUNT(*) FROM cloud_history WHERE cloud = ?", (self.key,)).fetchone()[0]
+            return sum(len(var_history.timestamps) for var_history in self._vars.values())
+
+    def flush(self) -> None:
+        """
+        Commits all recorded sets to the SQLite file.
+        """
+        with self._lock:
+            if self._db is not None:
+                self._commit()
+
+    def close(self) -> None:
+        self.flush()
+        if self._db is not None:
+            self._db.close()
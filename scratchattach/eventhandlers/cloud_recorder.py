@@ -1,25 +1,148 @@
 """CloudRecorder class (used by ScratchCloud, TwCloud and other classes inheriting from BaseCloud to deliver cloud var values)"""
 from __future__ import annotations
 
-from typing import Optional, Any
-from threading import Event
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Any, Union
+from threading import Event, Lock
 
 from scratchattach.site import cloud_activity
 
 from .cloud_events import CloudEvents
+from .cloud_history import CloudHistory
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+
+@dataclass
+class CloudSnapshot:
+    """
+    The values of a cloud's variables at one point in time.
+    """
+    values: dict[str, Any]
+    "Cloud variable values, keyed by the variable name (with cloud emoji)"
+    timestamps: dict[str, float] = field(default_factory=dict)
+    "Time (in ms) of the last known set of each variable"
+    saved_at: float = field(default_factory=lambda: time.time() * 1000)
+
+    @property
+    def latest(self) -> float:
+        """
+        The time (in ms) of the newest cloud activity contained in the snapshot.
+        """
+        return max(self.timestamps.values(), default=0.0)
+
+
+class CloudSnapshotStore:
+    """
+    Saves cloud snapshots to a local file, so that a restarted process can start with the cloud variable values it
+    last knew. Snapshots of multiple clouds can be saved to the same file.
+
+    The file is an SQLite database if the path ends with .db, .sqlite or .sqlite3, and a JSON file otherwise.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._lock = Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if self.path.suffix in SQLITE_SUFFIXES:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cloud_values ("
+                "cloud TEXT, name TEXT, value TEXT, timestamp REAL, saved_at REAL, PRIMARY KEY (cloud, name))"
+            )
+            self._db.commit()
+
+    def _read_json(self) -> dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def load(self, key: str) -> Optional[CloudSnapshot]:
+        """
+        Returns the snapshot saved for the cloud with the given key, or None if there is none.
+        """
+        with self._lock:
+            if self._db is not None:
+                rows = self._db.execute(
+                    "SELECT name, value, timestamp, saved_at FROM cloud_values WHERE cloud = ?", (key,)
+                ).fetchall()
+                if not rows:
+                    return None
+                return CloudSnapshot(
+                    values={name: json.loads(value) for name, value, _, _ in rows},
+                    timestamps={name: timestamp for name, _, timestamp, _ in rows},
+                    saved_at=max(saved_at for _, _, _, saved_at in rows),
+                )
+            data = self._read_json().get(key)
+            if data is None:
+                return None
+            return CloudSnapshot(data["values"], data.get("timestamps", {}), data.get("saved_at", 0.0))
+
+    def save(self, key: str, snapshot: CloudSnapshot) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO cloud_values VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (key, name, json.dumps(value), snapshot.timestamps.get(name, 0.0), snapshot.saved_at)
+                        for name, value in snapshot.values.items()
+                    ],
+                )
+                self._db.commit()
+                return
+            data = self._read_json()
+            data[key] = {"values": snapshot.values, "timestamps": snapshot.timestamps, "saved_at": snapshot.saved_at}
+            # Write to a temporary file first, so a crash while saving can't corrupt the snapshot
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(data, file)
+            os.replace(tmp_path, self.path)
 
 
 class CloudRecorder(CloudEvents):
     has_data: Event
     received_data: Event
     cloud_values: dict[str, Any]
-    def __init__(self, cloud, *, initial_values: Optional[dict[str, Any]] = None):
+    timestamps: dict[str, float]
+    "Time (in ms) of the last set of each variable"
+    snapshot_store: Optional[CloudSnapshotStore]
+    snapshot_key: str
+    save_interval: float
+    "Minimum time (in seconds) between two snapshot saves"
+    history: Optional[CloudHistory]
+    "If set, every recorded set is also appended to this history"
+
+    def __init__(
+        self,
+        cloud,
+        *,
+        initial_values: Optional[dict[str, Any]] = None,
+        initial_timestamps: Optional[dict[str, float]] = None,
+        snapshot_store: Optional[CloudSnapshotStore] = None,
+        snapshot_key: str = "",
+        save_interval: float = 5.0,
+        history: Optional[CloudHistory] = None,
+    ):
         self.has_data = Event()
         self.received_data = Event()
         initial_values = initial_values or {}
 
         super().__init__(cloud)
         self.cloud_values = initial_values
+        self.timestamps = dict(initial_timestamps or {})
+        self.snapshot_store = snapshot_store
+        self.snapshot_key = snapshot_key
+        self.save_interval = save_interval
+        self.history = history
+        self._last_save = time.monotonic()
+        self._unsaved = False
         if self.cloud_values:
             self.has_data.set()
         self.event(self.on_set)
@@ -39,3 +162,26 @@ class CloudRecorder(CloudEvents):
         if not self.received_data.is_set():
             self.received_data.set()
         self.cloud_values[activity.actual_var] = activity.value
+        self.timestamps[activity.actual_var] = activity.timestamp
+        self._unsaved = True
+        if self.history is not None:
+            self.history.append(activity)
+        if self.snapshot_store is not None and time.monotonic() - self._last_save > self.save_interval:
+            self.save_snapshot()
+
+    def snapshot(self) -> CloudSnapshot:
+        return CloudSnapshot(self.cloud_values.copy(), self.timestamps.copy())
+
+    def save_snapshot(self):
+        if self.snapshot_store is None:
+            return
+        self._last_save = time.monotonic()
+        self._unsaved = False
+        self.snapshot_store.save(self.snapshot_key, self.snapshot())
+
+    def stop(self, wait_call_threads: bool = True):
+        super().stop(wait_call_threads)
+        if self._unsaved:
+            self.save_snapshot()
+        if self.history is not None:
+            self.history.flush()
@@ -1,17 +1,25 @@
-"""CloudRequests class (threading.Event version)"""
+"""CloudRequests class (queue.Queue version)"""
 from __future__ import annotations
 
-from threading import Thread, Event, local
+from threading import Thread, Lock, Condition, local
+import asyncio
+import contextvars
+import heapq
+import inspect
+import itertools
+import queue
 import time
+from collections import deque
 import random
 import traceback
 import warnings
 from dataclasses import dataclass, field
-from typing import Protocol, Any, runtime_checkable, TypedDict, Union, Optional
+from typing import Protocol, Any, runtime_checkable, TypedDict, Union, Optional, cast
 from enum import Enum, auto
 
 from scratchattach.utils.encoder import Encoding
 from scratchattach.utils import exceptions
+from scratchattach.utils.metrics import DEFAULT_BUCKETS, _Histogram
 from scratchattach.site import project, cloud_activity
 from scratchattach.cloud import _base
 from .cloud_events import CloudEvents
@@ -20,6 +28,11 @@ class RequestHandlerThreadInfo(local):
     request_id: str = ""
 
 request_handler_thread_info = RequestHandlerThreadInfo()
+_async_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+def _current_request_id() -> str:
+    # async requests share the event loop's thread, so their request id is saved in a context variable
+    return _async_request_id.get() or request_handler_thread_info.request_id
 
 class ErrorInRequest(RuntimeWarning):
     pass
@@ -61,32 +74,72 @@ class Request:
         if not self.enabled:
             self.cloud_requests.call_event("on_disabled_request", [received_request])
             return
+        request_handler_thread_info.request_id = received_request.request_id # Used by .get_requester() / .get_timestamp() as lookup key
         try:
-            request_handler_thread_info.request_id = received_request.request_id # Used by .get_requester() / .get_timestamp() as lookup key
             output = self.on_call(*received_request.arguments)
-            self.cloud_requests.request_outputs.append({"receive":received_request.timestamp, "request_id": received_request.request_id, "output":output, "priority":self.response_priority})
-        except ErrorWithMessage as e:
-            self.cloud_requests.call_event("on_error", [received_request, e])
-            output = [i for arg in e.args for i in str(arg).splitlines()]
-            self.cloud_requests.request_outputs.append({"receive": received_request.timestamp, "request_id": received_request.request_id, "output": output, "priority": self.response_priority})
+            if inspect.isawaitable(output):
+                output = self.cloud_requests.executor.run_coroutine(output)
+        except Exception as e:
+            output = self._error_output(received_request, e)
+        self._add_output(received_request, output)
+
+    async def call_async(self, received_request: ReceivedRequest, *, timeout: Optional[float] = None):
+        """
+        Like calling the request, but for request functions defined with async def. Runs on the executor's event loop.
+        """
+        if not self.enabled:
+            self.cloud_requests.call_event("on_disabled_request", [received_request])
+            return
+        _async_request_id.set(received_request.request_id)
+        try:
+            output = self.on_call(*received_request.arguments)
+            if inspect.isawaitable(output):
+                output = await asyncio.wait_for(output, timeout)
+        except asyncio.TimeoutError:
+            self.time_out(received_request)
+            return
         except Exception as e:
+            output = self._error_output(received_request, e)
+        self._add_output(received_request, output)
+
+    def time_out(self, received_request: ReceivedRequest):
+        """
+        Responds with an error to a request that took longer than the executor's timeout. If the request function
+        returns later, its output is discarded. Does nothing if the request has already been answered.
+        """
+        if not self.cloud_requests.executor._claim_response(received_request.request_id, timed_out=True):
+            return
+        self.cloud_requests.call_event("on_error", [received_request, TimeoutError(f"Request {self.name!r} timed out")])
+        self._append_output(received_request, [f"Error in request {self.name}", "Request timed out"])
+
+    def _error_output(self, received_request: ReceivedRequest, e: Exception):
+        if isinstance(e, ErrorWithMessage):
             self.cloud_requests.call_event("on_error", [received_request, e])
-            if self.cloud_requests.ignore_exceptions:
-                warnings.warn(
-                    f"Warning: Caught error in request {self.name!r} - Full error below\n{traceback.format_exc()}",
-                    ErrorInRequest
-                )
-            else:
-                print(f"Exception in request {self.name!r}:")
-                raise(e)
-            if self.debug:
-                traceback_full = traceback.format_exc().splitlines()
-                output = [f"Error in request {self.name}", "Traceback: "]
-                output.extend(traceback_full)
-                self.cloud_requests.request_outputs.append({"receive": received_request.timestamp, "request_id": received_request.request_id, "output": output, "priority": self.response_priority})
-            else:
-                self.cloud_requests.request_outputs.append({"receive": received_request.timestamp, "request_id": received_request.request_id, "output": [f"Error in request {self.name}", "Check the Python console"], "priority": self.response_priority})
-        self.cloud_requests.responder_event.set() # Activate the .cloud_requests._responder process so it sends back the data to Scratch
+            return [i for arg in e.args for i in str(arg).splitlines()]
+        self.cloud_requests.call_event("on_error", [received_request, e])
+        if self.cloud_requests.ignore_exceptions:
+            warnings.warn(
+                f"Warning: Caught error in request {self.name!r} - Full error below\n{traceback.format_exc()}",
+                ErrorInRequest
+            )
+        else:
+            print(f"Exception in request {self.name!r}:")
+            raise(e)
+        if self.debug:
+            traceback_full = traceback.format_exc().splitlines()
+            output = [f"Error in request {self.name}", "Traceback: "]
+            output.extend(traceback_full)
+            return output
+        return [f"Error in request {self.name}", "Check the Python console"]
+
+    def _add_output(self, received_request: ReceivedRequest, output):
+        if not self.cloud_requests.executor._claim_response(received_request.request_id):
+            # The request already got a timeout error as response
+            return
+        self._append_output(received_request, output)
+
+    def _append_output(self, received_request: ReceivedRequest, output):
+        self.cloud_requests.request_outputs.append({"receive": received_request.timestamp, "request_id": received_request.request_id, "output": output, "priority": self.response_priority}) # The .cloud_requests._responder process sends it back to Scratch
 
 class EmptyRequest(Request):
     def __init__(self):
@@ -122,31 +175,422 @@ class ResponseMemory(TypedDict):
     rid: str
     packets: dict[int, str]
 
+class ResponseQueue:
+    """
+    Thread-safe queue of the request outputs waiting to be sent back to Scratch, ordered by a RespondOrder.
+
+    The outputs are kept in a heap, so adding an output and taking the next one is O(log n) no matter how many
+    responses are waiting. Packets the Scratch project asked to have resent are taken before all outputs.
+    """
+
+    respond_order: RespondOrder
+
+    def __init__(self, respond_order: RespondOrder = RespondOrder.RECEIVE):
+        self.respond_order = respond_order
+        self._heap: list[tuple[Any, int, RequestOutput]] = []
+        self._resend: deque[str] = deque()
+        self._counter = itertools.count() # keeps outputs with the same key in the order they were added
+        self._condition = Condition()
+        self.closed = False
+
+    def _key(self, output: RequestOutput) -> Any:
+        if self.respond_order == RespondOrder.FINISH:
+            return 0
+        return output[self.respond_order.name.lower()]  # type: ignore[literal-required]
+
+    def append(self, output: RequestOutput) -> None:
+        with self._condition:
+            heapq.heappush(self._heap, (self._key(output), next(self._counter), output))
+            self._condition.notify()
+
+    def resend(self, packet: str) -> None:
+        with self._condition:
+            self._resend.append(packet)
+            self._condition.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[tuple[str, Union[str, RequestOutput]]]:
+        """
+        Waits for the next item and returns it as ("resend", packet) or ("output", output).
+        Returns None if the timeout passed or the queue was closed and is empty.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._resend or self._heap or self.closed, timeout):
+                return None
+            if self._resend:
+                return "resend", self._resend.popleft()
+            if self._heap:
+                return "output", heapq.heappop(self._heap)[2]
+            return None
+
+    def take_resends(self) -> list[str]:
+        """
+        Returns and removes all packets waiting to be resent.
+        """
+        with self._condition:
+            packets = list(self._resend)
+            self._resend.clear()
+            return packets
+
+    def close(self) -> None:
+        """
+        Makes get() return None once the queue is empty, instead of waiting.
+        """
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __bool__(self) -> bool:
+        return bool(self._heap)
+
+    def __iter__(self):
+        with self._condition:
+            return iter([output for _, _, output in sorted(self._heap, key=lambda item: item[:2])])
+
+class RequestExecutor:
+    """
+    Runs the requests of a CloudRequests handler that have thread=True.
+
+    Request functions are run by a bounded pool of worker threads, which are started when they're needed. Request
+    functions defined with async def are run as tasks on one event loop thread instead. Requests that arrive while
+    all workers are busy wait in a queue. When max_queued requests are waiting, the overflow policy decides:
+    "reject" responds with an error right away, "drop_oldest" responds with an error to the longest waiting request
+    and "block" makes the cloud event receiver wait for a free place in the queue.
+
+    Requests running longer than timeout seconds get an error as response (their thread can't be stopped, so their
+    output is discarded when they finish).
+    """
+
+    OVERFLOW_POLICIES = ("reject", "drop_oldest", "block")
+
+    max_workers: int
+    max_queued: int
+    timeout: Optional[float]
+    overflow: str
+    workers: list[Thread]
+    timed_out_ids: set[str]
+    "Ids of the requests that got a timeout error, but haven't finished yet"
+    submitted: int
+    completed: int
+    rejected: int
+    timed_out: int
+    max_queue_depth: int
+    "Highest number of requests that were waiting at the same time"
+    queue_wait: _Histogram
+    "Time (in seconds) requests waited in the queue before a worker started them"
+    duration: _Histogram
+    "Time (in seconds) the request functions took"
+
+    def __init__(
+        self,
+        cloud_requests: CloudRequests,
+        *,
+        max_workers: int = 16,
+        max_queued: int = 1000,
+        timeout: Optional[float] = None,
+        overflow: str = "reject",
+    ):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {self.OVERFLOW_POLICIES}, not {overflow!r}")
+        self.cloud_requests = cloud_requests
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.overflow = overflow
+
+        self._queue: queue.Queue[Optional[tuple[ReceivedRequest, float]]] = queue.Queue(maxsize=max_queued)
+        self._lock = Lock()
+        self.workers = []
+        self._idle_workers = 0
+        self._async_running = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._deadlines: list[tuple[float, int, ReceivedRequest]] = []
+        self._deadline_counter = itertools.count()
+        self._watchdog: Optional[Thread] = None
+        self._watchdog_condition = Condition()
+        self._running_ids: set[str] = set()
+        self._answered_ids: set[str] = set() # running requests that already got their response
+        self._shut_down = False
+        self.timed_out_ids = set()
+
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.max_queue_depth = 0
+        self.queue_wait = _Histogram(DEFAULT_BUCKETS)
+        self.duration = _Histogram(DEFAULT_BUCKETS)
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Number of requests waiting for a worker
+        """
+        return self._queue.qsize()
+
+    @property
+    def active(self) -> int:
+        """
+        Number of requests that are being executed
+        """
+        return len(self._running_ids)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "active": self.active,
+                "workers": len(self.workers),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "mean_queue_wait": self.queue_wait.total / self.queue_wait.count if self.queue_wait.count else 0.0,
+                "mean_duration": self.duration.total / self.duration.count if self.duration.count else 0.0,
+            }
+
+    def _reject(self, received_request: ReceivedRequest, reason: str):
+        with self._lock:
+            self.rejected += 1
+        self.cloud_requests.call_event("on_rejected_request", [received_request])
+        received_request.request._add_output(received_request, [f"Error in request {received_request.request_name}", reason])
+
+    def submit(self, received_request: ReceivedRequest) -> bool:
+        """
+        Schedules a request. Returns False if it was rejected because the queue is full.
+        """
+        if self._shut_down:
+            return False
+        with self._lock:
+            self.submitted += 1
+        if inspect.iscoroutinefunction(received_request.request.on_call):
+            return self._submit_async(received_request)
+
+        item = (received_request, time.perf_counter())
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            if self.overflow == "reject":
+                self._reject(received_request, "Server is busy, try again later")
+                return False
+            if self.overflow == "drop_oldest":
+                try:
+                    dropped = self._queue.get_nowait()
+                except queue.Empty:
+                    dropped = None
+                if dropped is not None:
+                    self._reject(dropped[0], "Server is busy, try again later")
+                self._queue.put(item)
+            else:
+                self._queue.put(item)  # block until a worker takes a request
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+            if self._queue.qsize() > self._idle_workers and len(self.workers) < self.max_workers:
+                worker = Thread(target=self._work, name=f"CloudRequests-worker-{len(self.workers)}")
+                self.workers.append(worker)
+                worker.start()
+        return True
+
+    def _work(self):
+        while True:
+            with self._lock:
+                self._idle_workers += 1
+            item = self._queue.get()
+            with self._lock:
+                self._idle_workers -= 1
+            if item is None:
+                return
+            received_request, enqueued_at = item
+            self._run(received_request, enqueued_at)
+
+    def _run(self, received_request: ReceivedRequest, enqueued_at: float):
+        started_at = time.perf_counter()
+        self._start_tracking(received_request)
+        try:
+            received_request.request(received_request)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            finished_at = time.perf_counter()
+            self._stop_tracking(received_request)
+            with self._lock:
+                self.queue_wait.observe(started_at - enqueued_at)
+                self.duration.observe(finished_at - started_at)
+                self.completed += 1
+
+    # -- async request functions --
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                Thread(target=self._loop.run_forever, name="CloudRequests-loop", daemon=True).start()
+            return self._loop
+
+    def run_coroutine(self, coroutine):
+        """
+        Runs a coroutine on the executor's event loop and waits for its result.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._get_loop()).result()
+
+    def _submit_async(self, received_request: ReceivedRequest) -> bool:
+        with self._lock:
+            full = self._async_running >= self.max_queued
+            if not full:
+                self._async_running += 1
+        if full:
+            self._reject(received_request, "Server is busy, try again later")
+            return False
+        asyncio.run_coroutine_threadsafe(self._run_async(received_request, time.perf_counter()), self._get_loop())
+        return True
+
+    async def _run_async(self, received_request: ReceivedRequest, enqueued_at: float):
+        started_at = time.perf_counter()
+        with self._lock:
+            self._running_ids.add(received_request.request_id)
+        try:
+            await received_request.request.call_async(received_request, timeout=self.timeout)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            finished_at = time.perf_counter()
+            self._stop_tracking(received_request)
+            with self._lock:
+                self._async_running -= 1
+                self.queue_wait.observe(started_at - enqueued_at)
+                self.duration.observe(finished_at - started_at)
+                self.completed += 1
+
+    # -- timeouts of threaded requests --
+
+    def _start_tracking(self, received_request: ReceivedRequest):
+        with self._lock:
+            self._running_ids.add(received_request.request_id)
+        if self.timeout is None:
+            return
+        with self._watchdog_condition:
+            heapq.heappush(
+                self._deadlines, (time.perf_counter() + self.timeout, next(self._deadline_counter), received_request)
+            )
+            if self._watchdog is None:
+                self._watchdog = Thread(target=self._watch_deadlines, name="CloudRequests-watchdog", daemon=True)
+                self._watchdog.start()
+            self._watchdog_condition.notify()
+
+    def _stop_tracking(self, received_request: ReceivedRequest):
+        with self._lock:
+            self._running_ids.discard(received_request.request_id)
+            self._answered_ids.discard(received_request.request_id)
+            self.timed_out_ids.discard(received_request.request_id)
+
+    def _claim_response(self, request_id: str, *, timed_out: bool = False) -> bool:
+        """
+        Decides whether a request is answered by its output or by a timeout error. Returns False if the request
+        already got its response (or, for a timeout, has already finished), so no request gets two responses.
+        """
+        with self._lock:
+            if request_id in self._answered_ids:
+                return False
+            if request_id not in self._running_ids:
+                # Requests that aren't run by the executor are answered by their output, there's nothing to time out
+                return not timed_out
+            self._answered_ids.add(request_id)
+            if timed_out:
+                self.timed_out += 1
+                self.timed_out_ids.add(request_id)
+            return True
+
+    def _watch_deadlines(self):
+        # One thread watches the deadlines of all running requests
+        while not self._shut_down:
+            with self._watchdog_condition:
+                while not self._deadlines and not self._shut_down:
+                    self._watchdog_condition.wait()
+                if self._shut_down:
+                    return
+                deadline, _, received_request = self._deadlines[0]
+                now = time.perf_counter()
+                if deadline > now:
+                    self._watchdog_condition.wait(deadline - now)
+                    continue
+                heapq.heappop(self._deadlines)
+            received_request.request.time_out(received_request)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stops the workers once the queued requests are done.
+        """
+        self._shut_down = True
+        with self._watchdog_condition:
+            self._watchdog_condition.notify()
+        for _ in self.workers:
+            self._queue.put(None)
+        if wait:
+            for worker in self.workers:
+                worker.join()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop_loop)
+
+    def _stop_loop(self):
+        assert self._loop is not None
+        for task in asyncio.all_tasks(self._loop):
+            task.cancel()
+        self._loop.call_soon(self._loop.stop)
+
 class CloudRequests(CloudEvents):
 
     # The CloudRequests class is built upon CloudEvents, similar to how Filterbot is built upon MessageEvents
 
     _requests: dict[str, Request]
     request_parts: dict[str, list[str]]
-    received_requests: list[ReceivedRequest]
+    received_requests: queue.Queue[Optional[ReceivedRequest]]
     executed_requests: dict[str, ReceivedRequest]
-    request_outputs: list[RequestOutput]
-    responded_request_ids: list[str]
-    packet_memory: list[ResponseMemory]
-    _packets_to_resend: list[str]
+    request_outputs: ResponseQueue
+    responded_request_ids: deque[str]
+    packet_memory: deque[ResponseMemory]
     executer_thread: Optional[Thread]
     responder_thread: Optional[Thread]
-    extra_executor_threads: list[Thread]
+    executor: RequestExecutor
+    "Runs the requests that have thread=True"
     cloud: _base.AnyCloud
 
+    @property
+    def respond_order(self) -> RespondOrder:
+        return self.request_outputs.respond_order
+
+    @respond_order.setter
+    def respond_order(self, respond_order: RespondOrder):
+        self.request_outputs.respond_order = respond_order
+
     def __init__(
         self,
         cloud: _base.AnyCloud,
         used_cloud_vars: Optional[list[str]] = None,
         no_packet_loss: bool = False,
         respond_order: RespondOrder = RespondOrder.RECEIVE,
-        debug = False
+        debug = False,
+        *,
+        max_workers: int = 16,
+        max_queued_requests: int = 1000,
+        request_timeout: Optional[float] = None,
+        overflow: str = "reject",
+        response_encoding: str = "auto",
+        max_parallel_responses: Optional[int] = None
     ):
+        """
+        Keyword Arguments:
+            max_workers: Max. number of threads that run requests with thread=True at the same time
+            max_queued_requests: Max. number of requests waiting for a free worker
+            request_timeout: Time (in seconds) after which a running request is answered with an error. None means no timeout.
+            overflow: What happens to a request when the queue is full: "reject" (respond with an error), "drop_oldest" (respond with an error to the longest waiting request instead) or "block" (wait for a free place)
+            max_parallel_responses: Max. number of responses sent at the same time (their packets are interleaved). Defaults to the number of used cloud variables, 1 sends one response after the other.
+            response_encoding: "decimal" (two digits per character), "compressed" (responses are compressed with Encoding.compress, the Scratch project's decoder sprite needs to support this) or "auto" (compressed as soon as the Scratch project announces that its decoder supports it through the _response_encodings request). The wire format and the handshake are described in the docstring of Encoding.
+        """
+        if response_encoding not in self.RESPONSE_ENCODINGS + ("auto",):
+            raise ValueError(f"Unknown response encoding: {response_encoding!r}")
         used_cloud_vars = used_cloud_vars or ["1", "2", "3", "4", "5", "6", "7", "8", "9"]
         super().__init__(cloud)
         # Setup
@@ -155,33 +599,32 @@ class CloudRequests(CloudEvents):
         self.event(self.on_reconnect, thread=True)
         self.no_packet_loss = no_packet_loss # When enabled, query the clouddata log regularly for missed requests and reconnect after every single request (reduces packet loss a lot, but is spammy and can make response duration longer)
         self.used_cloud_vars = used_cloud_vars
-        self.respond_order = respond_order
+        self.max_parallel_responses = max_parallel_responses or len(used_cloud_vars)
+        self.request_outputs = ResponseQueue(respond_order) # Queue for the output data returned by the requests (so the thread sending it back to Scratch can access it)
         self.debug = debug
+        self.response_encoding = response_encoding
+        self.active_response_encoding = "decimal" if response_encoding == "auto" else response_encoding
+        self.executor = RequestExecutor(
+            self, max_workers=max_workers, max_queued=max_queued_requests, timeout=request_timeout, overflow=overflow
+        )
 
         # Lists and dicts for saving request-related stuff
         self.request_parts = {} # Dict (key: request_id) for saving the parts of the requests not fully received yet
-        self.received_requests = [] # List saving the requests that have been fully received, but not executed yet (as ReceivedRequest objects). Requests that run in threads will never be put into this list, but are executed directly.
+        self.received_requests = queue.Queue() # Queue saving the requests that have been fully received, but not executed yet (as ReceivedRequest objects). Requests that run in threads will never be put into this queue, but are handed to the executor.
         self.executed_requests = {} # Dict (key: request_id) saving the request that are currently being executed and have not been responded yet (as ReceivedRequest objects)
-        self.request_outputs = [] # List for the output data returned by the requests (so the thread sending it back to Scratch can access it)
-        self.responded_request_ids = [] # Saves the last 15 request ids that have been responded to. This prevents double responses then using the clouddata logs as 2nd source for preventing packet loss
-        self.packet_memory = [] # Saves the last 15 responses so the Scratch project can re-request packets that weren't received
-        self._packets_to_resend = []
-
-        # threading Event objects used to block threads until they are needed (lower CPU usage compared to a busy-sleep event queue)#
-        self.executer_event = Event()
-        self.responder_event = Event()
+        self.responded_request_ids = deque(maxlen=35) # Saves the last 35 request ids that have been responded to. This prevents double responses then using the clouddata logs as 2nd source for preventing packet loss
+        self.packet_memory = deque(maxlen=15) # Saves the last 15 responses so the Scratch project can re-request packets that weren't received
 
         # Start ._executer and ._responder threads (these threads are remain blocked until cloud activity is received and don't consume any CPU)
         self.executer_thread = Thread(target=self._executer)
         self.responder_thread = Thread(target=self._responder)
         self.executer_thread.start()
         self.responder_thread.start()
-        
-        self.extra_executor_threads = []
 
         self.current_var = 0 # ID of the last set FROM_HOST_ variable (when a response is sent back to Scratch, these are set cyclically)
         self.credit_check()
         self.hard_stopped = False # When set to True, all processes will halt immediately without finishing safely (can result in not fully received / responded requests etc.)
+        self.request(self._negotiate_response_encoding, name="_response_encodings", thread=False)
 
     # -- Adding and removing requests --
 
@@ -223,15 +666,25 @@ class CloudRequests(CloudEvents):
 
     # -- Parse and send back the request output --
 
-    def _parse_output(self, request_name, output, request_id):
+    RESPONSE_ENCODINGS = ("decimal", "compressed")
+    # Validation numbers at the end of the last packet of a response, which tell the Scratch project how to decode it
+    VALIDATION_DECIMAL = 2222
+    VALIDATION_INTEGER = 3222
+    VALIDATION_COMPRESSED = 4222
+
+    def _negotiate_response_encoding(self, *supported_encodings):
         """
-        Prepares the transmission of the request output to the Scratch project
+        Built-in request sent by decoder sprites that support more encodings than "decimal". Returns the encoding
+        that will be used for the following responses.
         """
-        if len(str(output)) > 3000:
-            print(
-                f"Warning: Output of request '{request_name}' is longer than 3000 characters (length: {len(str(output))} characters). Responding the request will take >4 seconds."
-            )
+        if self.response_encoding == "auto":
+            self.active_response_encoding = "compressed" if "compressed" in supported_encodings else "decimal"
+        return self.active_response_encoding
 
+    def _parse_output(self, request_name, output, request_id) -> list[str]:
+        """
+        Prepares the transmission of the request output to the Scratch project. Returns the packets to send.
+        """
         if str(request_id).endswith("0"):
             try:
                 int(output) == output
@@ -244,45 +697,67 @@ class CloudRequests(CloudEvents):
 
         if output is None:
             print(f"Warning: Request '{request_name}' didn't return anything.")
-            return
-        elif send_as_integer:
-            output = str(output)
-        elif not isinstance(output, list):
+            return []
+        output, validation = self._encode_output(output, send_as_integer=send_as_integer)
+        packets = self._response_packets(request_id, output, validation=validation)
+
+        # Every packet is one cloud variable set, so the ratelimit decides how long sending the response takes
+        duration = len(packets) * getattr(self.cloud, "ws_longterm_ratelimit", 0.1)
+        if duration > 4:
+            print(
+                f"Warning: The response to request '{request_name}' is sent in {len(packets)} packets. Sending it will take about {round(duration)} seconds."
+            )
+        return packets
+
+    def _encode_output(self, output, *, send_as_integer: bool) -> tuple[str, str]:
+        """
+        Encodes the output of a request. Returns the encoded output and the validation its packets end with.
+        """
+        if send_as_integer:
+            return str(output), self.VALIDATION_INTEGER
+        if isinstance(output, list):
+            output = "".join([f"{item}89" for item in Encoding.encode_many(output)])
+        else:
             if output == "":
                 output = "-"
             output = Encoding.encode(output)
-        else:
-            input = output
-            output = ""
-            for i in input:
-                output += Encoding.encode(i)
-                output += "89"
-        self._respond(request_id, output, validation=3222 if send_as_integer else 2222)
-
-    def _set_FROM_HOST_var(self, value):
+        if self.active_response_encoding == "compressed":
+            compressed = Encoding.compress(output)
+            if len(compressed) < len(output):
+                return compressed, self.VALIDATION_COMPRESSED
+        return output, self.VALIDATION_DECIMAL
+
+    def _send_packets(self, packets: list[str]):
+        """
+        Sends packets to the Scratch project in one batch, each one in the next FROM_HOST_ variable. The cloud's
+        set_vars waits as long as its ratelimit requires.
+        """
+        if (getattr(self.cloud, "last_var_set", time.time()) + 8 < time.time() # if the cloud connection has been idle for too long, a reconnect is necessary to make sure the first package will not be lost
+            ) or self.no_packet_loss:
+            self.cloud.reconnect()
+        values = {}
+        for packet in packets:
+            values[f"FROM_HOST_{self.used_cloud_vars[self.current_var]}"] = packet
+            self.current_var += 1
+            if self.current_var == len(self.used_cloud_vars):
+                self.current_var = 0
         try:
-            self.cloud.set_var(f"FROM_HOST_{self.used_cloud_vars[self.current_var]}", value)
+            self.cloud.set_vars(values)
         except exceptions.CloudConnectionError:
             self.call_event("on_disconnect")
         except Exception as e:
             print("scratchattach: internal error while responding (please submit a bug report on GitHub):", e)
-        self.current_var += 1
-        if self.current_var == len(self.used_cloud_vars):
-            self.current_var = 0
-        time.sleep(getattr(self.cloud, "ws_shortterm_ratelimit", 0.1))
 
-    def _respond(self, request_id, response, *, validation=2222):
+    def _response_packets(self, request_id, response, *, validation=2222) -> list[str]:
         """
-        Sends back the request response to the Scratch project
+        Splits a response into the packets sent back to the Scratch project and remembers them, so the project can
+        re-request lost packets
         """
-        if (getattr(self.cloud, "last_var_set", time.time()) + 8 < time.time() # if the cloud connection has been idle for too long, a reconnect is necessary to make sure the first package will not be lost
-            ) or self.no_packet_loss:
-            self.cloud.reconnect()
-
         memory = ResponseMemory(rid=request_id, packets={})#{"rid":request_id}
         remaining_response = str(response)
         length_limit = getattr(self.cloud, "length_limit", 256) - (len(str(request_id))+6) # the subtrahend is the worst-case length of the "."+numbers after the "."
-        
+        packets = []
+
         i = 0
         while not remaining_response == "":
             if len(remaining_response) > length_limit:
@@ -299,24 +774,24 @@ class CloudRequests(CloudEvents):
 
                 value_to_send = f"{response_part}.{request_id}{iteration_string}1"
                 memory["packets"][i] = value_to_send
-                
-                self._set_FROM_HOST_var(value_to_send)
+                packets.append(value_to_send)
 
             else:
-                self._set_FROM_HOST_var(f"{remaining_response}.{request_id}{validation}")
+                packets.append(f"{remaining_response}.{request_id}{validation}")
                 self.packet_memory.append(memory)
-                if len(self.packet_memory) > 15:
-                    self.packet_memory.pop(0)
                 remaining_response = ""
-
-            if self.hard_stopped: # stop immediately without exiting safely
-                break
+        return packets
 
     def _request_packet_from_memory(self, request_id: str, packet_id: Union[str, int]):
-        memory = list(filter(lambda x : x["rid"] == request_id, self.packet_memory))
-        if len(memory) > 0:
-            self._packets_to_resend.append(memory[0]["packets"][int(packet_id)])
-            self.responder_event.set() # activate _responder process
+        for memory in self.packet_memory:
+            if memory["rid"] == request_id:
+                self.request_outputs.resend(memory["packets"][int(packet_id)]) # the _responder process sends it before all other outputs
+                return
+
+    @property
+    def extra_executor_threads(self) -> list[Thread]:
+        # The worker threads of the executor (requests with thread=True used to get a thread of their own)
+        return self.executor.workers
 
     # -- Register and handle incoming requests --
 
@@ -347,8 +822,7 @@ class CloudRequests(CloudEvents):
                 self.request_parts[request_id].append(raw_request[1:])
                 return
             
-            self.responded_request_ids.insert(0, request_id)
-            self.responded_request_ids = self.responded_request_ids[:35]
+            self.responded_request_ids.appendleft(request_id)
 
             # If the request consists of multiple parts: Put together the parts to get the whole raw request string
             _raw_request = ""
@@ -372,7 +846,7 @@ class CloudRequests(CloudEvents):
                 self.call_event("on_unknown_request", [
                     ReceivedRequest(
                         request_name=request,
-                        requester=activity.user,
+                        requester=getattr(activity, "user", None),
                         timestamp=activity.timestamp,
                         arguments=arguments,
                         request_id=request_id,
@@ -384,7 +858,7 @@ class CloudRequests(CloudEvents):
             received_request = ReceivedRequest(
                 request = self._requests[request_name],
                 request_name=request_name,
-                requester=activity.user,
+                requester=getattr(activity, "user", None),
                 timestamp=activity.timestamp,
                 arguments=arguments,
                 request_id=request_id,
@@ -393,12 +867,9 @@ class CloudRequests(CloudEvents):
             self.call_event("on_request", [received_request])
             if received_request.request.thread:
                 self.executed_requests[request_id] = received_request
-                thread = Thread(target=received_request.request, args=[received_request])
-                self.extra_executor_threads.append(thread)
-                thread.start() # Execute the request function directly in a thread
+                self.executor.submit(received_request) # Execute the request function in a worker thread
             else:
-                self.received_requests.append(received_request)
-                self.executer_event.set() # Activate the ._executer process so that it handles the received request
+                self.received_requests.put(received_request) # The ._executer process handles the received request
     
     def _executer(self):
         """
@@ -407,51 +878,76 @@ class CloudRequests(CloudEvents):
         # If .no_packet_loss is enabled and the cloud provides logs, the logs are used to check whether there are cloud activities that were not received over the cloud connection used by the underlying cloud events
         use_extra_data = (self.no_packet_loss and hasattr(self.cloud, "logs"))
         
-        self.executer_event.wait() # Wait for requests to be received
         while self.executer_thread is not None: # If self.executer_thread is None, it means cloud requests were stopped using .stop()
-            self.executer_event.clear()
+            try:
+                received_request = self.received_requests.get(timeout = 2.5 if use_extra_data else None) # Wait for requests to be received
+            except queue.Empty:
+                Thread(target=self.on_reconnect).start()
+                continue
+            if received_request is None: # put into the queue by .stop()
+                return
+            if self.hard_stopped: # stop immediately without exiting safely
+                continue
+
+            self.executed_requests[received_request.request_id] = received_request
+            received_request.request(received_request) # Execute the request function
 
-            if self.received_requests == [] and use_extra_data:
+            if use_extra_data:
                 Thread(target=self.on_reconnect).start()
 
-            while self.received_requests != []:
-                received_request = self.received_requests.pop(0)
-                self.executed_requests[received_request.request_id] = received_request
-                received_request.request(received_request) # Execute the request function
+    def _responder(self):
+        """
+        A process that takes the request outputs from .request_outputs (in the respond order) and sends them back to the Scratch project, also removes the corresponding ReceivedRequest object from .executed_requests
 
-                if use_extra_data:
-                    Thread(target=self.on_reconnect).start()
-                if self.hard_stopped: # stop immediately without exiting safely
-                    break
+        Up to .max_parallel_responses responses are sent at the same time: every batch of cloud variable sets takes the
+        next packet of each of them in turn, so a client waiting for a short response isn't blocked by a long one.
+        """
+        lanes: deque[deque[str]] = deque() # the packets left to send of each response that is being sent
+        resend: list[str] = []
+        while True:
+            if not self._fill_lanes(lanes, resend):
+                return
+            resend.extend(self.request_outputs.take_resends())
 
-            self.executer_event.wait(timeout = 2.5 if use_extra_data else None) # Wait for requests to be received
+            if self.hard_stopped: # stop immediately without exiting safely
+                lanes.clear()
+                resend.clear()
+                continue
 
-    def _responder(self):
+            batch_size = len(self.used_cloud_vars)
+            batch = resend[:batch_size]
+            del resend[:batch_size]
+            while len(batch) < batch_size and lanes:
+                lane = lanes.popleft()
+                batch.append(lane.popleft())
+                if lane:
+                    lanes.append(lane)
+            if batch:
+                self._send_packets(batch)
+
+    def _fill_lanes(self, lanes: deque[deque[str]], resend: list[str]) -> bool:
         """
-        A process that detects incoming request outputs in .request_outputs and handles them by sending them back to the Scratch project, also removes the corresponding ReceivedRequest object from .executed_requests
+        Takes request outputs from .request_outputs until .max_parallel_responses responses are being sent, and adds
+        the packets to resend to resend. Returns False if the queue was closed by .stop() and nothing is left to send.
         """
-        while self.responder_thread is not None: # If self.responder_thread is None, it means cloud requests were stopped using .stop()
-            self.responder_event.wait() # Wait for executed requests to respond
-            self.responder_event.clear()
-            
-            while self._packets_to_resend != []:
-                self._set_FROM_HOST_var(self._packets_to_resend.pop(0))
-                if self.hard_stopped: # stop immediately without exiting safely
-                    break
-
-            while self.request_outputs:
-                if self.respond_order == RespondOrder.FINISH:
-                    output_obj = self.request_outputs.pop(0)
-                else:
-                    output_obj = min(self.request_outputs, key=lambda x : x[self.respond_order.name.lower()])
-                    self.request_outputs.remove(output_obj)
-                if output_obj["request_id"] in self.executed_requests:
-                    received_request = self.executed_requests.pop(output_obj["request_id"])
-                    self._parse_output(received_request.request_name, output_obj["output"], output_obj["request_id"])
-                else:
-                    self._parse_output("[sent from backend]", output_obj["output"], output_obj["request_id"])
-                if self.hard_stopped: # stop immediately without exiting safely
-                    break
+        while len(lanes) < self.max_parallel_responses:
+            waiting = not lanes and not resend
+            item = self.request_outputs.get(timeout=None if waiting else 0) # Wait for executed requests to respond
+            if item is None:
+                return not waiting
+            kind, data = item
+            if kind == "resend":
+                resend.append(cast(str, data))
+                continue
+            output_obj = cast(RequestOutput, data)
+            if output_obj["request_id"] in self.executed_requests:
+                received_request = self.executed_requests.pop(output_obj["request_id"])
+                packets = self._parse_output(received_request.request_name, output_obj["output"], output_obj["request_id"])
+            else:
+                packets = self._parse_output("[sent from backend]", output_obj["output"], output_obj["request_id"])
+            if packets:
+                lanes.append(deque(packets))
+        return True
 
     def on_reconnect(self):
         """
@@ -473,8 +969,8 @@ class CloudRequests(CloudEvents):
         """
         Can be used inside a request to get the username that performed the request.
         """
-        activity = self.executed_requests[request_handler_thread_info.request_id].activity
-        if activity.user is None:
+        activity = self.executed_requests[_current_request_id()].activity
+        if getattr(activity, "user", None) is None:
             activity.load_log_data()
         return activity.user
 
@@ -482,14 +978,14 @@ class CloudRequests(CloudEvents):
         """
         Can be used inside a request to get the timestamp of when the request was received.
         """
-        activity = self.executed_requests[request_handler_thread_info.request_id].activity
+        activity = self.executed_requests[_current_request_id()].activity
         return activity.timestamp
 
     def get_exact_timestamp(self):
         """
         Can be used inside a request to get the exact timestamp of when the request was performed.
         """
-        activity = self.executed_requests[request_handler_thread_info.request_id].activity
+        activity = self.executed_requests[_current_request_id()].activity
         activity.load_log_data()
         return activity.timestamp
 
@@ -500,7 +996,6 @@ class CloudRequests(CloudEvents):
         Send data to the Scratch project without a priorly received request. The Scratch project will only receive the data if it's running.
         """
         self.request_outputs.append({"receive":time.time()*1000, "request_id":"100000000"+str(random.randint(1000, 9999)), "output":data, "priority":priority})
-        self.responder_event.set() # activate _responder process
         # Prevent user from breaking cloud requests by sending too fast (automatically increase wait time if the server can't keep up):
         if len(self.request_outputs) > 20:
             time.sleep(0.5)
@@ -519,20 +1014,17 @@ class CloudRequests(CloudEvents):
         """
         # Override the .stop function from BaseEventHandler to make sure the ._executer and ._responder threads are also terminated
         super().stop()
-        self.executer_event.set()
-        self.responder_event.set()
         e_thread = self.executer_thread
         r_thread = self.responder_thread
         self.executer_thread = None
         self.responder_thread = None
         if e_thread:
+            self.received_requests.put(None)
             e_thread.join()
+        self.executor.shutdown(wait=wait_extra_threads)
+        self.request_outputs.close() # The responder sends the remaining outputs, then exits
         if r_thread:
             r_thread.join()
-        if not wait_extra_threads:
-            return
-        for thread in self.extra_executor_threads:
-            thread.join()
     
     def hard_stop(self):
         """
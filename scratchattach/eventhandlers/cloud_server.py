@@ -2,14 +2,231 @@ from __future__ import annotations
 
 from SimpleWebSocketServer import SimpleWebSocketServer, WebSocket
 from threading import Thread
+import struct
 from scratchattach.utils import exceptions
 import json
 import time
 from scratchattach.site import cloud_activity
 from scratchattach.site.user import User
 from ._base import BaseEventHandler
+from abc import abstractmethod
+from typing import Any, Optional
 import traceback
 
+TEXT_OPCODE = 0x1
+
+
+def _text_frame(message: str) -> bytes:
+    # Builds a websocket text frame. Frames sent by a server aren't masked, so the same frame can be queued for every
+    # client a message is broadcast to
+    data = message.encode("utf-8")
+    length = len(data)
+    if length <= 125:
+        header = struct.pack("!BB", 0x80 | TEXT_OPCODE, length)
+    elif length <= 65535:
+        header = struct.pack("!BBH", 0x80 | TEXT_OPCODE, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | TEXT_OPCODE, 127, length)
+    return header + data
+
+
+class BaseCloudServer(BaseEventHandler):
+    """
+    Config, cloud variable storage and client bookkeeping shared by the engines of init_cloud_server
+    (TwCloudServer and AsyncTwCloudServer). The engines send messages with _broadcast.
+    """
+
+    tw_clients: dict
+    "Connected clients (address -> {client, username, project_id})"
+    project_clients: dict
+    "Handshaked clients of each project (project id -> {address: client}), updated on handshake and close"
+    tw_variables: dict[str, dict[str, Any]]
+    "Cloud variable values of each project"
+
+    def __init__(
+        self,
+        hostname,
+        *,
+        port,
+        length_limit=None,
+        allow_non_numeric=True,
+        whitelisted_projects=None,
+        allow_nonscratch_names=True,
+        blocked_ips=None,
+        sync_players=True,
+        log_var_sets=True,
+    ):
+        BaseEventHandler.__init__(self)
+
+        self.tw_clients = {}
+        self.project_clients = {}
+        self.tw_variables = {}
+
+        self.hostname = hostname
+        self.port = port
+
+        # server config
+        self.allow_non_numeric = allow_non_numeric
+        self.whitelisted_projects = whitelisted_projects
+        self.length_limit = length_limit
+        self.allow_nonscratch_names = allow_nonscratch_names
+        self.blocked_ips = blocked_ips or []
+        self.sync_players = sync_players
+        self.log_var_sets = log_var_sets
+
+    @abstractmethod
+    def _broadcast(self, project_id, message, *, skip=None):
+        """
+        Sends a message to all handshaked clients of a project (except skip).
+        """
+
+    def _is_ip_banned(self, address) -> bool:
+        return (
+            address[0] in self.blocked_ips
+            or address[0] + ":" + str(address[1]) in self.blocked_ips
+            or address in self.blocked_ips
+        )
+
+    def _check_value(self, value):
+        # Checks if a received cloud value satisfies the server's constraints
+        if self.length_limit is not None:
+            if len(str(value)) > self.length_limit:
+                return False
+        if self.allow_non_numeric is False:
+            x = str(value).replace(".", "")
+            x = x.replace("-", "")
+            if not (x.isnumeric() or x == ""):
+                return False
+        return True
+
+    def _register_handshake(self, client, username, project_id) -> str:
+        # Returns the project id as a string, which is how it's stored and passed to the events by both engines
+        project_id = str(project_id)
+        client_data = self.tw_clients[client.address]
+        old_project_id = client_data["project_id"]
+        if old_project_id is not None:
+            self.project_clients.get(old_project_id, {}).pop(client.address, None)
+        client_data["username"] = username
+        client_data["project_id"] = project_id
+        self.project_clients.setdefault(project_id, {})[client.address] = client
+        return project_id
+
+    def _unregister(self, client):
+        client_data = self.tw_clients.pop(client.address)
+        if client_data["project_id"] is not None:
+            project_id = client_data["project_id"]
+            clients = self.project_clients.get(project_id, {})
+            clients.pop(client.address, None)
+            if not clients:
+                self.project_clients.pop(project_id, None)
+        return client_data
+
+    def _handshake_message(self, project_id: str) -> Optional[str]:
+        # The current cloud variable values, sent to a client after its handshake
+        project_vars = self.get_project_vars(project_id)
+        if not project_vars:
+            return None
+        return "\n".join(
+            json.dumps(
+                {
+                    "method": "set",
+                    "project_id": project_id,
+                    "name": "☁ " + varname,
+                    "value": value,
+                    "server": "scratchattach/2.0.0",
+                }
+            )
+            for varname, value in project_vars.items()
+        )
+
+    @staticmethod
+    def _set_activity(username, project_id, var_name, value) -> cloud_activity.CloudActivity:
+        # The CloudActivity passed to on_set for a set received from a client
+        _a = cloud_activity.CloudActivity(timestamp=time.time() * 1000)
+        _a._update_from_dict(
+            {
+                "method": "set",
+                "user": username,
+                "project_id": project_id,
+                "name": var_name,
+                "value": value,
+                "timestamp": round(time.time() * 1000),
+                "server": "scratchattach/2.0.0",
+            }
+        )
+        return _a
+
+    def active_projects(self):
+        only_active = {}
+        for project_id in self.tw_variables:
+            if self.project_clients.get(project_id):
+                only_active[project_id] = self.tw_variables[project_id]
+        return only_active
+
+    def active_user_names(self, project_id):
+        return [self.tw_clients[user]["username"] for user in self.active_user_ips(project_id)]
+
+    def active_user_ips(self, project_id):
+        return list(self.project_clients.get(str(project_id), {}))
+
+    def get_global_vars(self):
+        return self.tw_variables
+
+    def get_project_vars(self, project_id):
+        return self.tw_variables.get(str(project_id), {})
+
+    def get_var(self, project_id, var_name):
+        return self.tw_variables.get(str(project_id), {}).get(var_name.replace("☁ ", ""))
+
+    def set_global_vars(self, data):
+        for project_id in data:
+            self.set_project_vars(project_id, data[project_id])
+
+    def set_project_vars(self, project_id, data, *, user="@server"):
+        project_id = str(project_id)
+        self.tw_variables[project_id] = data
+        timestamp = time.time() * 1000
+        self._broadcast(
+            project_id,
+            "\n".join(
+                [
+                    json.dumps(
+                        {
+                            "method": "set",
+                            "project_id": project_id,
+                            "name": "☁ " + varname,
+                            "value": data[varname],
+                            "server": "scratchattach/2.0.0",
+                            "timestamp": timestamp,
+                            "user": user,
+                        }
+                    )
+                    for varname in data
+                ]
+            ),
+        )
+
+    def set_var(self, project_id, var_name, value, *, user="@server", skip_forward=None):
+        var_name = var_name.replace("☁ ", "")
+        project_id = str(project_id)
+        self.tw_variables.setdefault(project_id, {})[var_name] = value
+
+        if self.sync_players is True:
+            self._broadcast(
+                project_id,
+                json.dumps(
+                    {
+                        "method": "set",
+                        "project_id": project_id,
+                        "name": "☁ " + var_name,
+                        "value": value,
+                        "timestamp": time.time() * 1000,
+                        "user": user,
+                    }
+                ),
+                skip=skip_forward,
+            )
+
 
 class TwCloudSocket(WebSocket):
     server: TwCloudServer
@@ -44,19 +261,8 @@ class TwCloudSocket(WebSocket):
                 data["user"],
             )
         self.server.set_var(data["project_id"], data["name"], data["value"], user=data["user"], skip_forward=self)
-        send_to_clients = {
-            "method": "set",
-            "user": data["user"],
-            "project_id": data["project_id"],
-            "name": data["name"],
-            "value": data["value"],
-            "timestamp": round(time.time() * 1000),
-            "server": "scratchattach/2.0.0",
-        }
         # raise event
-        _a = cloud_activity.CloudActivity(timestamp=time.time() * 1000)
-        data["name"] = data["name"].replace("☁ ", "")
-        _a._update_from_dict(send_to_clients)
+        _a = self.server._set_activity(data["user"], data["project_id"], data["name"], data["value"])
         self.server.call_event("on_set", [_a, self])
 
     def handle_handshake(self, data: dict):
@@ -101,28 +307,20 @@ class TwCloudSocket(WebSocket):
             "user:",
             data["user"],
         )
-        self.server.tw_clients[self.address]["username"] = data["user"]
-        self.server.tw_clients[self.address]["project_id"] = data["project_id"]
+        project_id = self.server._register_handshake(self, data["user"], data["project_id"])
         # send current cloud variable values to the user who handshaked
-        self.sendMessage(
-            "\n".join(
-                [
-                    json.dumps(
-                        {
-                            "method": "set",
-                            "project_id": data["project_id"],
-                            "name": "☁ " + varname,
-                            "value": self.server.tw_variables[str(data["project_id"])][varname],
-                            "server": "scratchattach/2.0.0",
-                        }
-                    )
-                    for varname in self.server.get_project_vars(str(data["project_id"]))
-                ]
-            )
-        )
+        message = self.server._handshake_message(project_id)
+        if message is not None:
+            self.sendMessage(message)
         self.sendMessage("This server uses @TimMcCool's scratchattach 2.0.0")
         # raise event
-        self.server.call_event("on_handshake", [data["user"], data["project_id"], self])
+        self.server.call_event("on_handshake", [data["user"], project_id, self])
+
+    def send_frame(self, frame: bytes):
+        """
+        Queues an already built websocket frame (see _text_frame) for sending.
+        """
+        self.sendq.append((TEXT_OPCODE, frame))
 
     def handleMessage(self):
         if not self.server.running:
@@ -167,21 +365,15 @@ class TwCloudSocket(WebSocket):
             return
         try:
             if self.address in self.server.tw_clients:
+                client_data = self.server._unregister(self)
                 # raise event
-                self.server.call_event(
-                    "on_disconnect",
-                    [
-                        self.server.tw_clients[self.address]["username"],
-                        self.server.tw_clients[self.address]["project_id"],
-                        self,
-                    ],
-                )
+                self.server.call_event("on_disconnect", [client_data["username"], client_data["project_id"], self])
                 print(self.address[0] + ":" + str(self.address[1]), "disconnected")
         except Exception as e:
             print("Internal error in handleClose:", e)
 
 
-class TwCloudServer(SimpleWebSocketServer, BaseEventHandler):
+class TwCloudServer(SimpleWebSocketServer, BaseCloudServer):
     def __init__(
         self,
         hostname,
@@ -196,138 +388,37 @@ class TwCloudServer(SimpleWebSocketServer, BaseEventHandler):
         sync_players=True,
         log_var_sets=True,
     ):
-        if blocked_ips is None:
-            blocked_ips = []
-
         SimpleWebSocketServer.__init__(self, hostname, port=port, websocketclass=websocketclass)
-        BaseEventHandler.__init__(self)
-
-        self.running = False
-        self._events = {}  # saves event functions called on cloud updates
-
-        self.tw_clients = {}  # saves connected clients
-        self.tw_variables = {}  # holds cloud variable states
-
-        self.hostname = hostname
-        self.port = port
-
-        # server config
-        self.allow_non_numeric = allow_non_numeric
-        self.whitelisted_projects = whitelisted_projects
-        self.length_limit = length_limit
-        self.allow_nonscratch_names = allow_nonscratch_names
-        self.blocked_ips = blocked_ips
-        self.sync_players = sync_players
-        self.log_var_sets = log_var_sets
+        BaseCloudServer.__init__(
+            self,
+            hostname,
+            port=port,
+            length_limit=length_limit,
+            allow_non_numeric=allow_non_numeric,
+            whitelisted_projects=whitelisted_projects,
+            allow_nonscratch_names=allow_nonscratch_names,
+            blocked_ips=blocked_ips,
+            sync_players=sync_players,
+            log_var_sets=log_var_sets,
+        )
 
     def check_for_ip_ban(self, client):
-        if (
-            client.address[0] in self.blocked_ips
-            or client.address[0] + ":" + str(client.address[1]) in self.blocked_ips
-            or client.address in self.blocked_ips
-        ):
+        if self._is_ip_banned(client.address):
             client.sendMessage("You have been banned from this server")
             client.close(4002)
             print(client.address[0] + ":" + str(client.address[1]), "(IP-banned) was disconnected")
             return True
         return False
 
-    def active_projects(self):
-        only_active = {}
-        for project_id in self.tw_variables:
-            if self.active_user_ips(project_id) != []:
-                only_active[project_id] = self.tw_variables[project_id]
-        return only_active
-
-    def active_user_names(self, project_id):
-        return [self.tw_clients[user]["username"] for user in self.active_user_ips(project_id)]
-
-    def active_user_ips(self, project_id):
-        return list(filter(lambda user: str(self.tw_clients[user]["project_id"]) == str(project_id), self.tw_clients))
-
-    def get_global_vars(self):
-        return self.tw_variables
-
-    def get_project_vars(self, project_id):
-        project_id = str(project_id)
-        if project_id in self.tw_variables:
-            return self.tw_variables[project_id]
-        else:
-            return {}
-
-    def get_var(self, project_id, var_name):
-        project_id = str(project_id)
-        var_name = var_name.replace("☁ ", "")
-        if project_id in self.tw_variables:
-            if var_name in self.tw_variables[project_id]:
-                return self.tw_variables[project_id][var_name]
-            else:
-                return None
-        else:
-            return None
-
-    def set_global_vars(self, data):
-        for project_id in data:
-            self.set_project_vars(project_id, data[project_id])
-
-    def set_project_vars(self, project_id, data, *, user="@server"):
-        project_id = str(project_id)
-        self.tw_variables[project_id] = data
-        for client in [self.tw_clients[ip]["client"] for ip in self.active_user_ips(project_id)]:
-            client.sendMessage(
-                "\n".join(
-                    [
-                        json.dumps(
-                            {
-                                "method": "set",
-                                "project_id": project_id,
-                                "name": "☁ " + varname,
-                                "value": data[varname],
-                                "server": "scratchattach/2.0.0",
-                                "timestamp": time.time() * 1000,
-                                "user": user,
-                            }
-                        )
-                        for varname in data
-                    ]
-                )
-            )
-
-    def set_var(self, project_id, var_name, value, *, user="@server", skip_forward=None):
-        var_name = var_name.replace("☁ ", "")
-        project_id = str(project_id)
-        if project_id not in self.tw_variables:
-            self.tw_variables[project_id] = {}
-        self.tw_variables[project_id][var_name] = value
-
-        if self.sync_players is True:
-            for client in [self.tw_clients[ip]["client"] for ip in self.active_user_ips(project_id)]:
-                if client == skip_forward:
-                    continue
-                client.sendMessage(
-                    json.dumps(
-                        {
-                            "method": "set",
-                            "project_id": project_id,
-                            "name": "☁ " + var_name,
-                            "value": value,
-                            "timestamp": time.time() * 1000,
-                            "user": user,
-                        }
-                    )
-                )
-
-    def _check_value(self, value):
-        # Checks if a received cloud value satisfies the server's constraints
-        if self.length_limit is not None:
-            if len(str(value)) > self.length_limit:
-                return False
-        if self.allow_non_numeric is False:
-            x = value.replace(".", "")
-            x = x.replace("-", "")
-            if not (x.isnumeric() or x == ""):
-                return False
-        return True
+    def _broadcast(self, project_id, message, *, skip=None):
+        # The message is serialized and framed once, no matter how many clients it is sent to
+        clients = self.project_clients.get(str(project_id))
+        if not clients:
+            return
+        frame = _text_frame(message)
+        for client in list(clients.values()):
+            if client is not skip:
+                client.send_frame(frame)
 
     def _updater(self):
         try:
@@ -359,15 +450,40 @@ def init_cloud_server(
     blocked_ips=None,
     sync_players=True,
     log_var_sets=True,
+    engine="simplewebsocketserver",
+    max_buffer_size=1_000_000,
 ):
     """
     Inits a websocket server which can be used with TurboWarp's ?cloud_host URL parameter.
 
-    Prints out the websocket address in the console.
+    Prints out the websocket address in the console (the asyncio engine logs it to the "scratchattach.cloud_server"
+    logger instead).
+
+    Keyword Arguments:
+        engine (str): "simplewebsocketserver" (default) or "asyncio". The asyncio engine (AsyncTwCloudServer) handles thousands of clients, gives every client its own write buffer and logs to the "scratchattach.cloud_server" logger instead of printing.
+        max_buffer_size (int): Only for the asyncio engine. Clients that have more than this many characters waiting to be sent are disconnected.
     """
     if blocked_ips is None:
         blocked_ips = []
 
+    if engine == "asyncio":
+        from .async_cloud_server import AsyncTwCloudServer
+
+        return AsyncTwCloudServer(
+            hostname,
+            port=port,
+            length_limit=length_limit,
+            allow_non_numeric=allow_non_numeric,
+            whitelisted_projects=whitelisted_projects,
+            allow_nonscratch_names=allow_nonscratch_names,
+            blocked_ips=blocked_ips,
+            sync_players=sync_players,
+            log_var_sets=log_var_sets,
+            max_buffer_size=max_buffer_size,
+        )
+    if engine != "simplewebsocketserver":
+        raise ValueError(f"Unknown cloud server engine: {engine!r} (use 'simplewebsocketserver' or 'asyncio')")
+
     return TwCloudServer(
         hostname,
         port=port,
@@ -1,11 +1,10 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from collections.abc import Generator
 from typing import TypeVar, Optional, Self, Union, Any, Generic
 import json
 
-import requests
-
 from scratchattach.utils import exceptions, commons, optional_async
 from scratchattach.utils import requests as m_requests
 from . import session
@@ -13,6 +12,11 @@ from . import session
 D = TypeVar("D")
 C = TypeVar("C", bound="BaseSiteComponent")
 
+_update_flights: commons.SingleFlight = commons.SingleFlight()
+"""
+Shares the responses of identical update requests that are running at the same time (e.g. from several threads)
+"""
+
 
 class BaseSiteComponent(ABC, Generic[D]):
     _session: Optional[session.Session]
@@ -20,6 +24,10 @@ class BaseSiteComponent(ABC, Generic[D]):
     _headers: dict[str, str]
     _cookies: dict[str, str]
     oa_http_session: Optional[m_requests.OAHTTPSession] = None
+    update_method: str = "GET"
+    """
+    HTTP method used by update and async_update to fetch update_api
+    """
 
     # @abstractmethod
     # def __init__(self):  # dataclasses do not implement __init__ directly
@@ -29,21 +37,44 @@ class BaseSiteComponent(ABC, Generic[D]):
         """
         Updates the attributes of the object by performing an API response. Returns True if the update was successful.
         """
-        response = self.update_function(self.update_api, headers=self._headers, cookies=self._cookies, timeout=10)  # ty:ignore[invalid-argument-type]
+        def fetch():
+            return self.update_function(self.update_api, headers=self._headers, cookies=self._cookies, timeout=10)  # ty:ignore[invalid-argument-type]
+
+        if self.update_method == "GET":
+            flight_key = (self.update_function, self.update_api, self._cookies.get("scratchsessionsid"))
+            response = _update_flights.do(flight_key, fetch)
+        else:
+            response = fetch()
         # Check for 429 error:
         # Note, this is a bit naïve
         if "429" in str(response):
             return "429"
 
-        if json.loads(response.text) == {"response": "Too many requests"}:
+        return self._update_from_response_text(response.text)
+
+    def _update_from_response_text(self, text: str):
+        data = json.loads(text)
+        if data == {"response": "Too many requests"}:
             return "429"
 
         # If no error: Parse JSON:
-        response = response.json()
-        if "code" in response:
+        if "code" in data:
             return False
 
-        return self._update_from_dict(response)
+        return self._update_from_dict(data)
+
+    def _oa_update(self) -> Generator[optional_async.CARequest, None, Union[bool, str]]:
+        request = self._make_request(self.update_method, self.update_api, headers=self._headers, cookies=self._cookies)
+        yield request
+        if request.result.status_code == 429:
+            return "429"
+        return self._update_from_response_text(request.result.text)
+
+    async def async_update(self) -> Union[bool, str]:
+        """
+        Asynchronous version of update. Uses the object's oa_http_session or the active AsyncRequests session.
+        """
+        return await optional_async.make_async(self._oa_update)()
 
     def updated(self) -> Self:
         self.update()
@@ -72,9 +103,9 @@ class BaseSiteComponent(ABC, Generic[D]):
     def supply_data_dict(self, data: D) -> bool:
         return self._update_from_dict(data)
 
-    update_function = requests.get
+    update_function = m_requests.requests.get
     """
-    Internal function run on update. Function is a method of the 'requests' module/class
+    Internal function run on update. Function is a method of the shared, pooled 'requests' session
     """
 
     def _make_request(
@@ -88,6 +119,17 @@ class BaseSiteComponent(ABC, Generic[D]):
         data: Optional[Union[dict[str, str], str]] = None,
         json: Optional[Any] = None,
     ) -> optional_async.CARequest:
-        if self.oa_http_session is None:
-            raise ValueError("This BaseSiteComponent has no oa_http_session.")
-        return self.oa_http_session.request(method, url, cookies=cookies, headers=headers, params=params, data=data, json=json)
+        return self._get_oa_http_session().request(
+            method, url, cookies=cookies, headers=headers, params=params, data=data, json=json
+        )
+
+    def _get_oa_http_session(self) -> m_requests.OAHTTPSession:
+        """
+        Returns the object's oa_http_session, falling back to the AsyncRequests session that is currently entered.
+        """
+        if self.oa_http_session is not None:
+            return self.oa_http_session
+        try:
+            return m_requests.get_async_session()
+        except RuntimeError:
+            raise ValueError("This BaseSiteComponent has no oa_http_session and no AsyncRequests session is active.")
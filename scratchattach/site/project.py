@@ -8,6 +8,7 @@ import base64
 import time
 import warnings
 import zipfile
+from collections.abc import Iterator, Iterable
 from io import BytesIO
 from typing import Callable, Union, cast
 
@@ -25,6 +26,7 @@ from ._base import BaseSiteComponent
 # from scratchattach.other.project_json_capabilities import ProjectBody
 from scratchattach import editor
 from scratchattach.utils.requests import requests
+from scratchattach.utils import requests as m_requests
 
 CREATE_PROJECT_USES: list[float] = []
 
@@ -180,6 +182,29 @@ class PartialProject(BaseSiteComponent):
         response = commons.api_iterative(f"https://api.scratch.mit.edu/projects/{self.id}/remixes", limit=limit, offset=offset)
         return commons.parse_object_list(response, Project, self._session)
 
+    def iter_remixes(self, *, limit: Optional[int] = None, offset=0) -> Iterator[Project]:
+        """
+        Lazily yields the remixes of the project. Pages are fetched on demand.
+
+        Keyword arguments:
+            limit (int or None): Max amount of yielded remixes. If None, all remixes are yielded.
+            offset (int): Offset of the first yielded remix.
+        """
+        response = commons.api_iterative_stream(f"https://api.scratch.mit.edu/projects/{self.id}/remixes", limit=limit, offset=offset)
+        return commons.parse_object_iter(response, Project, self._session)
+
+    async def async_remixes(self, *, limit=40, offset=0) -> list[Project]:
+        """
+        Asynchronous version of :meth:`Project.remixes`. Requires an active AsyncRequests session.
+        """
+        response = await commons.async_api_iterative(
+            self._get_oa_http_session(),
+            f"https://api.scratch.mit.edu/projects/{self.id}/remixes",
+            limit=limit,
+            offset=offset,
+        )
+        return commons.parse_object_list(response, Project, self._session)
+
     def is_shared(self):
         """
         Returns:
@@ -431,6 +456,19 @@ class Project(PartialProject):
         )
         return commons.parse_object_list(response, studio.Studio, self._session)
 
+    async def async_studios(self, *, limit=40, offset=0) -> list[studio.Studio]:
+        """
+        Asynchronous version of :meth:`Project.studios`. Requires an active AsyncRequests session.
+        """
+        response = await commons.async_api_iterative(
+            self._get_oa_http_session(),
+            f"https://api.scratch.mit.edu/users/{self.author_name}/projects/{self.id}/studios",
+            limit=limit,
+            offset=offset,
+            add_params=f"&cachebust={random.randint(0, 9999)}",
+        )
+        return commons.parse_object_list(response, studio.Studio, self._session)
+
     def comments(self, *, limit=40, offset=0) -> list["comment.Comment"]:
         """
         Returns the comments posted on the project (except for replies. To get replies use :meth:`scratchattach.project.Project.comment_replies`).
@@ -456,6 +494,24 @@ class Project(PartialProject):
             i["source_id"] = self.id
         return commons.parse_object_list(response, comment.Comment, self._session)
 
+    async def async_comments(self, *, limit=40, offset=0) -> list[comment.Comment]:
+        """
+        Asynchronous version of :meth:`Project.comments`. Requires an active AsyncRequests session.
+        """
+        response = await commons.async_api_iterative(
+            self._get_oa_http_session(),
+            f"https://api.scratch.mit.edu/users/{self.author_name}/projects/{self.id}/comments/",
+            limit=limit,
+            offset=offset,
+            add_params=f"&cachebust={random.randint(0, 9999)}",
+            _headers=self._headers,
+            cookies=self._cookies,
+        )
+        for i in response:
+            i["source"] = "project"
+            i["source_id"] = self.id
+        return commons.parse_object_list(response, comment.Comment, self._session)
+
     def comment_replies(self, *, comment_id, limit=40, offset=0):
         response = commons.api_iterative(
             f"https://api.scratch.mit.edu/users/{self.author_name}/projects/{self.id}/comments/{comment_id}/replies/",
@@ -834,6 +890,33 @@ def get_project(project_id) -> Project:
     return commons._get_object("id", project_id, Project, exceptions.ProjectNotFound)
 
 
+def get_projects(project_ids: Iterable[Union[str, int]], *, max_workers: int = 16) -> list[Union[Project, Exception]]:
+    """
+    Gets many projects without logging in. The projects are fetched concurrently.
+
+    Args:
+        project_ids: Project ids of the requested projects
+        max_workers: Max. amount of projects that are fetched at the same time
+
+    Returns:
+        list: The projects, in the order of the project ids. If a project couldn't be fetched, the exception that was raised (like ProjectNotFound) is in its place.
+
+    Warning:
+        Any methods that require authentication (like project.love) will not work on the returned objects.
+
+        If you want to use these methods, get the projects with :meth:`scratchattach.session.Session.connect_projects` instead.
+    """
+    warnings.warn(
+        "For methods that require authentication, use session.connect_projects instead of get_projects.\n"
+        "If you want to remove this warning, "
+        "use `warnings.filterwarnings('ignore', category=scratchattach.ProjectAuthenticationWarning)`.\n"
+        "To ignore all warnings of the type GetAuthenticationWarning, which includes this warning, use "
+        "`warnings.filterwarnings('ignore', category=scratchattach.GetAuthenticationWarning)`.",
+        exceptions.ProjectAuthenticationWarning,
+    )
+    return commons._get_objects("id", project_ids, Project, exceptions.ProjectNotFound, max_workers=max_workers)
+
+
 def search_projects(*, query="", mode="trending", language="en", limit=40, offset=0):
     """
     Uses the Scratch search to search projects.
@@ -859,6 +942,22 @@ def search_projects(*, query="", mode="trending", language="en", limit=40, offse
     return commons.parse_object_list(response, Project)
 
 
+async def async_search_projects(*, query="", mode="trending", language="en", limit=40, offset=0) -> list[Project]:
+    """
+    Asynchronous version of :func:`search_projects`. Requires an active AsyncRequests session.
+    """
+    if not query:
+        raise ValueError("The query can't be empty for search")
+    response = await commons.async_api_iterative(
+        m_requests.get_async_session(),
+        "https://api.scratch.mit.edu/search/projects",
+        limit=limit,
+        offset=offset,
+        add_params=f"&language={language}&mode={mode}&q={query}",
+    )
+    return commons.parse_object_list(response, Project)
+
+
 def explore_projects(*, query="*", mode="trending", language="en", limit=40, offset=0):
     """
     Gets projects from the explore page.
@@ -882,3 +981,19 @@ def explore_projects(*, query="*", mode="trending", language="en", limit=40, off
         add_params=f"&language={language}&mode={mode}&q={query}",
     )
     return commons.parse_object_list(response, Project)
+
+
+async def async_explore_projects(*, query="*", mode="trending", language="en", limit=40, offset=0) -> list[Project]:
+    """
+    Asynchronous version of :func:`explore_projects`. Requires an active AsyncRequests session.
+    """
+    if not query:
+        raise ValueError("The query can't be empty for search")
+    response = await commons.async_api_iterative(
+        m_requests.get_async_session(),
+        "https://api.scratch.mit.edu/explore/projects",
+        limit=limit,
+        offset=offset,
+        add_params=f"&language={language}&mode={mode}&q={query}",
+    )
+    return commons.parse_object_list(response, Project)
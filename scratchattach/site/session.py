@@ -14,6 +14,7 @@ import time
 import warnings
 import zlib
 
+from collections.abc import Iterator, Iterable
 from dataclasses import dataclass, field
 from typing import Literal, Optional, TypeVar, TYPE_CHECKING, overload, Any, Union, cast
 from contextlib import contextmanager
@@ -26,6 +27,7 @@ Type = type
 if TYPE_CHECKING:
     from _typeshed import FileDescriptorOrPath, SupportsRead
     from scratchattach.cloud._base import BaseCloud
+    from scratchattach.cloud.async_cloud import AsyncScratchCloud
 
     T = TypeVar("T", bound=BaseCloud)
 else:
@@ -142,6 +144,7 @@ class Session(BaseSiteComponent):
     def __post_init__(self):
         # Info on how the .update method has to fetch the data:
         self.update_function = requests.post
+        self.update_method = "POST"
         self.update_api = "https://scratch.mit.edu/session"
 
         # Base headers and cookies of every session:
@@ -403,6 +406,56 @@ class Session(BaseSiteComponent):
         )
         return commons.parse_object_list(data, activity.Activity, self)
 
+    def iter_messages(
+        self, *, limit: Optional[int] = None, offset: int = 0, date_limit=None, filter_by=None
+    ) -> Iterator[activity.Activity]:
+        """
+        Lazily yields the messages. Pages are fetched on demand, so iteration can stop early (e.g. once an already
+        seen message is reached) without requesting older messages.
+
+        Keyword arguments:
+            limit (int or None): Max amount of yielded messages. If None, all messages are yielded.
+            offset, date_limit, filter_by: See :meth:`Session.messages`
+        """
+        add_params = ""
+        if date_limit is not None:
+            add_params += f"&dateLimit={date_limit}"
+        if filter_by is not None:
+            add_params += f"&filter={filter_by}"
+
+        data = commons.api_iterative_stream(
+            f"https://api.scratch.mit.edu/users/{self._username}/messages",
+            limit=limit,
+            offset=offset,
+            _headers=self._headers,
+            cookies=self._cookies,
+            add_params=add_params,
+        )
+        return commons.parse_object_iter(data, activity.Activity, self)
+
+    async def async_messages(
+        self, *, limit: int = 40, offset: int = 0, date_limit=None, filter_by=None
+    ) -> list[activity.Activity]:
+        """
+        Asynchronous version of :meth:`Session.messages`. Requires an active AsyncRequests session.
+        """
+        add_params = ""
+        if date_limit is not None:
+            add_params += f"&dateLimit={date_limit}"
+        if filter_by is not None:
+            add_params += f"&filter={filter_by}"
+
+        data = await commons.async_api_iterative(
+            self._get_oa_http_session(),
+            f"https://api.scratch.mit.edu/users/{self._username}/messages",
+            limit=limit,
+            offset=offset,
+            _headers=self._headers,
+            cookies=self._cookies,
+            add_params=add_params,
+        )
+        return commons.parse_object_list(data, activity.Activity, self)
+
     def admin_messages(self, *, limit=40, offset=0) -> list[dict]:
         """
         Returns your messages sent by the Scratch team (alerts).
@@ -1070,6 +1123,15 @@ class Session(BaseSiteComponent):
         """
         return cloud.TwCloud(project_id=project_id, purpose=purpose, contact=contact, cloud_host=cloud_host, _session=self)
 
+    def connect_async_scratch_cloud(self, project_id) -> AsyncScratchCloud:
+        """
+        Returns:
+            scratchattach.cloud.AsyncScratchCloud: An asyncio-based object representing the Scratch cloud of a project.
+        """
+        from scratchattach.cloud.async_cloud import AsyncScratchCloud
+
+        return AsyncScratchCloud(project_id=project_id, _session=self)
+
     # --- Connect classes inheriting from BaseSiteComponent ---
 
     # noinspection PyPep8Naming
@@ -1101,6 +1163,19 @@ class Session(BaseSiteComponent):
         """
         return self._make_linked_object("username", username, user.User, exceptions.UserNotFound)
 
+    def connect_users(self, usernames: Iterable[str], *, max_workers: int = 16) -> list[Union[user.User, Exception]]:
+        """
+        Gets many users using this session. The users are fetched concurrently.
+
+        Args:
+            usernames: Usernames of the requested users
+            max_workers: Max. amount of users that are fetched at the same time
+
+        Returns:
+            list: The users, in the order of the usernames. If a user couldn't be fetched, the exception that was raised (like UserNotFound) is in its place.
+        """
+        return commons._get_objects("username", usernames, user.User, exceptions.UserNotFound, self, max_workers)
+
     @deprecated("Finding usernames by user ids has been fixed.")
     def find_username_from_id(self, user_id: int) -> str:
         """
@@ -1163,6 +1238,20 @@ class Session(BaseSiteComponent):
         """
         return self._make_linked_object("id", int(project_id), project.Project, exceptions.ProjectNotFound)
 
+    def connect_projects(self, project_ids: Iterable[Union[str, int]], *,
+                         max_workers: int = 16) -> list[Union[project.Project, Exception]]:
+        """
+        Gets many projects using this session. The projects are fetched concurrently.
+
+        Args:
+            project_ids: IDs of the requested projects
+            max_workers: Max. amount of projects that are fetched at the same time
+
+        Returns:
+            list: The projects, in the order of the project ids. If a project couldn't be fetched, the exception that was raised (like ProjectNotFound) is in its place.
+        """
+        return commons._get_objects("id", project_ids, project.Project, exceptions.ProjectNotFound, self, max_workers, convert=int)
+
     def connect_studio(self, studio_id) -> studio.Studio:
         """
         Gets a studio using this session, connects the session to the Studio object to allow authenticated actions
@@ -1175,6 +1264,20 @@ class Session(BaseSiteComponent):
         """
         return self._make_linked_object("id", int(studio_id), studio.Studio, exceptions.StudioNotFound)
 
+    def connect_studios(self, studio_ids: Iterable[Union[str, int]], *,
+                        max_workers: int = 16) -> list[Union[studio.Studio, Exception]]:
+        """
+        Gets many studios using this session. The studios are fetched concurrently.
+
+        Args:
+            studio_ids: IDs of the requested studios
+            max_workers: Max. amount of studios that are fetched at the same time
+
+        Returns:
+            list: The studios, in the order of the studio ids. If a studio couldn't be fetched, the exception that was raised (like StudioNotFound) is in its place.
+        """
+        return commons._get_objects("id", studio_ids, studio.Studio, exceptions.StudioNotFound, self, max_workers, convert=int)
+
     def connect_classroom(self, class_id) -> classroom.Classroom:
         """
         Gets a class using this session.
@@ -5,8 +5,10 @@ import warnings
 import json
 import random
 
+from collections.abc import Iterator, Iterable
 from dataclasses import dataclass, field
 
+from typing import Union
 from typing_extensions import Optional
 
 from . import user, comment, project, activity, session
@@ -164,6 +166,22 @@ class Studio(BaseSiteComponent):
             i["source_id"] = self.id
         return commons.parse_object_list(response, comment.Comment, self._session)
 
+    async def async_comments(self, *, limit=40, offset=0) -> list[comment.Comment]:
+        """
+        Asynchronous version of :meth:`Studio.comments`. Requires an active AsyncRequests session.
+        """
+        response = await commons.async_api_iterative(
+            self._get_oa_http_session(),
+            f"https://api.scratch.mit.edu/studios/{self.id}/comments/",
+            limit=limit,
+            offset=offset,
+            add_params=f"&cachebust={random.randint(0,9999)}",
+        )
+        for i in response:
+            i["source"] = "studio"
+            i["source_id"] = self.id
+        return commons.parse_object_list(response, comment.Comment, self._session)
+
     def comment_replies(self, *, comment_id, limit=40, offset=0) -> list[comment.Comment]:
         response = commons.api_iterative(
             f"https://api.scratch.mit.edu/studios/{self.id}/comments/{comment_id}/replies", limit=limit, offset=offset, add_params=f"&cachebust={random.randint(0,9999)}")
@@ -330,6 +348,30 @@ class Studio(BaseSiteComponent):
             f"https://api.scratch.mit.edu/studios/{self.id}/projects", limit=limit, offset=offset)
         return commons.parse_object_list(response, project.Project, self._session)
 
+    def iter_projects(self, limit: Optional[int] = None, offset=0) -> Iterator[project.Project]:
+        """
+        Lazily yields the studio projects. Pages are fetched on demand.
+
+        Keyword arguments:
+            limit (int or None): Max amount of yielded projects. If None, all studio projects are yielded.
+            offset (int): Offset of the first yielded project.
+        """
+        response = commons.api_iterative_stream(
+            f"https://api.scratch.mit.edu/studios/{self.id}/projects", limit=limit, offset=offset)
+        return commons.parse_object_iter(response, project.Project, self._session)
+
+    async def async_projects(self, limit=40, offset=0) -> list[project.Project]:
+        """
+        Asynchronous version of :meth:`Studio.projects`. Requires an active AsyncRequests session.
+        """
+        response = await commons.async_api_iterative(
+            self._get_oa_http_session(),
+            f"https://api.scratch.mit.edu/studios/{self.id}/projects",
+            limit=limit,
+            offset=offset,
+        )
+        return commons.parse_object_list(response, project.Project, self._session)
+
     def curators(self, limit=40, offset=0) -> list[user.User]:
         """
         Gets the studio curators.
@@ -345,6 +387,18 @@ class Studio(BaseSiteComponent):
             f"https://api.scratch.mit.edu/studios/{self.id}/curators", limit=limit, offset=offset)
         return commons.parse_object_list(response, user.User, self._session, "username")
 
+    def iter_curators(self, limit: Optional[int] = None, offset=0) -> Iterator[user.User]:
+        """
+        Lazily yields the studio curators. Pages are fetched on demand.
+
+        Keyword arguments:
+            limit (int or None): Max amount of yielded curators. If None, all curators are yielded.
+            offset (int): Offset of the first yielded curator.
+        """
+        response = commons.api_iterative_stream(
+            f"https://api.scratch.mit.edu/studios/{self.id}/curators", limit=limit, offset=offset)
+        return commons.parse_object_iter(response, user.User, self._session, "username")
+
 
     def invite_curator(self, curator):
         """
@@ -647,7 +701,7 @@ def get_studio(studio_id) -> Studio:
         scratchattach.studio.Studio: An object representing the requested studio
 
     Warning:
-        Any methods that authentication (like studio.follow) will not work on the returned object.
+        Any methods that require authentication (like studio.follow) will not work on the returned object.
 
         If you want to use these, get the studio with :meth:`scratchattach.session.Session.connect_studio` instead.
     """
@@ -660,6 +714,31 @@ def get_studio(studio_id) -> Studio:
     )
     return commons._get_object("id", studio_id, Studio, exceptions.StudioNotFound)
 
+def get_studios(studio_ids: Iterable[Union[str, int]], *, max_workers: int = 16) -> list[Union[Studio, Exception]]:
+    """
+    Gets many studios without logging in. The studios are fetched concurrently.
+
+    Args:
+        studio_ids: Studio ids of the requested studios
+        max_workers: Max. amount of studios that are fetched at the same time
+
+    Returns:
+        list: The studios, in the order of the studio ids. If a studio couldn't be fetched, the exception that was raised (like StudioNotFound) is in its place.
+
+    Warning:
+        Any methods that require authentication (like studio.follow) will not work on the returned objects.
+
+        If you want to use these, get the studios with :meth:`scratchattach.session.Session.connect_studios` instead.
+    """
+    warnings.warn(
+        "Warning: For methods that require authentication, use session.connect_studios instead of get_studios.\n"
+        "If you want to remove this warning, use warnings.filterwarnings('ignore', category=scratchattach.StudioAuthenticationWarning).\n"
+        "To ignore all warnings of the type GetAuthenticationWarning, which includes this warning, use "
+        "`warnings.filterwarnings('ignore', category=scratchattach.GetAuthenticationWarning)`.",
+        exceptions.StudioAuthenticationWarning
+    )
+    return commons._get_objects("id", studio_ids, Studio, exceptions.StudioNotFound, max_workers=max_workers)
+
 def search_studios(*, query="", mode="trending", language="en", limit=40, offset=0):
     if not query:
         raise ValueError("The query can't be empty for search")
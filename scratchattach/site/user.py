@@ -7,6 +7,7 @@ import random
 import re
 import string
 import warnings
+from collections.abc import Iterator, Iterable
 from typing import Union, cast, Optional, TypedDict
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
@@ -406,6 +407,34 @@ class User(BaseSiteComponent[typed_dicts.UserDict]):
         )
         return commons.parse_object_list(response, User, self._session, "username")
 
+    def iter_followers(self, *, limit: Optional[int] = None, offset=0) -> Iterator[User]:
+        """
+        Lazily yields the user's followers. Pages are fetched on demand, so iteration can stop early without
+        requesting the remaining followers.
+
+        Keyword arguments:
+            limit (int or None): Max amount of yielded followers. If None, all followers are yielded.
+            offset (int): Offset of the first yielded follower.
+        """
+        response = commons.api_iterative_stream(
+            f"https://api.scratch.mit.edu/users/{self.username}/followers/",
+            limit=limit,
+            offset=offset,
+        )
+        return commons.parse_object_iter(response, User, self._session, "username")
+
+    async def async_followers(self, *, limit=40, offset=0) -> list[User]:
+        """
+        Asynchronous version of :meth:`User.followers`. Requires an active AsyncRequests session.
+        """
+        response = await commons.async_api_iterative(
+            self._get_oa_http_session(),
+            f"https://api.scratch.mit.edu/users/{self.username}/followers/",
+            limit=limit,
+            offset=offset,
+        )
+        return commons.parse_object_list(response, User, self._session, "username")
+
     def follower_names(self, *, limit=40, offset=0):
         """
         Returns:
@@ -425,6 +454,33 @@ class User(BaseSiteComponent[typed_dicts.UserDict]):
         )
         return commons.parse_object_list(response, User, self._session, "username")
 
+    def iter_following(self, *, limit: Optional[int] = None, offset=0) -> Iterator[User]:
+        """
+        Lazily yields the users that the user is following. Pages are fetched on demand.
+
+        Keyword arguments:
+            limit (int or None): Max amount of yielded users. If None, all followed users are yielded.
+            offset (int): Offset of the first yielded user.
+        """
+        response = commons.api_iterative_stream(
+            f"https://api.scratch.mit.edu/users/{self.username}/following/",
+            limit=limit,
+            offset=offset,
+        )
+        return commons.parse_object_iter(response, User, self._session, "username")
+
+    async def async_following(self, *, limit=40, offset=0) -> list[User]:
+        """
+        Asynchronous version of :meth:`User.following`. Requires an active AsyncRequests session.
+        """
+        response = await commons.async_api_iterative(
+            self._get_oa_http_session(),
+            f"https://api.scratch.mit.edu/users/{self.username}/following/",
+            limit=limit,
+            offset=offset,
+        )
+        return commons.parse_object_list(response, User, self._session, "username")
+
     def following_names(self, *, limit=40, offset=0):
         """
         Returns:
@@ -535,6 +591,18 @@ class User(BaseSiteComponent[typed_dicts.UserDict]):
             studios.append(_studio)
         return studios
 
+    async def async_studios(self, *, limit=40, offset=0) -> list[studio.Studio]:
+        """
+        Asynchronous version of :meth:`User.studios`. Requires an active AsyncRequests session.
+        """
+        _studios = await commons.async_api_iterative(
+            self._get_oa_http_session(),
+            f"https://api.scratch.mit.edu/users/{self.username}/studios/curate",
+            limit=limit,
+            offset=offset,
+        )
+        return commons.parse_object_list(_studios, studio.Studio, self._session)
+
     def studios_following(self) -> list[studio.Studio]:
         with requests.no_error_handling():
             resp = requests.get(
@@ -579,6 +647,43 @@ class User(BaseSiteComponent[typed_dicts.UserDict]):
             p["author"] = {"username": self.username}
         return commons.parse_object_list(_projects, project.Project, self._session)
 
+    def iter_projects(self, *, limit: Optional[int] = None, offset=0) -> Iterator[project.Project]:
+        """
+        Lazily yields the user's shared projects. Pages are fetched on demand.
+
+        Keyword arguments:
+            limit (int or None): Max amount of yielded projects. If None, all shared projects are yielded.
+            offset (int): Offset of the first yielded project.
+        """
+        _projects = commons.api_iterative_stream(
+            f"https://api.scratch.mit.edu/users/{self.username}/projects/",
+            limit=limit,
+            offset=offset,
+            _headers=self._headers,
+        )
+
+        def with_author(raw_projects: Iterator[dict]) -> Iterator[dict]:
+            for p in raw_projects:
+                p["author"] = {"username": self.username}
+                yield p
+
+        return commons.parse_object_iter(with_author(_projects), project.Project, self._session)
+
+    async def async_projects(self, *, limit=40, offset=0) -> list[project.Project]:
+        """
+        Asynchronous version of :meth:`User.projects`. Requires an active AsyncRequests session.
+        """
+        _projects = await commons.async_api_iterative(
+            self._get_oa_http_session(),
+            f"https://api.scratch.mit.edu/users/{self.username}/projects/",
+            limit=limit,
+            offset=offset,
+            _headers=self._headers,
+        )
+        for p in _projects:
+            p["author"] = {"username": self.username}
+        return commons.parse_object_list(_projects, project.Project, self._session)
+
     def loves(self, *, limit=40, offset=0, get_full_project: bool = False) -> list[project.Project]:
         """
         Returns:
@@ -1248,3 +1353,29 @@ def get_user(username) -> User:
         exceptions.UserAuthenticationWarning,
     )
     return commons._get_object("username", username, User, exceptions.UserNotFound)
+
+
+def get_users(usernames: Iterable[str], *, max_workers: int = 16) -> list[Union[User, Exception]]:
+    """
+    Gets many users without logging in. The users are fetched concurrently.
+
+    Args:
+        usernames: Usernames of the requested users
+        max_workers: Max. amount of users that are fetched at the same time
+
+    Returns:
+        list: The users, in the order of the usernames. If a user couldn't be fetched, the exception that was raised (like UserNotFound) is in its place.
+
+    Warning:
+        Any methods that require authentication (like user.follow) will not work on the returned objects.
+
+        If you want to use these, get the users with :meth:`scratchattach.session.Session.connect_users` instead.
+    """
+    warnings.warn(
+        "Warning: For methods that require authentication, use session.connect_users instead of get_users.\n"
+        "To ignore this warning, use warnings.filterwarnings('ignore', category=scratchattach.UserAuthenticationWarning).\n"
+        "To ignore all warnings of the type GetAuthenticationWarning, which includes this warning, use "
+        "`warnings.filterwarnings('ignore', category=scratchattach.GetAuthenticationWarning)`.",
+        exceptions.UserAuthenticationWarning,
+    )
+    return commons._get_objects("username", usernames, User, exceptions.UserNotFound, max_workers=max_workers)
@@ -3,12 +3,16 @@ from __future__ import annotations
 
 import string
 
-from typing import Optional, Final, Any, TypeVar, Callable, TYPE_CHECKING, Union, overload
+from collections import deque
+from collections.abc import Iterator, Generator, Hashable
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import chain, islice
+from typing import Optional, Final, Any, TypeVar, Callable, TYPE_CHECKING, Union, overload, Generic
 from threading import Event as ManualResetEvent
 from threading import Lock
 
-from . import exceptions
-from .requests import requests
+from . import exceptions, optional_async
+from .requests import requests, OAHTTPSession
 
 from scratchattach.site import _base
 
@@ -67,20 +71,37 @@ empty_project_json: Final = {
 }
 
 
+iterative_concurrency: int = 1
+"""
+Default number of pages api_iterative_data fetches in parallel. Values above 1 enable concurrent page fetching for
+all iterative API methods (like user.followers or studio.projects).
+"""
+
+
 def api_iterative_data(fetch_func: Callable[[int, int], list], limit: int, offset: int, max_req_limit: int = 40,
-                       unpack: bool = True) -> list:
+                       unpack: bool = True, concurrency: Optional[int] = None) -> list:
     """
     Iteratively gets data by calling fetch_func with a moving offset and a limit.
     Once fetch_func returns None, the retrieval is completed.
+
+    If concurrency is above 1, up to that many pages are fetched in parallel. Results are still returned in order, and
+    no further pages are requested once a page marks the end of the data.
     """
     if limit is None:
         limit = max_req_limit
+    if concurrency is None:
+        concurrency = iterative_concurrency
 
     end = offset + limit
+    offsets = range(offset, end, max_req_limit)
+    if concurrency > 1 and len(offsets) > 1:
+        pages = _fetch_pages_concurrently(fetch_func, offsets, max_req_limit, concurrency)
+    else:
+        pages = (fetch_func(offs, max_req_limit) for offs in offsets)
+
     api_data = []
-    for offs in range(offset, end, max_req_limit):
-        # Mimic actual scratch by only requesting the max amount
-        data = fetch_func(offs, max_req_limit)
+    # Mimic actual scratch by only requesting the max amount
+    for data in pages:
         if data is None:
             break
 
@@ -96,21 +117,71 @@ def api_iterative_data(fetch_func: Callable[[int, int], list], limit: int, offse
     return api_data
 
 
-def api_iterative(url: str, *, limit: int, offset: int, max_req_limit: int = 40, add_params: str = "",
-                  _headers: Optional[dict] = None, cookies: Optional[dict] = None):
+def _fetch_pages_concurrently(fetch_func: Callable[[int, int], Any], offsets: range, max_req_limit: int,
+                              concurrency: int) -> Iterator[Any]:
+    # Internal function: Yields the pages in order while keeping at most `concurrency` requests in flight.
+    # Pages that haven't been started yet are cancelled once the end is reached or the consumer stops iterating.
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    pending: deque[Future] = deque()
+    remaining = iter(offsets)
+    try:
+        for offs in islice(remaining, concurrency):
+            pending.append(executor.submit(fetch_func, offs, max_req_limit))
+        while pending:
+            data = pending.popleft().result()
+            if data is None or len(data) < max_req_limit:
+                yield data
+                return
+            for offs in islice(remaining, 1):
+                pending.append(executor.submit(fetch_func, offs, max_req_limit))
+            yield data
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def api_iterative_pages(fetch_func: Callable[[int, int], Optional[list]], limit: Optional[int], offset: int,
+                        max_req_limit: int = 40, prefetch: bool = True) -> Iterator[list]:
     """
-    Function for getting data from one of Scratch's iterative JSON API endpoints (like /users/<user>/followers, or /users/<user>/projects)
+    Lazily yields the pages returned by calling fetch_func with a moving offset and a limit.
+    Unlike api_iterative_data, a page is only requested once the previous one has been consumed. If prefetch is True,
+    the next page is already requested in the background while the current one is being processed.
+    If limit is None, pages are yielded until fetch_func signals the end of the data.
     """
+    end = None if limit is None else offset + limit
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    pending: Optional[Future] = None
+    offs = offset
+    try:
+        while end is None or offs < end:
+            # Mimic actual scratch by only requesting the max amount
+            data = fetch_func(offs, max_req_limit) if pending is None else pending.result()
+            pending = None
+            if not data:
+                return
+            if end is not None:
+                data = data[:end - offs]
+
+            next_offs = offs + max_req_limit
+            has_more = len(data) >= max_req_limit and (end is None or next_offs < end)
+            if has_more and executor is not None:
+                pending = executor.submit(fetch_func, next_offs, max_req_limit)
+            yield data
+            if not has_more:
+                return
+            offs = next_offs
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _api_iterative_fetcher(url: str, add_params: str, _headers: Optional[dict],
+                           cookies: Optional[dict]) -> Callable[[int, int], Optional[list]]:
+    # Internal function: Builds the fetch function for one of Scratch's iterative JSON API endpoints
     if _headers is None:
         _headers = headers.copy()
     if cookies is None:
         cookies = {}
 
-    if offset < 0:
-        raise exceptions.BadRequest("offset parameter must be >= 0")
-    if limit < 0:
-        raise exceptions.BadRequest("limit parameter must be >= 0")
-
     def fetch(off: int, lim: int):
         """
         Performs a single API request
@@ -125,11 +196,83 @@ def api_iterative(url: str, *, limit: int, offset: int, max_req_limit: int = 40,
             raise exceptions.BadRequest("The passed arguments are invalid")
         return resp
 
+    return fetch
+
+
+def _check_iterative_args(limit: Optional[int], offset: int):
+    if offset < 0:
+        raise exceptions.BadRequest("offset parameter must be >= 0")
+    if limit is not None and limit < 0:
+        raise exceptions.BadRequest("limit parameter must be >= 0")
+
+
+def api_iterative(url: str, *, limit: int, offset: int, max_req_limit: int = 40, add_params: str = "",
+                  _headers: Optional[dict] = None, cookies: Optional[dict] = None, concurrency: Optional[int] = None):
+    """
+    Function for getting data from one of Scratch's iterative JSON API endpoints (like /users/<user>/followers, or /users/<user>/projects)
+
+    concurrency is passed on to api_iterative_data. If it is None, commons.iterative_concurrency is used.
+    """
+    _check_iterative_args(limit, offset)
+    fetch = _api_iterative_fetcher(url, add_params, _headers, cookies)
+
     api_data = api_iterative_data(
-        fetch, limit, offset, max_req_limit=max_req_limit, unpack=True
+        fetch, limit, offset, max_req_limit=max_req_limit, unpack=True, concurrency=concurrency
     )
     return api_data
 
+
+def api_iterative_stream(url: str, *, limit: Optional[int] = None, offset: int = 0, max_req_limit: int = 40,
+                         add_params: str = "", _headers: Optional[dict] = None, cookies: Optional[dict] = None,
+                         prefetch: bool = True) -> Iterator[dict]:
+    """
+    Streaming variant of api_iterative: Lazily yields the items of one of Scratch's iterative JSON API endpoints.
+    Pages are requested one at a time (with the next page prefetched), so memory use doesn't grow with the limit and
+    no further requests are made once the consumer stops iterating. If limit is None, all items are yielded.
+    """
+    _check_iterative_args(limit, offset)
+    fetch = _api_iterative_fetcher(url, add_params, _headers, cookies)
+
+    return chain.from_iterable(api_iterative_pages(fetch, limit, offset, max_req_limit, prefetch))
+
+
+def oa_api_iterative(oa_session: OAHTTPSession, url: str, *, limit: int, offset: int, max_req_limit: int = 40,
+                     add_params: str = "", _headers: Optional[dict] = None,
+                     cookies: Optional[dict] = None) -> Generator[optional_async.CARequest, None, list]:
+    """
+    Optionally-async variant of api_iterative that performs its requests through oa_session.
+    Has to be run through optional_async (use async_api_iterative to await it directly).
+    """
+    _check_iterative_args(limit, offset)
+    if _headers is None:
+        _headers = headers.copy()
+    if cookies is None:
+        cookies = {}
+
+    api_data = []
+    for offs in range(offset, offset + limit, max_req_limit):
+        # Mimic actual scratch by only requesting the max amount
+        request = oa_session.request(
+            "GET", f"{url}?limit={max_req_limit}&offset={offs}{add_params}", headers=_headers, cookies=cookies
+        )
+        yield request
+        data = request.result.json()
+
+        if not data:
+            break
+        if data == {"code": "BadRequest", "message": ""}:
+            raise exceptions.BadRequest("The passed arguments are invalid")
+        api_data.extend(data)
+
+        if len(data) < max_req_limit:
+            break
+
+    return api_data[:limit]
+
+
+async_api_iterative = optional_async.make_async(oa_api_iterative)
+
+
 def _get_object(identificator_name, identificator, __class: type[C], NotFoundException, session=None) -> C:
     # Internal function: Generalization of the process ran by get_user, get_studio etc.
     # Builds an object of class that is inheriting from BaseSiteComponent
@@ -162,6 +305,26 @@ def _get_object(identificator_name, identificator, __class: type[C], NotFoundExc
     except Exception as e:
         raise e
 
+def _get_objects(identificator_name, identificators, __class: type[C], NotFoundException, session=None,
+                 max_workers: int = 16, convert: Optional[Callable[[Any], Any]] = None) -> list[Union[C, Exception]]:
+    # Internal function: Bulk version of _get_object, used by get_users, get_projects etc.
+    # Fetches the objects concurrently over the pooled requests session. The results are in the order of the
+    # identificators; if an object can't be fetched, the raised exception takes its place in the list.
+    # convert (like int) is applied to each identificator, so an invalid one only fails its own item.
+    def get(identificator) -> Union[C, Exception]:
+        try:
+            if convert is not None:
+                identificator = convert(identificator)
+            return _get_object(identificator_name, identificator, __class, NotFoundException, session)
+        except Exception as e:
+            return e
+
+    identificators = list(identificators)
+    if len(identificators) <= 1:
+        return [get(identificator) for identificator in identificators]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(identificators))) as executor:
+        return list(executor.map(get, identificators))
+
 I = TypeVar("I")
 @overload
 def webscrape_count(raw: str, text_before: str, text_after: str, cls: type[I]) -> I:
@@ -179,16 +342,22 @@ if TYPE_CHECKING:
     C = TypeVar("C", bound=_base.BaseSiteComponent)
 
 def parse_object_list(raw, /, __class: type[C], session=None, primary_key="id") -> list[C]:
-    results = []
+    return list(parse_object_iter(raw, __class, session, primary_key))
+
+
+def parse_object_iter(raw, /, __class: type[C], session=None, primary_key="id") -> Iterator[C]:
+    """
+    Lazy variant of parse_object_list. raw can be any iterable, like the one returned by api_iterative_stream.
+    """
     for raw_dict in raw:
         try:
             _obj = __class(**{primary_key: raw_dict[primary_key], "_session": session})
             # noinspection PyProtectedMember
             _obj._update_from_dict(raw_dict)
-            results.append(_obj)
         except Exception as e:
             print("Warning raised by scratchattach: failed to parse ", raw_dict, "error", e)
-    return results
+            continue
+        yield _obj
 
 
 class LockEvent:
@@ -233,6 +402,56 @@ class LockEvent:
         lock.acquire(timeout=0)
         return lock
 
+T = TypeVar("T")
+
+
+class _Flight(Generic[T]):
+    done: ManualResetEvent
+    result: T
+    error: Optional[BaseException]
+
+    def __init__(self):
+        self.done = ManualResetEvent()
+        self.error = None
+
+
+class SingleFlight(Generic[T]):
+    """
+    Deduplicates concurrent calls. While a call for a key is running, other threads calling with the same key wait for
+    it and receive its result (or exception) instead of performing the call themselves.
+    """
+    _flights: dict[Hashable, _Flight[T]]
+    _lock: Lock
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = Lock()
+
+    def do(self, key: Hashable, func: Callable[[], T]) -> T:
+        with self._lock:
+            flight = self._flights.get(key)
+            is_leader = flight is None
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+
+        if not is_leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+
 def get_class_sort_mode(mode: str) -> tuple[str, str]:
     """
     Returns the sort mode for the given mode for classes only
@@ -106,9 +106,88 @@ letters = [
 ]
 
 
+class _EncodeTable(dict):
+    # str.translate table: maps the code point of every character in letters to its number. Other characters are
+    # encoded like a space, which is looked up once and then cached in the table.
+    def __init__(self, space_code):
+        super().__init__()
+        self.space_code = space_code
+
+    def __missing__(self, code_point):
+        if self.space_code is None:
+            raise ValueError("' ' is not in list")
+        self[code_point] = self.space_code
+        return self.space_code
+
+
+_tables_source: list = []
+_encode_table = _EncodeTable(None)
+_decode_table: dict[str, str] = {}
+
+
+def _tables():
+    # Rebuilds the lookup tables if letters was changed (by replace_char or directly)
+    global _tables_source, _encode_table, _decode_table
+    if _tables_source != letters:
+        encode_table = _EncodeTable(str(letters.index(" ")) if " " in letters else None)
+        decode_table = {}
+        for i, letter in reversed(list(enumerate(letters))):  # reversed, so the first index of a letter wins
+            if letter is None:
+                continue
+            if len(letter) == 1:
+                encode_table[ord(letter)] = str(i)
+            decode_table[f"{i:02}"] = letter
+        _encode_table, _decode_table = encode_table, decode_table
+        _tables_source = list(letters)
+    return _encode_table, _decode_table
+
+
+def _longest_copy(codes: list[str], i: int, recent: dict[tuple[str, ...], list[int]]) -> tuple[int, int]:
+    # The longest earlier sequence (at most 999 letters back) that the letters from i repeat, as (length, distance)
+    n = len(codes)
+    copy_length = copy_distance = 0
+    for position in reversed(recent.get(tuple(codes[i:i + 4]), ())):
+        distance = i - position
+        if distance > 999:
+            break
+        length = 0
+        while i + length < n and length < 99 and codes[position + length] == codes[i + length]:
+            length += 1
+        if length > copy_length:
+            copy_length, copy_distance = length, distance
+    return copy_length, copy_distance
+
+
+def _remember_positions(codes: list[str], start: int, stop: int, recent: dict[tuple[str, ...], list[int]]):
+    # Records where the sequences of 4 letters starting at start..stop-1 are, keeping the last 16 of each sequence
+    for j in range(start, min(stop, len(codes) - 3)):
+        positions = recent.setdefault(tuple(codes[j:j + 4]), [])
+        positions.append(j)
+        if len(positions) > 16:
+            del positions[0]
+
+
 class Encoding:
     """
     Class that contains tools for encoding / decoding strings. The strings encoded / decoded with these functions can be decoded / encoded with Scratch using this sprite: https://scratch3-assets.1tim.repl.co/Encoder.sprite3
+
+    That sprite only understands decimal responses. Cloud requests responses use this wire format, so decoder sprites
+    can be extended to read compressed responses as well:
+
+    - A response is split into packets, each one set to the next FROM_HOST_ variable. A packet is
+      "{data}.{request_id}{ending}". For every packet except the last one, the ending is the packet number (3 digits,
+      starting at 001) followed by 1. The ending of the last packet is the validation number, which tells how the joined
+      data of all packets is decoded:
+
+      - 2222: decimal. The items of the output, encoded with Encoding.encode, each one followed by 89
+      - 3222: an integer, sent as it is
+      - 4222: compressed. Decompress the data like Encoding.decompress (see Encoding.compress for the 01 / 02 markers), then decode it like a decimal response
+
+    - Handshake: A decoder sprite that can decompress sends the request "_response_encodings&decimal&compressed"
+      (encoded like any other request) once, for example when the green flag is clicked. The response is the encoding
+      that will be used from now on ("compressed" or "decimal"). Until then, and with decoders that never send it,
+      responses are decimal (unless CloudRequests was created with response_encoding="compressed").
+    - Even with the compressed encoding, a response is only sent compressed if that makes it shorter.
     """
     @staticmethod
     def decode(inp):
@@ -124,8 +203,13 @@ class Encoding:
         except Exception:
             raise exceptions.InvalidDecodeInput
 
+        _, decode_table = _tables()
+        try:
+            return "".join([decode_table[inp[i:i + 2]] for i in range(0, len(inp) - 1, 2)])
+        except KeyError:
+            pass
+        # Pairs that aren't in the table (like " 1") are parsed like before
         outp = ""
-        # print(f"Encoding.decode({inp=})")
         # This loops through a string like 'abCDefGHijKLmnOP' like so: l1+l2=ab, CD, ef, GH, etc.
         for l1, l2 in zip(inp[::2], inp[1::2]):
             outp += letters[int(l1 + l2)]
@@ -141,14 +225,82 @@ class Encoding:
         Returns:
             str: The encoded output.
         """
-        inp = str(inp)
-        outp = ""
-        for i in inp:
-            if i in letters:
-                outp = f"{outp}{letters.index(i)}"
+        encode_table, _ = _tables()
+        return str(inp).translate(encode_table)
+
+    @staticmethod
+    def decode_many(inputs) -> list[str]:
+        """
+        Decodes every item of an iterable.
+        """
+        return [Encoding.decode(inp) for inp in inputs]
+
+    @staticmethod
+    def encode_many(inputs) -> list[str]:
+        """
+        Encodes every item of an iterable.
+        """
+        encode_table, _ = _tables()
+        return [str(inp).translate(encode_table) for inp in inputs]
+
+    @staticmethod
+    def compress(encoded: str) -> str:
+        """
+        Compresses a string encoded with Encoding.encode. The numbers 00-09 aren't used by any letter, so they are
+        used to mark compressed sections:
+
+        - 01 NN LL: the letter with number LL, repeated NN times (04-99)
+        - 02 DDD NN: a copy of NN letters (04-99), starting DDD letters (001-999) before the end of the output decoded so far. The copy may overlap with the letters it produces.
+        - any other pair: the letter with that number, like in Encoding.encode
+
+        The result only contains digits, so it can be sent through Scratch's cloud variables, and it is never longer
+        than the input.
+        """
+        codes = [encoded[i:i + 2] for i in range(0, len(encoded) - 1, 2)]
+        n = len(codes)
+        output = []
+        recent: dict[tuple[str, ...], list[int]] = {} # the last positions where each sequence of 4 letters started
+        i = 0
+        while i < n:
+            run = 1
+            while i + run < n and run < 99 and codes[i + run] == codes[i]:
+                run += 1
+            copy_length, copy_distance = _longest_copy(codes, i, recent)
+            # a run costs 6 digits and a copy 7, instead of 2 per letter
+            if run >= 4 and 2 * run - 6 >= 2 * copy_length - 7:
+                output.append(f"01{run:02}{codes[i]}")
+                consumed = run
+            elif copy_length >= 4:
+                output.append(f"02{copy_distance:03}{copy_length:02}")
+                consumed = copy_length
             else:
-                outp += str(letters.index(" "))
-        return outp
+                output.append(codes[i])
+                consumed = 1
+            _remember_positions(codes, i, i + consumed, recent)
+            i += consumed
+        return "".join(output)
+
+    @staticmethod
+    def decompress(compressed: str) -> str:
+        """
+        Reverses Encoding.compress. The result can be decoded with Encoding.decode.
+        """
+        codes: list[str] = []
+        i = 0
+        while i < len(compressed) - 1:
+            marker = compressed[i:i + 2]
+            if marker == "01":
+                codes.extend([compressed[i + 4:i + 6]] * int(compressed[i + 2:i + 4]))
+                i += 6
+            elif marker == "02":
+                start = len(codes) - int(compressed[i + 2:i + 5])
+                for k in range(int(compressed[i + 5:i + 7])):
+                    codes.append(codes[start + k])
+                i += 7
+            else:
+                codes.append(marker)
+                i += 2
+        return "".join(codes)
 
     @staticmethod
     def replace_char(old_char, new_char):
@@ -158,4 +310,5 @@ class Encoding:
         """
         i = letters.index(old_char)
         letters[i] = new_char
+        _tables()
         
\ No newline at end of file
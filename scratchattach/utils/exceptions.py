@@ -122,6 +122,12 @@ class Response429(Exception):
     """
 
 
+class CircuitOpenError(FetchError):
+    """
+    Raised instead of sending a request when requests to the same host failed too often in a row and are temporarily suspended (see :class:`scratchattach.utils.retry.CircuitBreaker`).
+    """
+
+
 class CommentPostFailure(Exception):
     """
     Raised when a comment fails to post. This can have various reasons.
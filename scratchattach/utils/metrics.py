@@ -0,0 +1,197 @@
+"""Instrumentation hooks and metrics for HTTP requests"""
+from __future__ import annotations
+
+import bisect
+import re
+import threading
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional
+from urllib.parse import urlsplit
+
+DEFAULT_BUCKETS: tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+"""
+Upper bounds (in seconds) of the latency histogram buckets
+"""
+
+_NAMED_SEGMENTS = {"users", "classrooms", "classtoken", "topic", "post"}
+
+
+def endpoint_template(url: str) -> str:
+    """
+    Turns a URL into the template of its endpoint by replacing ids and usernames with placeholders, so that metrics
+    can be aggregated per endpoint. Example: https://api.scratch.mit.edu/users/griffpatch/projects/10128407
+    becomes api.scratch.mit.edu/users/{name}/projects/{id}
+    """
+    parts = urlsplit(url)
+    segments = parts.path.split("/")
+    for i, segment in enumerate(segments):
+        if re.fullmatch(r"\d+", segment):
+            segments[i] = "{id}"
+        elif segment and i > 0 and segments[i - 1] in _NAMED_SEGMENTS:
+            segments[i] = "{name}"
+    return parts.netloc + "/".join(segments)
+
+
+@dataclass
+class RequestEvent:
+    """
+    Describes one attempt at sending an HTTP request. Passed to all registered hooks.
+    """
+    method: str
+    url: str
+    endpoint: str
+    duration: float
+    "Time from sending the request until the response was received, in seconds"
+    status_code: Optional[int] = None
+    "None if the request failed without a response"
+    bytes_sent: int = 0
+    "Size of the request body (if known)"
+    bytes_received: int = 0
+    attempt: int = 0
+    "0 for the first attempt, n for the n-th retry"
+    error: Optional[BaseException] = None
+
+
+hooks: list[Callable[[RequestEvent], None]] = []
+"""
+Functions that are called with a RequestEvent after every request attempt
+"""
+_hooks_lock = threading.Lock()
+
+
+def add_hook(hook: Callable[[RequestEvent], None]) -> None:
+    with _hooks_lock:
+        hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[RequestEvent], None]) -> None:
+    with _hooks_lock:
+        if hook in hooks:
+            hooks.remove(hook)
+
+
+def emit(event: RequestEvent) -> None:
+    for hook in list(hooks):
+        try:
+            hook(event)
+        except Exception as e:
+            print("Warning raised by scratchattach: request hook", hook, "failed with error", e)
+
+
+@dataclass
+class _Histogram:
+    buckets: tuple[float, ...]
+    counts: list[int] = field(init=False)
+    total: float = 0.0
+    count: int = 0
+
+    def __post_init__(self):
+        self.counts = [0] * len(self.buckets)
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    Aggregates RequestEvents into per-endpoint latency histograms, status counts, byte counts, retries and 429s.
+    Register it with `add_hook(metrics.record)`, or use the measure() context manager.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self.latency: dict[tuple[str, str], _Histogram] = {}
+        self.responses: defaultdict[tuple[str, str, str], int] = defaultdict(int)
+        self.bytes_sent: defaultdict[tuple[str, str], int] = defaultdict(int)
+        self.bytes_received: defaultdict[tuple[str, str], int] = defaultdict(int)
+        self.retries: defaultdict[tuple[str, str], int] = defaultdict(int)
+        self.ratelimited: defaultdict[tuple[str, str], int] = defaultdict(int)
+
+    def record(self, event: RequestEvent) -> None:
+        key = (event.method, event.endpoint)
+        status = "error" if event.status_code is None else str(event.status_code)
+        with self._lock:
+            if key not in self.latency:
+                self.latency[key] = _Histogram(self.buckets)
+            self.latency[key].observe(event.duration)
+            self.responses[(event.method, event.endpoint, status)] += 1
+            self.bytes_sent[key] += event.bytes_sent
+            self.bytes_received[key] += event.bytes_received
+            if event.attempt > 0:
+                self.retries[key] += 1
+            if event.status_code == 429:
+                self.ratelimited[key] += 1
+
+    def slowest(self, n: int = 10) -> list[tuple[str, str, float]]:
+        """
+        Returns the n endpoints with the highest mean latency as (method, endpoint, mean seconds).
+        """
+        with self._lock:
+            means = [(method, endpoint, h.total / h.count) for (method, endpoint), h in self.latency.items()]
+        return sorted(means, key=lambda item: item[2], reverse=True)[:n]
+
+    def to_prometheus(self, prefix: str = "scratchattach_http") -> str:
+        """
+        Exports the metrics in the Prometheus text exposition format.
+        """
+        def labels(method: str, endpoint: str, **extra: str) -> str:
+            pairs = {"method": method, "endpoint": endpoint, **extra}
+            return ",".join(f'{k}="{v}"' for k, v in pairs.items())
+
+        lines = []
+        with self._lock:
+            lines.append(f"# TYPE {prefix}_request_duration_seconds histogram")
+            for (method, endpoint), histogram in sorted(self.latency.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f"{prefix}_request_duration_seconds_bucket{{{labels(method, endpoint, le=str(bound))}}} {cumulative}"
+                    )
+                lines.append(
+                    f"{prefix}_request_duration_seconds_bucket{{{labels(method, endpoint, le='+Inf')}}} {histogram.count}"
+                )
+                lines.append(f"{prefix}_request_duration_seconds_sum{{{labels(method, endpoint)}}} {histogram.total}")
+                lines.append(f"{prefix}_request_duration_seconds_count{{{labels(method, endpoint)}}} {histogram.count}")
+
+            lines.append(f"# TYPE {prefix}_responses_total counter")
+            for (method, endpoint, status), count in sorted(self.responses.items()):
+                lines.append(f"{prefix}_responses_total{{{labels(method, endpoint, status=status)}}} {count}")
+
+            for name, values in (
+                ("bytes_sent_total", self.bytes_sent),
+                ("bytes_received_total", self.bytes_received),
+                ("retries_total", self.retries),
+                ("ratelimited_total", self.ratelimited),
+            ):
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                for (method, endpoint), value in sorted(values.items()):
+                    lines.append(f"{prefix}_{name}{{{labels(method, endpoint)}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def measure(buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Iterator[Metrics]:
+    """
+    Records the metrics of all requests made while the context is active. The metrics are registered as a global hook,
+    so requests made by other threads and tasks during that time are recorded as well.
+
+    Example:
+        with measure() as metrics:
+            user.followers(limit=400)
+        print(metrics.to_prometheus())
+    """
+    metrics = Metrics(buckets)
+    add_hook(metrics.record)
+    try:
+        yield metrics
+    finally:
+        remove_hook(metrics.record)
@@ -0,0 +1,211 @@
+"""Client-side token bucket ratelimiting for HTTP requests"""
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import re
+import threading
+import time
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from typing import Optional
+from urllib.parse import urlsplit
+
+DEFAULT_LIMITS: dict[str, tuple[float, float]] = {
+    "read": (10.0, 20.0),
+    "site-api": (5.0, 10.0),
+    "write": (1.0, 5.0),
+}
+"""
+Default (requests per second, burst size) for each endpoint class
+"""
+
+
+def endpoint_class(method: str, url: str) -> str:
+    """
+    Classifies a request for ratelimiting. Requests that change data ("write") are limited separately from
+    requests to the old site-api and from all other read requests.
+    """
+    if method.upper() not in ("GET", "HEAD", "OPTIONS"):
+        return "write"
+    if urlsplit(url).path.startswith("/site-api/"):
+        return "site-api"
+    return "read"
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses the value of a Retry-After header (either a number of seconds or an HTTP date) into seconds.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if re.fullmatch(r"\d+(\.\d+)?", value):
+        return float(value)
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket with an adaptive rate.
+
+    The rate is halved whenever the server answers with 429 and slowly grows back to max_rate while requests succeed,
+    so the bucket settles at the highest rate the server accepts.
+    """
+    max_rate: float
+    min_rate: float
+    rate: float
+    capacity: float
+
+    def __init__(self, rate: float, capacity: float, *, min_rate: Optional[float] = None) -> None:
+        self.max_rate = rate
+        self.min_rate = rate / 16 if min_rate is None else min_rate
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        # The time at which _tokens is accurate. Lies in the future while the bucket is blocked by a Retry-After
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        Takes tokens and returns how many seconds the caller has to wait before it may send its request.
+        A request that needs more tokens than the capacity may be sent once the bucket is full.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = self._wait_time(now, min(tokens, self.capacity))
+            self._tokens -= tokens
+            return wait
+
+    def wait_time(self, tokens: float = 1) -> float:
+        """
+        Returns how many seconds a request would have to wait right now, without taking tokens.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return self._wait_time(now, min(tokens, self.capacity))
+
+    def _wait_time(self, now: float, needed: float) -> float:
+        missing = needed - self._tokens
+        return max(0.0, self._updated - now) + max(0.0, missing) / self.rate
+
+    def block(self, seconds: float) -> None:
+        """
+        Makes all requests wait for at least the given amount of seconds.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = min(self._tokens, 0)
+            self._updated = max(self._updated, now + seconds)
+
+    def on_response(self, status_code: int, retry_after: Optional[float] = None) -> None:
+        """
+        Adapts the rate to the server's response.
+        """
+        if status_code == 429:
+            with self._lock:
+                self.rate = max(self.min_rate, self.rate / 2)
+            self.block(1 / self.rate if retry_after is None else retry_after)
+        elif retry_after is not None:
+            self.block(retry_after)
+        elif status_code < 400:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+
+
+class RateLimiter:
+    """
+    Client-side ratelimiter with one token bucket per host and endpoint class.
+    Activate it for all HTTP requests made by scratchattach with `scratchattach.utils.requests.ratelimiter = RateLimiter()`.
+    """
+
+    def __init__(self, limits: Optional[Mapping[str, tuple[float, float]]] = None) -> None:
+        """
+        Args:
+            limits: Maps endpoint classes (see endpoint_class) to (requests per second, burst size)
+        """
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self._buckets: dict[tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, method: str, url: str) -> TokenBucket:
+        key = (urlsplit(url).netloc, endpoint_class(method, url))
+        with self._lock:
+            if key not in self._buckets:
+                rate, burst = self.limits.get(key[1], self.limits.get("read", DEFAULT_LIMITS["read"]))
+                self._buckets[key] = TokenBucket(rate, burst)
+            return self._buckets[key]
+
+    def acquire(self, method: str, url: str) -> None:
+        """
+        Blocks until a request may be sent.
+        """
+        wait = self.bucket(method, url).reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def async_acquire(self, method: str, url: str) -> None:
+        """
+        Waits until a request may be sent without blocking the event loop.
+        """
+        wait = self.bucket(method, url).reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_response(self, method: str, url: str, status_code: int, headers: Mapping[str, str]) -> None:
+        retry_after = parse_retry_after(headers.get("Retry-After") or headers.get("retry-after"))
+        self.bucket(method, url).on_response(status_code, retry_after)
+
+
+class CloudSendScheduler:
+    """
+    Thread-safe ratelimiter for cloud variable sets, used by BaseCloud.
+
+    Models the two limits of cloud servers as token buckets: sets may be sent every shortterm_ratelimit seconds for
+    burst_duration seconds, after which they are slowed down to one set every longterm_ratelimit seconds on average.
+    A ratelimit of 0 disables the corresponding limit.
+    """
+
+    shortterm_ratelimit: float
+    longterm_ratelimit: float
+    burst_duration: float
+
+    def __init__(self, shortterm_ratelimit: float, longterm_ratelimit: float, *, burst_duration: float = 25.0) -> None:
+        self.shortterm_ratelimit = shortterm_ratelimit
+        self.longterm_ratelimit = longterm_ratelimit
+        self.burst_duration = burst_duration
+        self._buckets: list[TokenBucket] = []
+        if shortterm_ratelimit > 0:
+            self._buckets.append(TokenBucket(1 / shortterm_ratelimit, 1))
+        if longterm_ratelimit > 0:
+            short_rate = 1 / shortterm_ratelimit if shortterm_ratelimit > 0 else 1 / longterm_ratelimit
+            burst = max(1.0, burst_duration * (short_rate - 1 / longterm_ratelimit))
+            self._buckets.append(TokenBucket(1 / longterm_ratelimit, burst))
+        self._lock = threading.Lock()
+
+    def reserve(self, n: int = 1) -> float:
+        """
+        Reserves n cloud variable sets and returns how many seconds the caller has to wait before sending them.
+        """
+        with self._lock:
+            return max((bucket.reserve(n) for bucket in self._buckets), default=0.0)
+
+    def wait_time(self, n: int = 1) -> float:
+        """
+        Returns how many seconds a send of n cloud variable sets would have to wait right now, without reserving it.
+        """
+        with self._lock:
+            return max((bucket.wait_time(n) for bucket in self._buckets), default=0.0)
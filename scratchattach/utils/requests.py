@@ -1,24 +1,170 @@
 from __future__ import annotations
 
-from collections.abc import MutableMapping, Iterator
+from collections.abc import MutableMapping, Mapping, Iterator, Callable, Awaitable
 from abc import ABC, abstractmethod
 from types import TracebackType
-from typing import Optional, Any, Self, Union
+from typing import Optional, Any, Self, Union, TypeVar, Protocol
 from contextlib import contextmanager
+from contextvars import ContextVar, Token
 from enum import Enum, auto
 from dataclasses import dataclass, field
+from functools import partial
+from urllib.parse import urlsplit, urlencode
+import asyncio
 import json
+import time
 
 from aiohttp.cookiejar import DummyCookieJar
 from typing_extensions import override
 from requests import Session as HTTPSession
 from requests import Response
+from requests.adapters import HTTPAdapter
 import aiohttp
 
 from . import exceptions
 from . import optional_async
+from . import metrics
+from .response_cache import ResponseCache, CacheEntry
+from .ratelimit import RateLimiter, parse_retry_after
+from .retry import RetryPolicy, CircuitBreaker
 
 proxies: Optional[MutableMapping[str, str]] = None
+ratelimiter: Optional[RateLimiter] = None
+"""
+Client-side ratelimiter shared by all HTTP requests. Ratelimiting is disabled while this is None.
+"""
+retry_policy: Optional[RetryPolicy] = None
+"""
+Retry policy for failed HTTP requests. Failed requests are not retried while this is None.
+"""
+circuit_breaker: Optional[CircuitBreaker] = None
+"""
+Circuit breaker that suspends requests to hosts that keep failing. Disabled while this is None.
+"""
+
+DEFAULT_POOL_CONNECTIONS = 10
+"""Number of per-host connection pools kept alive by the shared Requests session"""
+DEFAULT_POOL_MAXSIZE = 32
+"""Maximum number of keep-alive connections kept per host"""
+
+def _wait_for_ratelimit(method: str, url: str) -> None:
+    if ratelimiter is not None:
+        ratelimiter.acquire(method, url)
+
+def _report_to_ratelimiter(method: str, url: str, status_code: int, headers: Mapping[str, str]) -> None:
+    if ratelimiter is not None:
+        ratelimiter.on_response(method, url, status_code, headers)
+
+class _AnyResponse(Protocol):
+    status_code: int
+    @property
+    def headers(self) -> Mapping[str, str]: ...
+
+R = TypeVar("R", bound=_AnyResponse)
+
+def _before_attempt(host: str) -> None:
+    if circuit_breaker is not None:
+        circuit_breaker.before_request(host)
+
+def _retry_delay_after_error(method: str, host: str, attempt: int, error: Exception) -> float:
+    # Returns the time to wait before the next attempt, or raises FetchError if the request shouldn't be retried
+    if circuit_breaker is not None:
+        circuit_breaker.record_failure(host)
+    if retry_policy is None or not retry_policy.should_retry(method, attempt):
+        raise exceptions.FetchError(error)
+    return retry_policy.backoff(attempt)
+
+def _retry_delay_after_response(method: str, url: str, host: str, attempt: int, r: _AnyResponse) -> Optional[float]:
+    # Returns the time to wait before the next attempt, or None if the response should be returned
+    _report_to_ratelimiter(method, url, r.status_code, r.headers)
+    if circuit_breaker is not None:
+        circuit_breaker.record_status(host, r.status_code)
+    if retry_policy is None or not retry_policy.should_retry(method, attempt, r.status_code):
+        return None
+    return retry_policy.backoff(attempt, parse_retry_after(r.headers.get("Retry-After")))
+
+def _body_size(data: Any = None, json_data: Any = None) -> int:
+    # Size of the body that is sent for the data / json argument of a request
+    if json_data is not None:
+        return len(json.dumps(json_data).encode("utf-8"))
+    if isinstance(data, Mapping):
+        return len(urlencode(data).encode("utf-8"))
+    if isinstance(data, str):
+        return len(data.encode("utf-8"))
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    return 0
+
+def _emit_metrics(method: str, url: str, started: float, attempt: int, r: Optional[Any] = None,
+                  error: Optional[Exception] = None, bytes_sent: Optional[int] = None) -> None:
+    if not metrics.hooks:
+        return
+    if bytes_sent is None:
+        # requests' responses know the body that was sent
+        bytes_sent = 0
+        if (body := getattr(getattr(r, "request", None), "body", None)) is not None:
+            bytes_sent = len(body)
+    metrics.emit(metrics.RequestEvent(
+        method=method,
+        url=url,
+        endpoint=metrics.endpoint_template(url),
+        duration=time.perf_counter() - started,
+        status_code=None if r is None else r.status_code,
+        bytes_sent=bytes_sent,
+        bytes_received=0 if r is None else len(r.content),
+        attempt=attempt,
+        error=error
+    ))
+
+def _send_with_retries(method: str, url: str, send: Callable[[], R]) -> R:
+    """
+    Sends a request using send(), applying the ratelimiter, retry_policy and circuit_breaker.
+    Transport errors are raised as FetchError.
+    """
+    host = urlsplit(url).netloc
+    attempt = 0
+    while True:
+        _before_attempt(host)
+        _wait_for_ratelimit(method, url)
+        started = time.perf_counter()
+        try:
+            r = send()
+        except Exception as e:
+            _emit_metrics(method, url, started, attempt, error=e)
+            delay = _retry_delay_after_error(method, host, attempt, e)
+        else:
+            _emit_metrics(method, url, started, attempt, r)
+            delay = _retry_delay_after_response(method, url, host, attempt, r)
+            if delay is None:
+                return r
+        attempt += 1
+        time.sleep(delay)
+
+async def _async_send_with_retries(method: str, url: str, send: Callable[[], Awaitable[R]], *,
+                                   bytes_sent: int = 0) -> R:
+    """
+    Async version of _send_with_retries. bytes_sent is the size of the request body, which is reported to the metrics
+    hooks.
+    """
+    host = urlsplit(url).netloc
+    attempt = 0
+    while True:
+        _before_attempt(host)
+        if ratelimiter is not None:
+            await ratelimiter.async_acquire(method, url)
+        started = time.perf_counter()
+        try:
+            r = await send()
+        except Exception as e:
+            _emit_metrics(method, url, started, attempt, error=e, bytes_sent=bytes_sent)
+            delay = _retry_delay_after_error(method, host, attempt, e)
+        else:
+            _emit_metrics(method, url, started, attempt, r, bytes_sent=bytes_sent)
+            delay = _retry_delay_after_response(method, url, host, attempt, r)
+            if delay is None:
+                return r
+        attempt += 1
+        await asyncio.sleep(delay)
 
 class HTTPMethod(Enum):
     GET = auto()
@@ -147,19 +293,17 @@ class OAHTTPSession(ABC):
 class SyncRequests(OAHTTPSession):
     @override
     def sync_request(self, method, url, *, cookies = None, headers = None, params = None, data = None, json = None):
-        try:
-            r = requests.request(
-                method.name,
-                url,
-                cookies = cookies,
-                headers = headers,
-                params = params,
-                data = data,
-                json = json,
-                proxies = proxies
-            )
-        except Exception as e:
-            raise exceptions.FetchError(e)
+        r = _send_with_retries(method.name, url, partial(
+            requests.request,
+            method.name,
+            url,
+            cookies = cookies,
+            headers = headers,
+            params = params,
+            data = data,
+            json = json,
+            proxies = proxies
+        ))
         response = HTTPResponse(
             request_method=method,
             status_code=r.status_code,
@@ -175,9 +319,32 @@ class SyncRequests(OAHTTPSession):
         raise NotImplementedError()
 
 class AsyncRequests(OAHTTPSession):
+    """
+    Asynchronous HTTP request handler backed by a single aiohttp.ClientSession.
+
+    While the session is entered (`async with AsyncRequests() as http:`), it is the active session used by the
+    async_* methods of site components (like User.async_followers) that don't have an oa_http_session of their own.
+    """
     client_session: aiohttp.ClientSession
+    connection_limit: int
+    connection_limit_per_host: int
+    _active_token: Optional[Token[Optional[AsyncRequests]]] = None
+
+    def __init__(self, *, connection_limit: int = 100, connection_limit_per_host: int = 0) -> None:
+        """
+        Args:
+            connection_limit: The maximum number of simultaneous connections (0 means unlimited)
+            connection_limit_per_host: The maximum number of simultaneous connections to one host (0 means unlimited)
+        """
+        self.connection_limit = connection_limit
+        self.connection_limit_per_host = connection_limit_per_host
+
     async def __aenter__(self) -> Self:
-        self.client_session = await aiohttp.ClientSession(cookie_jar=DummyCookieJar()).__aenter__()
+        connector = aiohttp.TCPConnector(limit=self.connection_limit, limit_per_host=self.connection_limit_per_host)
+        self.client_session = await aiohttp.ClientSession(
+            connector=connector, cookie_jar=DummyCookieJar()
+        ).__aenter__()
+        self._active_token = _active_async_session.set(self)
         return self
     
     async def __aexit__(
@@ -186,6 +353,9 @@ class AsyncRequests(OAHTTPSession):
         exc_val: Optional[BaseException] = None,
         exc_tb: Optional[TracebackType] = None
     ) -> None:
+        if self._active_token is not None:
+            _active_async_session.reset(self._active_token)
+            self._active_token = None
         await self.client_session.__aexit__(exc_type, exc_val, exc_tb)
     
     @override
@@ -194,42 +364,104 @@ class AsyncRequests(OAHTTPSession):
     
     async def async_request(self, method, url, *, cookies = None, headers = None, params = None, data = None, json = None):
         proxy = None
-        if url.startswith("http"):
-            proxy = proxies.get("http")
-        if url.startswith("https"):
-            proxy = proxies.get("https")
-        async with self.client_session.request(
-            method.name,
-            url,
-            cookies = cookies,
-            headers = headers,
-            params = params,
-            data = data,
-            json = json,
-            proxy = proxy
-        ) as resp:
-            assert isinstance(resp, aiohttp.ClientResponse)
-            content = await resp.read()
-            try:
-                text = content.decode(resp.get_encoding())
-            except Exception:
-                text = ""
-            response = HTTPResponse(
-                request_method=method,
-                status_code=resp.status,
-                content=content,
-                text=text,
-                headers=resp.headers
-            )
-            if self.error_handling:
-                self.check_response(response)
-            return response
+        if proxies is not None:
+            if url.startswith("http"):
+                proxy = proxies.get("http")
+            if url.startswith("https"):
+                proxy = proxies.get("https")
+
+        async def send() -> HTTPResponse:
+            async with self.client_session.request(
+                method.name,
+                url,
+                cookies = cookies,
+                headers = headers,
+                params = params,
+                data = data,
+                json = json,
+                proxy = proxy
+            ) as resp:
+                assert isinstance(resp, aiohttp.ClientResponse)
+                content = await resp.read()
+                try:
+                    text = content.decode(resp.get_encoding())
+                except Exception:
+                    text = ""
+                return HTTPResponse(
+                    request_method=method,
+                    status_code=resp.status,
+                    content=content,
+                    text=text,
+                    headers=resp.headers
+                )
+
+        response = await _async_send_with_retries(method.name, url, send, bytes_sent=_body_size(data, json))
+        if self.error_handling:
+            self.check_response(response)
+        return response
+
+_active_async_session: ContextVar[Optional[AsyncRequests]] = ContextVar("_active_async_session", default=None)
+
+
+def get_async_session() -> AsyncRequests:
+    """
+    Returns the AsyncRequests session that is currently entered in this context.
+    """
+    session = _active_async_session.get()
+    if session is None:
+        raise RuntimeError(
+            "No AsyncRequests session is active. Wrap your code in `async with AsyncRequests():` to use async methods."
+        )
+    return session
 
 class Requests(HTTPSession):
     """
     Centralized HTTP request handler (for better error handling and proxies)
+
+    All requests made through this session share pooled keep-alive connections, so repeated calls to the same host
+    don't pay for a new TCP and TLS handshake each time.
     """
     error_handling: bool = True
+    cache: Optional[ResponseCache] = None
+    """
+    Cache for GET responses of read-only endpoints. Caching is disabled while this is None.
+    Example: `scratchattach.utils.requests.requests.cache = ResponseCache(stale_while_revalidate=30)`
+    """
+
+    def __init__(
+        self,
+        *,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        pool_block: bool = False
+    ) -> None:
+        super().__init__()
+        self.configure_pool(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+
+    def configure_pool(
+        self,
+        *,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        pool_block: bool = False
+    ) -> None:
+        """
+        Replaces the connection pools used for http:// and https:// URLs.
+
+        Args:
+            pool_connections: The number of hosts to keep a connection pool for
+            pool_maxsize: The maximum number of keep-alive connections per host
+            pool_block: If True, requests wait for a free connection instead of opening a throwaway one once a host's pool is exhausted
+        """
+        for prefix in ("https://", "http://"):
+            old_adapter = self.adapters.get(prefix)
+            self.mount(prefix, HTTPAdapter(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block
+            ))
+            if old_adapter is not None:
+                old_adapter.close()
 
     def check_response(self, r: Response):
         if r.status_code == 403 or r.status_code == 401:
@@ -242,45 +474,63 @@ class Requests(HTTPSession):
             raise exceptions.BadRequest("Make sure all provided arguments are valid")
 
     @override
-    def get(self, *args, **kwargs):
+    def get(self, url, params=None, **kwargs):
         kwargs.setdefault("proxies", proxies)
-        try:
-            r = super().get(*args, **kwargs)
-        except Exception as e:
-            raise exceptions.FetchError(e)
+        cache = self.cache
+        if cache is not None:
+            ttl = cache.ttl_for(url)
+            if ttl is not None:
+                return self._cached_get(cache, ttl, url, params, kwargs)
+        r = _send_with_retries("GET", url, partial(super().get, url, params=params, **kwargs))
         if self.error_handling:
             self.check_response(r)
         return r
 
+    def _cached_get(self, cache: ResponseCache, ttl: float, url, params, kwargs) -> Response:
+        key = cache.key_for(url, params, kwargs.get("cookies"))
+        entry = cache.get(key)
+        if entry is not None:
+            if entry.is_fresh(ttl):
+                return entry.to_response()
+            if cache.is_stale_usable(entry, ttl):
+                cache.refresh_in_background(key, lambda: self._revalidate(cache, key, entry, url, params, kwargs))
+                return entry.to_response()
+        return self._revalidate(cache, key, entry, url, params, kwargs)
+
+    def _revalidate(self, cache: ResponseCache, key: str, entry: Optional[CacheEntry], url, params,
+                    kwargs) -> Response:
+        if entry is not None:
+            kwargs = dict(kwargs, headers={**(kwargs.get("headers") or {}), **entry.validators()})
+        r = _send_with_retries("GET", url, partial(super().get, url, params=params, **kwargs))
+        if entry is not None and r.status_code == 304:
+            cache.touch(key, entry)
+            return entry.to_response()
+        if self.error_handling:
+            self.check_response(r)
+        if r.status_code == 200:
+            cache.store(key, CacheEntry.from_response(r))
+        return r
+
     @override
-    def post(self, *args, **kwargs):
+    def post(self, url, *args, **kwargs):
         kwargs.setdefault("proxies", proxies)
-        try:
-            r = super().post(*args, **kwargs)
-        except Exception as e:
-            raise exceptions.FetchError(e)
+        r = _send_with_retries("POST", url, partial(super().post, url, *args, **kwargs))
         if self.error_handling:
             self.check_response(r)
         return r
 
     @override
-    def delete(self, *args, **kwargs):
+    def delete(self, url, *args, **kwargs):
         kwargs.setdefault("proxies", proxies)
-        try:
-            r = super().delete(*args, **kwargs)
-        except Exception as e:
-            raise exceptions.FetchError(e)
+        r = _send_with_retries("DELETE", url, partial(super().delete, url, *args, **kwargs))
         if self.error_handling:
             self.check_response(r)
         return r
 
     @override
-    def put(self, *args, **kwargs):
+    def put(self, url, *args, **kwargs):
         kwargs.setdefault("proxies", proxies)
-        try:
-            r = super().put(*args, **kwargs)
-        except Exception as e:
-            raise exceptions.FetchError(e)
+        r = _send_with_retries("PUT", url, partial(super().put, url, *args, **kwargs))
         if self.error_handling:
             self.check_response(r)
         return r
@@ -0,0 +1,234 @@
+"""Response cache for read-only Scratch API endpoints"""
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Union
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_TTLS: dict[str, float] = {
+    r"^https://api\.scratch\.mit\.edu/users/[^/]+/?$": 60,
+    r"^https://api\.scratch\.mit\.edu/projects/\d+/?$": 60,
+    r"^https://api\.scratch\.mit\.edu/studios/\d+/?$": 60,
+    r"^https://api\.scratch\.mit\.edu/users/[^/]+/projects/\d+/studios/?$": 300,
+    r"^https://scratch\.mit\.edu/statistics/data/daily/?$": 3600,
+}
+"""
+Default time to live (in seconds) of cached responses, keyed by a regex that is matched against the URL (without query)
+"""
+
+IGNORED_PARAMS: frozenset[str] = frozenset({"cachebust"})
+"""
+Query parameters that don't change the response and are left out of the cache key
+"""
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    status_code: int
+    headers: dict[str, str]
+    content: bytes
+    encoding: Optional[str]
+    stored_at: float = field(default_factory=time.time)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+    def is_fresh(self, ttl: float) -> bool:
+        return self.age < ttl
+
+    def validators(self) -> dict[str, str]:
+        """
+        Returns the headers for a conditional request that revalidates this entry.
+        """
+        headers = CaseInsensitiveDict(self.headers)
+        ret = {}
+        if etag := headers.get("ETag"):
+            ret["If-None-Match"] = etag
+        if last_modified := headers.get("Last-Modified"):
+            ret["If-Modified-Since"] = last_modified
+        return ret
+
+    def to_response(self) -> Response:
+        response = Response()
+        response.url = self.url
+        response.status_code = self.status_code
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = self.content
+        response.encoding = self.encoding
+        return response
+
+    @classmethod
+    def from_response(cls, response: Response) -> CacheEntry:
+        return cls(
+            url=response.url,
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            content=response.content,
+            encoding=response.encoding,
+        )
+
+
+class ResponseCache:
+    """
+    LRU cache for GET responses of read-only endpoints, used by the shared Requests session once it is set as
+    `requests.cache`.
+
+    Only URLs that match one of the ttls patterns are cached. Expired entries are revalidated with
+    If-None-Match / If-Modified-Since where possible. Entries that expired less than stale_while_revalidate seconds ago
+    are returned immediately while a fresh copy is fetched in the background.
+    If path is given, entries are additionally persisted to an SQLite file so they survive restarts. The file holds the
+    same max_entries entries as the memory: evicted entries are deleted from it too.
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Mapping[str, float]] = None,
+        *,
+        max_entries: int = 1024,
+        stale_while_revalidate: float = 0.0,
+        path: Optional[Union[str, Path]] = None,
+    ) -> None:
+        if ttls is None:
+            ttls = DEFAULT_TTLS
+        self._ttls = [(re.compile(pattern), ttl) for pattern, ttl in ttls.items()]
+        self.max_entries = max_entries
+        self.stale_while_revalidate = stale_while_revalidate
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing: set[str] = set()
+
+        self._db: Optional[sqlite3.Connection] = None
+        if path is not None:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, url TEXT, status_code INTEGER, headers TEXT, content BLOB, encoding TEXT, "
+                "stored_at REAL)"
+            )
+            # The file may have been written by a cache with a higher max_entries
+            self._db.execute(
+                "DELETE FROM responses WHERE key NOT IN (SELECT key FROM responses ORDER BY stored_at DESC LIMIT ?)",
+                (max_entries,)
+            )
+            self._db.commit()
+
+    def ttl_for(self, url: str) -> Optional[float]:
+        """
+        Returns the time to live for responses of the given URL, or None if the URL isn't cached.
+        """
+        base_url = url.split("?", 1)[0]
+        for pattern, ttl in self._ttls:
+            if pattern.search(base_url):
+                return ttl
+        return None
+
+    def key_for(self, url: str, params: Optional[Mapping] = None, cookies: Optional[Mapping] = None) -> str:
+        """
+        Builds the cache key of a request. The key depends on the session id, so responses that contain private data
+        are never shared between accounts.
+        """
+        parts = urlsplit(url)
+        query = [(k, v) for k, v in parse_qsl(parts.query) if k not in IGNORED_PARAMS]
+        if params:
+            query.extend((str(k), str(v)) for k, v in params.items() if k not in IGNORED_PARAMS)
+        session_id = (cookies or {}).get("scratchsessionsid", "")
+        return f"{parts.scheme}://{parts.netloc}{parts.path}?{urlencode(sorted(query))}#{session_id}"
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT url, status_code, headers, content, encoding, stored_at FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            url, status_code, headers, content, encoding, stored_at = row
+            entry = CacheEntry(url, status_code, json.loads(headers), content, encoding, stored_at)
+            self._delete_evicted(self._insert(key, entry))
+            self._db.commit()
+            return entry
+
+    def store(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            evicted = self._insert(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, entry.url, entry.status_code, json.dumps(entry.headers), entry.content, entry.encoding,
+                     entry.stored_at)
+                )
+                self._delete_evicted(evicted)
+                self._db.commit()
+
+    def touch(self, key: str, entry: CacheEntry) -> None:
+        """
+        Marks an entry as fresh again (after the server confirmed it is unchanged).
+        """
+        entry.stored_at = time.time()
+        self.store(key, entry)
+
+    def _insert(self, key: str, entry: CacheEntry) -> list[str]:
+        # Returns the keys of the entries that were evicted to make room
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            evicted.append(self._entries.popitem(last=False)[0])
+        return evicted
+
+    def _delete_evicted(self, keys: list[str]) -> None:
+        if self._db is not None and keys:
+            self._db.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key in keys])
+
+    def is_stale_usable(self, entry: CacheEntry, ttl: float) -> bool:
+        return entry.age < ttl + self.stale_while_revalidate
+
+    def refresh_in_background(self, key: str, refresh: Callable[[], object]) -> None:
+        """
+        Runs refresh in a background thread, unless a refresh for the same key is already running.
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                refresh()
+            except Exception:
+                # The stale entry stays in place and the next request will try again
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,99 @@
+"""Retry policy and circuit breaker for HTTP requests"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from . import exceptions
+
+IDEMPOTENT_METHODS: frozenset[str] = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"})
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Decides whether a failed request is retried and how long to wait before the next attempt.
+
+    Only idempotent methods are retried by default, so a POST (like posting a comment) is never sent twice.
+    The wait time is chosen randomly between 0 and the exponential backoff ("full jitter"), but never shorter than the
+    server's Retry-After.
+    """
+    max_retries: int = 3
+    backoff_factor: float = 0.5
+    max_backoff: float = 30.0
+    retry_statuses: frozenset[int] = frozenset({429, 500, 502, 503, 504})
+    retry_methods: frozenset[str] = IDEMPOTENT_METHODS
+    respect_retry_after: bool = True
+
+    def should_retry(self, method: str, attempt: int, status_code: Optional[int] = None) -> bool:
+        """
+        Args:
+            method: The HTTP method of the request
+            attempt: The number of retries that were already made
+            status_code: The response status, or None if the request failed without a response
+        """
+        if attempt >= self.max_retries or method.upper() not in self.retry_methods:
+            return False
+        return status_code is None or status_code in self.retry_statuses
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        delay = random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+        if self.respect_retry_after and retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff))
+        return delay
+
+
+@dataclass
+class _HostState:
+    failures: int = 0
+    opened_at: Optional[float] = None
+    trial_running: bool = False
+
+
+@dataclass
+class CircuitBreaker:
+    """
+    Stops sending requests to a host after failure_threshold consecutive failures (transport errors or 5xx responses).
+    After reset_timeout seconds, a single trial request is let through; if it succeeds, the host is usable again.
+    """
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+    _hosts: dict[str, _HostState] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def before_request(self, host: str) -> None:
+        """
+        Raises CircuitOpenError if requests to the host are currently suspended.
+        """
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state.opened_at is None:
+                return
+            remaining = state.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0 or state.trial_running:
+                raise exceptions.CircuitOpenError(
+                    f"Requests to {host} are suspended after {state.failures} consecutive failures. "
+                    f"Retrying in {max(remaining, 0):.1f}s."
+                )
+            state.trial_running = True
+
+    def record_success(self, host: str) -> None:
+        with self._lock:
+            self._hosts.pop(host, None)
+
+    def record_failure(self, host: str) -> None:
+        with self._lock:
+            state = self._hosts.setdefault(host, _HostState())
+            state.failures += 1
+            state.trial_running = False
+            if state.failures >= self.failure_threshold:
+                state.opened_at = time.monotonic()
+
+    def record_status(self, host: str, status_code: int) -> None:
+        if status_code >= 500:
+            self.record_failure(host)
+        else:
+            self.record_success(host)
@@ -0,0 +1,73 @@
+# a minimal cloud variable server (same protocol as Scratch's and TurboWarp's) for offline cloud tests
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from aiohttp import web, WSMsgType
+
+
+class StubCloudServer:
+    def __init__(self):
+        self.values = defaultdict(dict)
+        self.clients = defaultdict(set)
+        self.received = []
+        self.url = ""
+        self._runner = None
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"ws://127.0.0.1:{self._runner.addresses[0][1]}/"
+        return self
+
+    async def __aexit__(self, *args):
+        await self._runner.cleanup()
+
+    @classmethod
+    def start_in_thread(cls):
+        # runs the server on its own event loop, for tests of the synchronous cloud classes
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, daemon=True).start()
+        server = asyncio.run_coroutine_threadsafe(cls().__aenter__(), loop).result()
+        server._loop = loop
+        return server
+
+    def stop_thread(self):
+        asyncio.run_coroutine_threadsafe(self.__aexit__(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def _handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        project_id = None
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                for line in message.data.splitlines():
+                    packet = json.loads(line)
+                    self.received.append(packet)
+                    if packet["method"] == "handshake":
+                        project_id = str(packet["project_id"])
+                        self.clients[project_id].add(ws)
+                        values = self.values[project_id]
+                        if values:
+                            await ws.send_str("\n".join(
+                                json.dumps({"method": "set", "name": name, "value": value})
+                                for name, value in values.items()
+                            ))
+                    elif packet["method"] == "set" and project_id is not None:
+                        self.values[project_id][packet["name"]] = packet["value"]
+                        update = json.dumps({"method": "set", "name": packet["name"], "value": packet["value"]})
+                        for client in list(self.clients[project_id]):
+                            if client is not ws and not client.closed:
+                                await client.send_str(update)
+        finally:
+            if project_id is not None:
+                self.clients[project_id].discard(ws)
+        return ws
@@ -0,0 +1,54 @@
+import threading
+import time
+
+from scratchattach.utils import commons
+
+TOTAL_ITEMS = 1234
+
+
+def _make_fetch(delay: float = 0.0):
+    requested = []
+    lock = threading.Lock()
+
+    def fetch(offset: int, limit: int):
+        with lock:
+            requested.append(offset)
+        time.sleep(delay)
+        page = list(range(offset, min(offset + limit, TOTAL_ITEMS)))
+        return page or None
+
+    return fetch, requested
+
+
+def test_api_iterative_data_concurrent():
+    fetch, _ = _make_fetch()
+    serial = commons.api_iterative_data(fetch, 4000, 0)
+    assert serial == list(range(TOTAL_ITEMS))
+
+    fetch, requested = _make_fetch(delay=0.01)
+    concurrent = commons.api_iterative_data(fetch, 4000, 0, concurrency=8)
+    assert concurrent == serial
+    # Pages after the short page at offset 1200 may be in flight, but no more than the concurrency limit
+    assert len(requested) <= TOTAL_ITEMS // 40 + 1 + 8
+
+    fetch, _ = _make_fetch()
+    assert commons.api_iterative_data(fetch, 95, 17, concurrency=4) == list(range(17, 112))
+
+
+def test_api_iterative_pages_lazy():
+    fetch, requested = _make_fetch()
+    pages = commons.api_iterative_pages(fetch, None, 0)
+    items = [item for page in pages for item in page]
+    assert items == list(range(TOTAL_ITEMS))
+
+    fetch, requested = _make_fetch()
+    pages = commons.api_iterative_pages(fetch, None, 0, prefetch=False)
+    first_page = next(pages)
+    pages.close()
+    assert first_page == list(range(40))
+    assert requested == [0]
+
+    fetch, requested = _make_fetch()
+    pages = list(commons.api_iterative_pages(fetch, 95, 17))
+    assert [item for page in pages for item in page] == list(range(17, 112))
+    assert sorted(requested) == [17, 57, 97]
@@ -0,0 +1,43 @@
+import asyncio
+
+import scratchattach as sa
+from scratchattach.utils import exceptions
+from util.stub_cloud import StubCloudServer
+
+
+def test_async_cloud():
+    async def run():
+        async with StubCloudServer() as server:
+            server.values["1"]["☁ score"] = "10"
+            async with sa.AsyncTwCloud(project_id=1, cloud_host=server.url) as sender, \
+                    sa.AsyncTwCloud(project_id=1, cloud_host=server.url) as watcher:
+                assert await watcher.get_var("score") == "10"
+
+                events = watcher.events()
+                await sender.set_var("score", 42)
+                # The activity arrives before the iteration starts, it must not be lost
+                await asyncio.sleep(0.3)
+                activity = await asyncio.wait_for(events.__anext__(), 5)
+                await events.aclose()
+                assert (activity.var, activity.value, activity.type) == ("score", 42, "set")
+                assert await watcher.get_var("score") == 42
+                assert await sender.get_all_vars() == {"☁ score": 42}
+
+            # Many projects on one event loop
+            clouds = [sa.AsyncTwCloud(project_id=i, cloud_host=server.url) for i in range(100, 150)]
+            await asyncio.gather(*(cloud.connect() for cloud in clouds))
+            await asyncio.gather(*(cloud.set_vars({"a": i, "b": -i}) for i, cloud in enumerate(clouds)))
+            await asyncio.gather(*(cloud.disconnect() for cloud in clouds))
+            assert all(server.values[str(100 + i)] == {"☁ a": i, "☁ b": -i} for i in range(50))
+
+    asyncio.run(run())
+
+
+def test_async_scratch_cloud_requires_session():
+    cloud = sa.AsyncScratchCloud(project_id=1)
+    try:
+        asyncio.run(cloud.set_var("a", 1))
+    except exceptions.Unauthenticated:
+        pass
+    else:
+        assert False
@@ -0,0 +1,129 @@
+import asyncio
+import json
+
+import aiohttp
+
+import scratchattach as sa
+from scratchattach.eventhandlers.async_cloud_server import AsyncTwCloudClient
+
+
+async def _check_many_clients(server, url):
+    # Many clients: a set reaches every client of its project, and no client of other projects
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+        sockets = [await session.ws_connect(url) for _ in range(300)]
+        for i, ws in enumerate(sockets):
+            await ws.send_str(json.dumps({"method": "handshake", "user": f"player{i}", "project_id": str(i % 3 + 10)}))
+        for ws in sockets:
+            assert (await asyncio.wait_for(ws.receive(), 5)).data.endswith("2.0.0")
+        assert len(server.active_user_ips(10)) == 100
+        # TurboWarp doesn't send the project id and username with sets
+        await sockets[0].send_str(json.dumps({"method": "set", "name": "☁ a", "value": "7"}))
+        for i, ws in enumerate(sockets[1:], start=1):
+            if i % 3 == 0:
+                packet = json.loads((await asyncio.wait_for(ws.receive(), 5)).data)
+                assert (packet["name"], packet["value"], packet["user"]) == ("☁ a", "7", "player0")
+        await asyncio.gather(*(ws.close() for ws in sockets))
+
+
+def test_async_cloud_server():
+    server = sa.init_cloud_server(port=0, engine="asyncio", log_var_sets=False)
+    events = []
+
+    @server.event
+    def on_handshake(user, project_id, client):
+        events.append(("handshake", user, project_id))
+
+    @server.event
+    def on_set(activity, client):
+        events.append(("set", activity.name, activity.value))
+
+    @server.event
+    def on_disconnect(user, project_id, client):
+        events.append(("disconnect", user, project_id))
+
+    server.set_var(1, "greeting", "hello")
+    server.start()
+    assert server.serving.wait(5)
+    try:
+        async def run():
+            url = f"ws://127.0.0.1:{server.port}/"
+            async with sa.AsyncTwCloud(project_id=1, cloud_host=url) as sender, \
+                    sa.AsyncTwCloud(project_id=1, cloud_host=url) as watcher:
+                assert await watcher.get_var("greeting") == "hello"
+                stream = watcher.events()
+                await sender.set_var("score", 42)
+                activity = await asyncio.wait_for(stream.__anext__(), 5)
+                await stream.aclose()
+                assert (activity.var, activity.value) == ("score", 42)
+
+            await _check_many_clients(server, url)
+
+        asyncio.run(run())
+        assert server.get_var(10, "a") == "7"
+        assert ("set", "☁ score", 42) in events
+        assert ("handshake", "player0", "10") in events
+        for _ in range(50):
+            if not server.tw_clients:
+                break
+            asyncio.run(asyncio.sleep(0.05))
+        assert server.tw_clients == {} and server.project_clients == {}
+        assert ("disconnect", "player299", "12") in events
+    finally:
+        server.stop()
+
+
+def test_async_cloud_server_slow_client():
+    server = sa.init_cloud_server(port=0, engine="asyncio", max_buffer_size=100)
+
+    class Websocket:
+        closed = False
+
+    client = AsyncTwCloudClient(server, Websocket(), ("127.0.0.1", 1))
+
+    async def run():
+        client._has_data = asyncio.Event()
+        assert client.sendMessage("x" * 60)
+        assert client.buffered_size == 60
+        # The client doesn't read fast enough, so its buffer overflows and it's disconnected
+        assert not client.sendMessage("x" * 60)
+        assert client.buffer == type(client.buffer)() and client._close_code is not None
+
+    asyncio.run(run())
+
+
+def test_async_cloud_server_frames():
+    server = sa.init_cloud_server(port=0, engine="asyncio")
+
+    class Websocket:
+        closed = False
+
+        def __init__(self):
+            self.frames = []
+
+        async def send_str(self, data):
+            self.frames.append(data)
+
+        async def close(self, code):
+            self.closed = True
+
+    websocket = Websocket()
+    client = AsyncTwCloudClient(server, websocket, ("127.0.0.1", 1))
+
+    async def run():
+        client._has_data = asyncio.Event()
+        client.sendMessage('{"method": "set", "name": "a", "value": "1"}')
+        client.sendMessage("This server uses @TimMcCool's scratchattach 2.0.0", coalesce=False)
+        client.sendMessage('{"method": "set", "name": "b", "value": "2"}')
+        client.sendMessage('{"method": "set", "name": "c", "value": "3"}')
+        client.close()
+        await client._write_forever()
+
+    asyncio.run(run())
+    # Sets are sent together, the greeting isn't JSON, so it has a frame of its own
+    assert len(websocket.frames) == 3
+    assert websocket.frames[1].endswith("2.0.0")
+    assert [len(frame.split("\n")) for frame in websocket.frames] == [1, 1, 2]
+    for frame in (websocket.frames[0], websocket.frames[2]):
+        for line in frame.split("\n"):
+            json.loads(line)
+    assert client.buffered_size == 0
@@ -0,0 +1,56 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import scratchattach as sa
+from scratchattach.utils import commons
+
+TOTAL_FOLLOWERS = 100
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.startswith("/users/"):
+            data = {"id": 1, "username": url.path.split("/")[2]}
+        else:
+            query = parse_qs(url.query)
+            offset, limit = int(query["offset"][0]), int(query["limit"][0])
+            data = [{"username": f"follower{i}"} for i in range(offset, min(offset + limit, TOTAL_FOLLOWERS))]
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_async_requests():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    async def run():
+        async with sa.AsyncRequests(connection_limit=4) as http:
+            users = [sa.User(username=f"user{i}") for i in range(20)]
+            for user in users:
+                user.update_api = f"{base_url}/users/{user.username}"
+            assert all(await asyncio.gather(*(user.async_update() for user in users)))
+            assert [user.id for user in users] == [1] * 20
+
+            followers = await commons.async_api_iterative(http, f"{base_url}/followers", limit=95, offset=10)
+            assert [f["username"] for f in followers] == [f"follower{i}" for i in range(10, TOTAL_FOLLOWERS)]
+
+    try:
+        asyncio.run(run())
+    finally:
+        server.shutdown()
+        server.server_close()
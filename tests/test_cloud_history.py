@@ -0,0 +1,55 @@
+import time
+
+import scratchattach as sa
+from scratchattach.eventhandlers.cloud_history import CloudHistory
+from util.stub_cloud import StubCloudServer
+
+
+def test_cloud_history(tmp_path):
+    for history in (CloudHistory(max_entries=50), CloudHistory(tmp_path / "history.db", key="a")):
+        for t in range(100):
+            history.record("score", t, timestamp=t * 1000)
+        history.record("☁ other", "x", timestamp=5)
+        history.record("score", "late", timestamp=10_500)  # arrives out of order
+
+        assert history.value_at("score", 10_999) == "late"
+        assert history.value_at("☁ score", 99_000) == 99
+        assert history.value_at("other", 4) is None
+        assert [a.value for a in history.history("score", since=98_000)] == [98, 99]
+        assert [a.value for a in history.history("score", since=60_000, until=61_000)] == [60, 61]
+        assert sorted(history.variables()) == ["☁ other", "☁ score"]
+        history.close()
+
+    # The in-memory history only keeps the newest max_entries sets of a variable
+    history = CloudHistory(max_entries=50)
+    for t in range(1000):
+        history.record("score", t, timestamp=t)
+    assert 50 <= len(history) <= 55
+    assert history.value_at("score", 999) == 999
+
+    # The on-disk history survives restarts
+    assert CloudHistory(tmp_path / "history.db", key="a").value_at("score", 50_000) == 50
+    assert len(CloudHistory(tmp_path / "history.db", key="b")) == 0
+
+
+def test_cloud_record_history(monkeypatch):
+    server = StubCloudServer.start_in_thread()
+    try:
+        server.values["1"]["☁ a"] = "0"
+        cloud = sa.TwCloud(project_id=1, cloud_host=server.url)
+        # Project 1's initial values would be fetched from the Scratch API, the stub sends them on connect instead
+        monkeypatch.setattr(cloud, "_fetch_initial_values", lambda: None)
+        history = cloud.record_history()
+        sender = sa.TwCloud(project_id=1, cloud_host=server.url)
+        for i in range(1, 4):
+            sender.set_var("a", i)
+        deadline = time.time() + 5
+        while cloud.get_var("a") != 3:
+            assert time.time() < deadline
+            time.sleep(0.01)
+        assert [a.value for a in history.history("a")] == ["0", 1, 2, 3]
+        assert history.value_at("a", time.time() * 1000) == 3
+        sender.disconnect()
+        cloud.disconnect()
+    finally:
+        server.stop_thread()
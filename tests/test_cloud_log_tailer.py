@@ -0,0 +1,53 @@
+import scratchattach as sa
+
+
+class FakeLogCloud(sa.ScratchCloud):
+    # serves the clouddata logs from a list instead of fetching them
+    def __init__(self):
+        super().__init__(project_id=1)
+        self.entries = []  # oldest first
+        self.requests = []
+
+    def add(self, name, value, timestamp):
+        self.entries.append({"user": "user", "verb": "set_var", "name": "☁ " + name, "value": value, "timestamp": timestamp})
+
+    def _raw_logs(self, *, limit=100, offset=0):
+        self.requests.append((limit, offset))
+        newest_first = self.entries[::-1]
+        return [dict(entry) for entry in newest_first[offset:offset + limit]]
+
+
+def test_log_tailer():
+    cloud = FakeLogCloud()
+    for t in range(5):
+        cloud.add("a", t, t)
+    tailer = cloud.tail_logs()
+    tailer.prime()
+    assert tailer.poll() == []
+
+    # Several sets with the same timestamp
+    cloud.add("a", 5, 5)
+    cloud.add("b", 5, 5)
+    assert [(a.name, a.value) for a in tailer.poll()] == [("☁ a", 5), ("☁ b", 5)]
+    assert tailer.poll() == []
+
+    # A burst that doesn't fit on one page widens the page, so no activity is lost
+    for t in range(6, 3006):
+        cloud.add("a", t, t)
+    cloud.requests.clear()
+    assert [a.value for a in tailer.poll()] == list(range(6, 3006))
+    assert tailer.page_size == tailer.max_page_size
+    for _ in range(10):
+        assert tailer.poll() == []
+    assert tailer.page_size == tailer.min_page_size
+
+
+def test_iter_logs():
+    cloud = FakeLogCloud()
+    for t in range(250):
+        cloud.add("a" if t % 2 else "b", t, t)
+    assert [a.value for a in cloud.iter_logs(since=200)] == list(range(249, 199, -1))
+    assert len(list(cloud.iter_logs())) == 250
+    assert [a.value for a in cloud.iter_logs(filter_by_var_named="b", max_entries=10)] == [248, 246, 244, 242, 240]
+    assert [a.value for a in cloud.logs(filter_by_var_named="a", limit=4)] == [249, 247]
+    assert [a.value for a in cloud._activity_since(245)] == [246, 247, 248, 249]
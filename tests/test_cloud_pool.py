@@ -0,0 +1,61 @@
+import threading
+import time
+
+import scratchattach as sa
+from util.stub_cloud import StubCloudServer
+
+
+def test_cloud_pool():
+    server = StubCloudServer.start_in_thread()
+    try:
+        server.values["0"]["☁ a"] = "5"
+        with sa.CloudPool() as pool, sa.CloudPool() as sender_pool:
+            clouds = [pool.add(sa.AsyncTwCloud(project_id=i, cloud_host=server.url)) for i in range(20)]
+            assert len(pool) == 20
+            assert pool.add(sa.AsyncTwCloud(project_id=0, cloud_host=server.url)) is clouds[0]
+            assert pool.get(3) is clouds[3]
+            assert clouds[0].get_var("a") == "5"
+
+            received = []
+            got_event = threading.Event()
+            events = clouds[0].events()
+
+            @events.event
+            def on_set(activity):
+                received.append((activity.var, activity.value, activity.cloud))
+                got_event.set()
+
+            events.start()
+            sender = sender_pool.add(sa.AsyncTwCloud(project_id=0, cloud_host=server.url))
+            sender.set_var("a", 7)
+            assert got_event.wait(5)
+            assert received == [("a", 7, clouds[0])]
+            assert clouds[0].get_var("a") == 7
+
+            def wait_for_value(value):
+                deadline = time.time() + 5
+                while ("a", value, clouds[0]) not in received:
+                    assert time.time() < deadline
+                    time.sleep(0.01)
+
+            # Reconnecting ends the cloud's event stream, the events must still arrive afterwards
+            clouds[0].reconnect()
+            sender.set_var("a", 8)
+            wait_for_value(8)
+            # The same after a disconnect, when setting a variable connects the cloud again
+            clouds[0].disconnect()
+            clouds[0].set_var("c", 1)
+            sender.set_var("a", 9)
+            wait_for_value(9)
+
+            for i, cloud in enumerate(clouds):
+                cloud.set_vars({"b": i})
+            deadline = time.time() + 5
+            while not all(server.values[str(i)].get("☁ b") == i for i in range(20)):
+                assert time.time() < deadline
+                time.sleep(0.01)
+            # Pools only ever need their loop and dispatcher threads
+            assert sum(t.name.startswith("CloudPool") for t in threading.enumerate()) == 4
+        assert sum(t.name.startswith("CloudPool") for t in threading.enumerate()) == 0
+    finally:
+        server.stop_thread()
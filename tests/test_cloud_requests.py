@@ -0,0 +1,265 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from scratchattach.cloud._base import DummyCloud
+from scratchattach.eventhandlers.cloud_requests import CloudRequests, ResponseQueue, RespondOrder
+from scratchattach.site.cloud_activity import CloudActivity
+from scratchattach.utils.encoder import Encoding
+
+
+class RecordingCloud(DummyCloud):
+    # collects the responses sent back to the Scratch project
+    ws_shortterm_ratelimit = 0
+    length_limit = 256
+
+    _session = None
+
+    def __init__(self):
+        self.sets = []
+        self.batches = []
+
+    def set_var(self, variable, value, *, max_retries=2):
+        self.sets.append((variable, value))
+
+    def set_vars(self, var_value_dict, *, intelligent_waits=True, max_retries=2):
+        self.batches.append(list(var_value_dict.values()))
+        for variable, value in var_value_dict.items():
+            self.set_var(variable, value)
+
+    def responses(self):
+        responses = {}
+        for _, value in self.sets:
+            data, rid = value.rsplit(".", 1)
+            responses[rid[:-4]] = [Encoding.decode(item) for item in data.split("89") if item]
+        return responses
+
+
+def make_requests(**kwargs):
+    cloud = RecordingCloud()
+    requests = CloudRequests(cloud, **kwargs)
+    requests.ignore_exceptions = True
+    return cloud, requests
+
+
+def send(requests, request_id, name, *args):
+    value = Encoding.encode("&".join([name, *args])) + "." + request_id
+    requests.on_set(CloudActivity(var="TO_HOST", name="TO_HOST", value=value, timestamp=time.time() * 1000))
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_cloud_requests_worker_pool():
+    cloud, requests = make_requests(max_workers=4)
+
+    @requests.request
+    def slow(arg):
+        time.sleep(0.02)
+        return [f"done {arg}"]
+
+    try:
+        for i in range(40):
+            send(requests, str(100000001 + i * 10), "slow", str(i))
+        wait_for(lambda: requests.executor.completed == 40 and len(cloud.responses()) == 40)
+        assert cloud.responses()["100000001"] == ["done 0"]
+        assert len(requests.executor.workers) == 4
+        stats = requests.executor.stats()
+        assert stats["max_queue_depth"] > 0 and stats["mean_duration"] >= 0.02 and stats["rejected"] == 0
+    finally:
+        requests.stop()
+
+
+def test_cloud_requests_overflow_and_timeout():
+    cloud, requests = make_requests(max_workers=1, max_queued_requests=2, request_timeout=0.2)
+    gate = threading.Event()
+
+    @requests.request
+    def wait():
+        gate.wait()
+        return ["finished"]
+
+    @requests.request
+    async def async_wait():
+        await asyncio.sleep(5)
+        return ["finished"]
+
+    try:
+        send(requests, "100000001", "wait")
+        wait_for(lambda: requests.executor.active == 1)
+        for i in range(1, 5):
+            send(requests, str(100000001 + i * 10), "wait")
+        send(requests, "100001001", "async_wait")
+        # 1 request is running, 2 are queued, the other 2 are rejected
+        wait_for(lambda: len(cloud.responses()) >= 2)
+        assert requests.executor.rejected == 2
+        assert cloud.responses()["100000041"] == ["Error in request wait", "Server is busy, try again later"]
+        # the running request takes too long
+        wait_for(lambda: "100000001" in cloud.responses() and "100001001" in cloud.responses())
+        assert cloud.responses()["100000001"] == ["Error in request wait", "Request timed out"]
+        assert cloud.responses()["100001001"] == ["Error in request async_wait", "Request timed out"]
+        gate.set()
+        wait_for(lambda: requests.executor.completed == 4)
+        wait_for(lambda: cloud.responses().get("100000021") == ["finished"])
+        # the output of the timed out request is discarded
+        assert cloud.responses()["100000001"] == ["Error in request wait", "Request timed out"]
+        assert requests.executor.timed_out >= 2
+    finally:
+        gate.set()
+        requests.stop()
+
+
+def test_cloud_requests_timeout_after_output():
+    cloud, requests = make_requests(request_timeout=0.05)
+    stop_tracking = requests.executor._stop_tracking
+
+    def slow_stop_tracking(received_request):
+        # the deadline passes after the output was added, but before the worker notices the request finished
+        time.sleep(0.1)
+        stop_tracking(received_request)
+
+    requests.executor._stop_tracking = slow_stop_tracking
+
+    @requests.request
+    def quick():
+        time.sleep(0.02)
+        return ["done"]
+
+    try:
+        for i in range(5):
+            send(requests, str(100000001 + i * 10), "quick")
+        wait_for(lambda: requests.executor.completed == 5)
+        time.sleep(0.1)
+        # every request got exactly one response: its output
+        final_packets = [value for _, value in cloud.sets if value.endswith("2222")]
+        assert len(final_packets) == 5
+        assert all(output == ["done"] for output in cloud.responses().values())
+        assert requests.executor.timed_out == 0
+        assert not requests.executor.timed_out_ids
+    finally:
+        requests.stop()
+
+
+def test_response_queue_order():
+    outputs = [
+        {"receive": 3, "request_id": "a", "output": "x", "priority": 1},
+        {"receive": 1, "request_id": "b", "output": "y", "priority": 2},
+        {"receive": 2, "request_id": "c", "output": "z", "priority": 1},
+    ]
+    for order, expected in (
+        (RespondOrder.RECEIVE, ["b", "c", "a"]),
+        (RespondOrder.PRIORITY, ["a", "c", "b"]),
+        (RespondOrder.FINISH, ["a", "b", "c"]),
+    ):
+        responses = ResponseQueue(order)
+        for output in outputs:
+            responses.append(output)
+        responses.resend("packet")
+        assert responses.get() == ("resend", "packet")
+        assert [responses.get()[1]["request_id"] for _ in range(3)] == expected
+        assert responses.get(timeout=0) is None
+
+
+@pytest.mark.benchmark
+def test_response_queue_benchmark():
+    # the cost of adding and taking a response must not grow with the number of waiting responses
+    def per_response(depth):
+        responses = ResponseQueue(RespondOrder.RECEIVE)
+        for i in range(depth):
+            responses.append({"receive": (i * 7919) % depth, "request_id": str(i), "output": "", "priority": 0})
+        start = time.perf_counter()
+        for i in range(1000):
+            responses.append({"receive": i, "request_id": str(i), "output": "", "priority": 0})
+            responses.get()
+        return (time.perf_counter() - start) / 1000
+
+    small = min(per_response(100) for _ in range(3))
+    large = min(per_response(10_000) for _ in range(3))
+    assert large < small * 5
+
+
+def test_cloud_requests_compressed_responses():
+    cloud, requests = make_requests()
+    table = ["name | score"] + ["player | 0"] * 30
+
+    @requests.request(thread=False)
+    def leaderboard():
+        return table
+
+    def response(request_id):
+        # puts the packets of a response back together, returns (packet count, validation, data)
+        packets = [value for _, value in cloud.sets if value.rsplit(".", 1)[1].startswith(request_id)]
+        data = "".join(value.rsplit(".", 1)[0] for value in packets)
+        return len(packets), packets[-1][-4:] if packets else "", data
+
+    try:
+        send(requests, "100000001", "leaderboard")
+        wait_for(lambda: response("100000001")[1:2] == ("2222",))
+        plain_packets, _, plain = response("100000001")
+
+        # The decoder sprite announces that it can decompress responses
+        send(requests, "100000011", "_response_encodings", "decimal", "compressed")
+        wait_for(lambda: requests.active_response_encoding == "compressed")
+        send(requests, "100000021", "leaderboard")
+        wait_for(lambda: response("100000021")[1:2] == ("4222",))
+        packets, _, compressed = response("100000021")
+        assert Encoding.decompress(compressed) == plain
+        assert packets < plain_packets
+    finally:
+        requests.stop()
+
+
+def test_compress():
+    for text in ("aaaaaaaaaaaaaab", "hello hello hello hello world", "x" * 500, "abc", "ab ab ab ab ab"):
+        encoded = Encoding.encode(text)
+        compressed = Encoding.compress(encoded)
+        assert Encoding.decompress(compressed) == encoded
+        assert len(compressed) <= len(encoded)
+    # 500 x's: 5 runs of 99 and one of 5
+    assert Encoding.compress(Encoding.encode("x" * 500)) == "019967" * 5 + "010567"
+
+
+def test_cloud_requests_parallel_responses():
+    cloud, requests = make_requests(used_cloud_vars=["1", "2", "3"])
+    set_vars = cloud.set_vars
+
+    def slow_set_vars(var_value_dict, **kwargs):
+        time.sleep(0.01) # like the ratelimit of a real cloud
+        set_vars(var_value_dict, **kwargs)
+
+    cloud.set_vars = slow_set_vars
+
+    @requests.request(thread=False)
+    def big():
+        return "x" * 5000
+
+    @requests.request(thread=False)
+    def small():
+        return "ok"
+
+    def finished(request_id):
+        # index of the batch that contained the last packet of the response
+        for i, batch in enumerate(cloud.batches):
+            if any(value.endswith(f".{request_id}2222") for value in batch):
+                return i
+
+    try:
+        send(requests, "100000001", "big")
+        send(requests, "100000011", "small")
+        wait_for(lambda: finished("100000001") is not None)
+        assert all(len(batch) <= 3 for batch in cloud.batches)
+        # The small response is sent next to the big one instead of waiting until all its packets are sent
+        assert finished("100000011") < finished("100000001") - 10
+        assert cloud.responses()["100000011"] == ["ok"]
+        data = "".join(value.rsplit(".", 1)[0] for _, value in cloud.sets if ".100000001" in value)
+        assert Encoding.decode(data.removesuffix("89")) == "x" * 5000
+        # Packets are spread over all FROM_HOST variables
+        assert {var for var, _ in cloud.sets} == {"FROM_HOST_1", "FROM_HOST_2", "FROM_HOST_3"}
+    finally:
+        requests.stop()
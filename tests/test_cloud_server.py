@@ -0,0 +1,77 @@
+import json
+import types
+
+import scratchattach as sa
+from scratchattach.eventhandlers.cloud_server import BaseCloudServer, TwCloudSocket
+
+
+def _payload(frame):
+    # payload of an unmasked websocket text frame
+    length = frame[1] & 0x7F
+    offset = 2 if length <= 125 else 4 if length == 126 else 10
+    return json.loads(bytes(frame[offset:]).decode("utf-8"))
+
+
+def test_cloud_server_broadcast():
+    server = sa.init_cloud_server(port=0)
+    server.running = True
+    clients = []
+    try:
+        # 2000 synthetic clients across 50 projects
+        for i in range(2000):
+            client = TwCloudSocket(server, None, ("10.0.0.1", i))
+            client.handleConnected()
+            client.handle_handshake({"method": "handshake", "user": f"player{i}", "project_id": str(i % 50)})
+            client.sendq.clear()
+            clients.append(client)
+        assert len(server.active_user_ips("7")) == 40
+        assert len(server.active_projects()) == 0  # no project has variables yet
+
+        for i in range(1000):
+            server.set_var(i % 50, "score", i, skip_forward=clients[i % 50])
+
+        # every client of a project got every set of the project, except for the ones it sent itself
+        assert len(clients[0].sendq) == 0
+        assert len(clients[50].sendq) == 20
+        assert _payload(clients[50].sendq[-1][1])["value"] == 950
+        assert len(clients[1999].sendq) == 20
+        # the frame of a broadcast is built once and shared by all recipients
+        assert clients[50].sendq[0][1] is clients[100].sendq[0][1]
+        assert len(server.active_projects()) == 50
+
+        # closed clients are removed from the index
+        for client in clients[:1000]:
+            client.handleClose()
+        assert len(server.tw_clients) == 1000
+        assert len(server.active_user_ips("7")) == 20
+        assert server.active_user_names("7")[0] == "player1007"
+    finally:
+        server.running = False
+        server.close()
+
+
+def test_cloud_server_engines():
+    # Both engines share their config, validation and queries
+    for engine in ("simplewebsocketserver", "asyncio"):
+        server = sa.init_cloud_server(port=0, engine=engine, allow_non_numeric=False, length_limit=5)
+        try:
+            assert isinstance(server, BaseCloudServer)
+            assert server._check_value(123) and server._check_value("-1.5")
+            assert not server._check_value("abc") and not server._check_value("123456")
+            server.set_project_vars(1, {"a": "1"})
+            server.set_var(1, "☁ b", "2")
+            assert server.get_project_vars("1") == {"a": "1", "b": "2"}
+            assert server.get_var(1, "☁ b") == "2"
+            assert json.loads(server._handshake_message("1").split("\n")[1])["name"] == "☁ b"
+            assert server._handshake_message("2") is None
+            # The project id of a handshake is stored (and passed to the events) as a string by both engines
+            client = types.SimpleNamespace(address=("127.0.0.1", 1))
+            server.tw_clients[client.address] = {"client": client, "username": None, "project_id": None}
+            assert server._register_handshake(client, "user", 1) == "1"
+            assert server.tw_clients[client.address]["project_id"] == "1"
+            assert server.active_user_ips(1) == [client.address]
+            assert server._unregister(client)["project_id"] == "1"
+            assert server.project_clients == {}
+        finally:
+            if engine == "simplewebsocketserver":
+                server.close()
@@ -0,0 +1,27 @@
+import time
+
+import scratchattach as sa
+from util.stub_cloud import StubCloudServer
+
+
+def test_queue_set_var_coalesces():
+    server = StubCloudServer.start_in_thread()
+    try:
+        cloud = sa.TwCloud(project_id=1, cloud_host=server.url)
+        cloud.ws_shortterm_ratelimit = cloud.ws_longterm_ratelimit = 0.1
+        futures = [cloud.queue_set_var("x", i) for i in range(50)]
+        futures.append(cloud.queue_set_var("y", 1))
+        assert cloud.set_queue.flush(5)
+        assert all(future.done() and future.exception() is None for future in futures)
+        cloud.disconnect()
+
+        deadline = time.time() + 5
+        while server.values["1"].get("☁ x") != 49:
+            assert time.time() < deadline
+            time.sleep(0.01)
+        sets = [packet for packet in server.received if packet["method"] == "set"]
+        assert len(sets) <= 4
+        assert cloud.set_queue.coalesced >= 47
+        assert server.values["1"] == {"☁ x": 49, "☁ y": 1}
+    finally:
+        server.stop_thread()
@@ -0,0 +1,32 @@
+import time
+
+import scratchattach as sa
+from scratchattach.eventhandlers.cloud_recorder import CloudSnapshot, CloudSnapshotStore
+from util.stub_cloud import StubCloudServer
+
+
+def test_cloud_recorder_warm_start(tmp_path):
+    server = StubCloudServer.start_in_thread()
+    try:
+        server.values["1"]["☁ a"] = "6"
+        for path in (tmp_path / "snapshot.json", tmp_path / "snapshot.db"):
+            cloud = sa.TwCloud(project_id=1, cloud_host=server.url)
+            cloud.snapshot_path = str(path)
+            CloudSnapshotStore(path).save(cloud._snapshot_key(), CloudSnapshot({"☁ a": "5", "☁ b": "7"}, {"☁ a": 1.0}))
+
+            start = time.time()
+            assert cloud.get_var("b") == "7"
+            assert time.time() - start < 0.5  # no project download, no waiting for the first packet
+            deadline = time.time() + 5
+            while cloud.get_var("a") != "6":
+                assert time.time() < deadline
+                time.sleep(0.01)
+            cloud.disconnect()
+
+            snapshot = CloudSnapshotStore(path).load(cloud._snapshot_key())
+            assert snapshot is not None
+            assert snapshot.values == {"☁ a": "6", "☁ b": "7"}
+            assert snapshot.latest > 1.0
+            assert CloudSnapshotStore(path).load("other") is None
+    finally:
+        server.stop_thread()
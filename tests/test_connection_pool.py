@@ -0,0 +1,77 @@
+import json
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests as bare_requests
+
+from scratchattach.site._base import BaseSiteComponent
+from scratchattach.utils.requests import Requests
+
+UPDATE_COUNT = 50
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.connection_lock:
+            self.server.connections_opened += 1
+
+    def do_GET(self):
+        body = json.dumps({"id": 1}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@dataclass
+class _StubComponent(BaseSiteComponent):
+    update_api: str
+
+    def __post_init__(self):
+        self._headers = {}
+        self._cookies = {}
+
+    def _update_from_dict(self, data) -> bool:
+        return data["id"] == 1
+
+
+def _start_stub_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.connections_opened = 0
+    server.connection_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _run_updates(server: ThreadingHTTPServer, update_function) -> int:
+    server.connections_opened = 0
+    url = f"http://127.0.0.1:{server.server_address[1]}/users/stub"
+    for _ in range(UPDATE_COUNT):
+        component = _StubComponent(update_api=url)
+        component.update_function = update_function
+        assert component.update()
+    return server.connections_opened
+
+
+def test_update_reuses_pooled_connections():
+    server = _start_stub_server()
+    try:
+        # The default update function goes through the shared session
+        assert _StubComponent.update_function.__self__.__class__ is Requests
+
+        pooled_session = Requests()
+        pooled_session.trust_env = False
+        assert _run_updates(server, pooled_session.get) == 1
+        assert _run_updates(server, bare_requests.get) == UPDATE_COUNT
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,63 @@
+import random
+import time
+
+import pytest
+
+from scratchattach.utils import encoder
+from scratchattach.utils.encoder import Encoding
+
+
+def _reference_encode(inp):
+    # the encoder before it used lookup tables
+    outp = ""
+    for i in str(inp):
+        if i in encoder.letters:
+            outp = f"{outp}{encoder.letters.index(i)}"
+        else:
+            outp += str(encoder.letters.index(" "))
+    return outp
+
+
+def test_encoding():
+    text = "Hello, World! 123 ~|^' äöü\n"
+    encoded = Encoding.encode(text)
+    assert encoded == _reference_encode(text)
+    assert Encoding.decode(encoded) == "Hello, World! 123 ~|^'     "
+    assert Encoding.encode(42) == "1311"
+    assert Encoding.encode_many(["ab", 1]) == ["2123", "10"]
+    assert Encoding.decode_many(["2123", "10"]) == ["ab", "1"]
+    assert Encoding.decode("212") == "a"  # an odd last digit is ignored, like before
+
+    # The tables are rebuilt when the letters change
+    Encoding.replace_char("§", "ä")
+    try:
+        assert Encoding.decode(Encoding.encode("ä")) == "ä"
+    finally:
+        Encoding.replace_char("ä", "§")
+    assert Encoding.decode(Encoding.encode("ä")) == " "
+
+
+def _random_payload():
+    alphabet = [letter for letter in encoder.letters if letter is not None and len(letter) == 1] + ["€"]
+    return "".join(random.choices(alphabet, k=100_000))
+
+
+def test_encoding_large_payload():
+    payload = _random_payload()
+    assert Encoding.encode(payload) == _reference_encode(payload)
+    assert Encoding.decode(Encoding.encode(payload)) == payload.replace("€", " ")
+
+
+@pytest.mark.benchmark
+def test_encoding_benchmark():
+    payload = _random_payload()
+
+    start = time.perf_counter()
+    Encoding.decode(Encoding.encode(payload))
+    table_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _reference_encode(payload)
+    reference_time = time.perf_counter() - start
+
+    assert table_time < reference_time
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from scratchattach.utils import metrics
+from scratchattach.utils.requests import Requests, AsyncRequests, HTTPMethod
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = json.dumps({"id": 1}).encode()
+        self.send_response(429 if "limited" in self.path else 200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_endpoint_template():
+    assert metrics.endpoint_template("https://api.scratch.mit.edu/users/griffpatch/projects/10128407?limit=40") \
+        == "api.scratch.mit.edu/users/{name}/projects/{id}"
+
+
+def test_metrics():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    session = Requests()
+    session.trust_env = False
+    try:
+        with metrics.measure() as measured:
+            for project_id in range(5):
+                session.get(f"{base_url}/projects/{project_id}")
+            with session.no_error_handling():
+                session.get(f"{base_url}/limited")
+        session.get(f"{base_url}/projects/6")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    endpoint = f"127.0.0.1:{server.server_address[1]}/projects/{{id}}"
+    assert measured.latency[("GET", endpoint)].count == 5
+    assert measured.bytes_received[("GET", endpoint)] == 5 * len(b'{"id": 1}')
+    assert sum(measured.ratelimited.values()) == 1
+    exported = measured.to_prometheus()
+    assert f'scratchattach_http_responses_total{{method="GET",endpoint="{endpoint}",status="200"}} 5' in exported
+    assert f'scratchattach_http_request_duration_seconds_count{{method="GET",endpoint="{endpoint}"}} 5' in exported
+
+
+def test_metrics_async_bytes_sent():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/projects/1"
+
+    async def run():
+        async with AsyncRequests() as http:
+            await http.async_request(HTTPMethod.POST, url, json={"title": "x"})
+            await http.async_request(HTTPMethod.POST, url, data="abc")
+
+    try:
+        with metrics.measure() as measured:
+            asyncio.run(run())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    endpoint = f"127.0.0.1:{server.server_address[1]}/projects/{{id}}"
+    assert measured.bytes_sent[("POST", endpoint)] == len(json.dumps({"title": "x"})) + 3
@@ -0,0 +1,49 @@
+import json
+import warnings
+
+import scratchattach as sa
+from scratchattach.cloud._base import PacketSplitter
+from util.stub_cloud import StubCloudServer
+
+
+def _packet(i):
+    return {"method": "set", "name": f"☁ var{i % 10}", "value": str(i)}
+
+
+def test_packet_splitter_frames():
+    splitter = PacketSplitter()
+    data = "\n".join(json.dumps(_packet(i)) for i in range(3))
+    assert splitter.feed(data[:10]) == []
+    assert splitter.feed(data[10:]) == [_packet(i) for i in range(3)]
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        assert splitter.feed("This server uses @TimMcCool's scratchattach 2.0.0") == []
+    assert len(caught) == 1
+    assert splitter.feed(json.dumps(_packet(5)) + "\n") == [_packet(5)]
+
+
+def test_packet_splitter_burst():
+    # 100k packets, sent in 64 KiB frames that cut packets at arbitrary positions
+    count = 100_000
+    data = "\n".join(json.dumps(_packet(i)) for i in range(count))
+    frames = [data[i:i + 65536] for i in range(0, len(data), 65536)]
+
+    splitter = PacketSplitter()
+    packets = [packet for frame in frames for packet in splitter.feed(frame)]
+    assert len(packets) == count
+    assert packets[0] == _packet(0) and packets[-1] == _packet(count - 1)
+
+
+def test_websocket_event_stream():
+    server = StubCloudServer.start_in_thread()
+    try:
+        server.values["1"] = {f"☁ var{i}": str(i) for i in range(1000)}
+        cloud = sa.TwCloud(project_id=1, cloud_host=server.url)
+        stream = cloud.create_event_stream()
+        stream.timeout = 5
+        packets = list(stream.read(1000))
+        assert [packet["value"] for packet in packets] == [str(i) for i in range(1000)]
+        stream.close()
+    finally:
+        server.stop_thread()
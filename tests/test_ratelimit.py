@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import scratchattach as sa
+from scratchattach.utils.ratelimit import CloudSendScheduler, RateLimiter, TokenBucket, endpoint_class, parse_retry_after
+
+
+def test_token_bucket():
+    bucket = TokenBucket(100, 5)
+    assert [bucket.reserve() for _ in range(5)] == [0] * 5
+    assert 0 < bucket.reserve() <= 0.01 + 1e-6
+
+    bucket.on_response(429, retry_after=2)
+    assert bucket.rate == 50
+    assert 1.9 < bucket.wait_time() <= 2.1
+
+    for _ in range(100):
+        bucket.on_response(200)
+    assert bucket.rate == bucket.max_rate
+
+
+def test_ratelimiter():
+    assert endpoint_class("GET", "https://api.scratch.mit.edu/users/griffpatch") == "read"
+    assert endpoint_class("GET", "https://scratch.mit.edu/site-api/comments/user/griffpatch/") == "site-api"
+    assert endpoint_class("POST", "https://api.scratch.mit.edu/proxy/comments/project/1") == "write"
+    assert parse_retry_after("3") == 3
+    assert parse_retry_after(None) is None
+
+    limiter = RateLimiter()
+    assert limiter.bucket("GET", "https://api.scratch.mit.edu/users/a") is limiter.bucket("GET", "https://api.scratch.mit.edu/projects/1")
+    assert limiter.bucket("GET", "https://api.scratch.mit.edu/users/a") is not limiter.bucket("PUT", "https://api.scratch.mit.edu/users/a")
+    assert limiter.bucket("GET", "https://api.scratch.mit.edu/users/a") is not limiter.bucket("GET", "https://scratch.mit.edu/users/a")
+
+
+def test_cloud_send_scheduler():
+    scheduler = CloudSendScheduler(0.1, 0.2, burst_duration=1)
+    # 1 second of sets every 0.1s is 5 more sets than the long-term limit allows
+    waits = [scheduler.reserve() for _ in range(14)]
+    assert waits[0] == 0
+    assert all(0.1 * (i - 1) < waits[i] <= 0.1 * i + 1e-3 for i in range(1, 9))
+    assert 1.55 < waits[12] <= 1.6 + 1e-3
+    assert 0.19 < waits[13] - waits[12] <= 0.2 + 1e-3
+
+    # Concurrent reservations are spaced out instead of racing
+    scheduler = CloudSendScheduler(0.05, 0.05)
+    with ThreadPoolExecutor(8) as executor:
+        waits = sorted(executor.map(lambda _: scheduler.reserve(), range(16)))
+    assert all(0.05 * (i - 1) < waits[i] <= 0.05 * i + 1e-3 for i in range(1, 16))
+
+    cloud = sa.TwCloud(project_id=1)
+    assert cloud.next_send_wait(100) == 0
+    cloud.ws_shortterm_ratelimit = cloud.ws_longterm_ratelimit = 0.1
+    cloud._enforce_ratelimit(n=1)
+    assert 0.05 < cloud.next_send_wait() <= 0.1
@@ -0,0 +1,74 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from scratchattach.utils.requests import Requests
+from scratchattach.utils.response_cache import ResponseCache, CacheEntry
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.server.hits.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps({"id": 1}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_response_cache(tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.hits = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/projects/1"
+
+    session = Requests()
+    session.trust_env = False
+    try:
+        session.cache = ResponseCache({r"/projects/\d+$": 60}, path=tmp_path / "cache.sqlite")
+        assert session.get(url).json() == {"id": 1}
+        assert session.get(url + "?cachebust=123").json() == {"id": 1}
+        assert server.hits == [None]
+
+        # A new cache using the same file starts warm
+        session.cache = ResponseCache({r"/projects/\d+$": 0}, path=tmp_path / "cache.sqlite")
+        # The entry has expired, so it is revalidated using its ETag
+        assert session.get(url).json() == {"id": 1}
+        assert server.hits == [None, '"v1"']
+
+        session.cache = ResponseCache({r"/other$": 60})
+        session.get(url)
+        session.get(url)
+        assert len(server.hits) == 4
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_response_cache_file_size(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = ResponseCache(max_entries=10, path=path)
+    for i in range(100):
+        cache.store(f"key{i}", CacheEntry(f"https://example.com/{i}", 200, {}, b"{}", None))
+    assert len(cache) == 10
+    # Evicted entries are deleted from the file as well
+    assert cache._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 10
+    assert cache.get("key0") is None
+    assert cache.get("key99") is not None
+
+    # A cache with fewer entries trims the file when it is opened
+    cache = ResponseCache(max_entries=3, path=path)
+    assert cache._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 3
@@ -0,0 +1,63 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from scratchattach.utils import exceptions
+from scratchattach.utils import requests as m_requests
+from scratchattach.utils.retry import RetryPolicy, CircuitBreaker
+
+
+class _FlakyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _respond(self):
+        self.server.hits += 1
+        failing = self.server.hits <= self.server.failures
+        body = json.dumps({"ok": not failing}).encode()
+        self.send_response(503 if failing else 200)
+        if failing:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_retry_and_circuit_breaker(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FlakyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    session = m_requests.Requests()
+    session.trust_env = False
+    monkeypatch.setattr(m_requests, "retry_policy", RetryPolicy(max_retries=3, backoff_factor=0.01))
+    try:
+        server.hits, server.failures = 0, 2
+        assert session.get(url).json() == {"ok": True}
+        assert server.hits == 3
+
+        # POST is not idempotent, so it isn't retried
+        server.hits, server.failures = 0, 2
+        with session.no_error_handling():
+            assert session.post(url).status_code == 503
+        assert server.hits == 1
+
+        monkeypatch.setattr(m_requests, "retry_policy", None)
+        monkeypatch.setattr(m_requests, "circuit_breaker", CircuitBreaker(failure_threshold=2, reset_timeout=60))
+        server.hits, server.failures = 0, 100
+        with session.no_error_handling():
+            session.get(url)
+            session.get(url)
+            with pytest.raises(exceptions.CircuitOpenError):
+                session.get(url)
+        assert server.hits == 2
+    finally:
+        server.shutdown()
+        server.server_close()
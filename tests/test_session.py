@@ -1,6 +1,9 @@
 import warnings
 import util
 
+import scratchattach as sa
+from scratchattach.utils import commons, exceptions
+
 
 def test_session():
     if not util.credentials_available():
@@ -22,5 +25,28 @@ def test_session():
     assert closed_count >= 1
 
 
+def test_connect_many(monkeypatch):
+    # Offline: _get_object is replaced, so no requests are made
+    def get_object(identificator_name, identificator, cls, NotFoundException, session=None):
+        assert isinstance(identificator, int)
+        if identificator == 404:
+            raise NotFoundException
+        return cls(**{identificator_name: identificator, "_session": session})
+
+    monkeypatch.setattr(commons, "_get_object", get_object)
+    sess = sa.Session()
+
+    projects = sess.connect_projects(["1", 404, "abc", 3])
+    assert [p.id for p in projects if isinstance(p, sa.Project)] == [1, 3]
+    assert projects[0]._session is sess
+    assert isinstance(projects[1], exceptions.ProjectNotFound)
+    # An invalid id only fails its own item
+    assert isinstance(projects[2], ValueError)
+
+    studios = sess.connect_studios(["x", "2"])
+    assert isinstance(studios[0], ValueError)
+    assert isinstance(studios[1], sa.Studio) and studios[1].id == 2
+
+
 if __name__ == "__main__":
     test_session()
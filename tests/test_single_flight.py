@@ -0,0 +1,32 @@
+import threading
+import time
+
+from scratchattach.utils.commons import SingleFlight
+
+
+def test_single_flight():
+    flights = SingleFlight()
+    calls = []
+    barrier = threading.Barrier(10)
+    results = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return "response"
+
+    def worker():
+        barrier.wait()
+        results.append(flights.do("https://api.scratch.mit.edu/users/griffpatch", fetch))
+
+    threads = [threading.Thread(target=worker) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["response"] * 10
+    assert len(calls) == 1
+    # Once the flight has landed, the next call is performed again
+    assert flights.do("https://api.scratch.mit.edu/users/griffpatch", fetch) == "response"
+    assert len(calls) == 2
@@ -28,6 +28,10 @@ def test_user():
     assert user.classroom is None
     assert user.does_exist()
 
+    batch = sess.connect_users(["ScratchAttachV2", "griffpatch"])
+    assert [u.username for u in batch] == ["ScratchAttachV2", "griffpatch"]
+    assert batch[0].id == 147905216
+
     new_scratcher = sess.connect_user("-NewScratcher-")
     assert new_scratcher.is_new_scratcher()
     assert new_scratcher.rank() == sa.Rank.NEW_SCRATCHER